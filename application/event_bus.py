@@ -0,0 +1,61 @@
+import threading
+from collections import deque
+from typing import NamedTuple
+from domain.models import FileEvent
+from shared.metrics import DRAIN_EVENTS, DRAIN_SECONDS
+
+
+class Batch(NamedTuple):
+    files: list[FileEvent]
+    images: list[FileEvent]
+    logs: list[str]
+
+    def __len__(self) -> int:
+        return len(self.files) + len(self.images) + len(self.logs)
+
+
+class EventBus:
+    """Hand-off from event-source threads to one consumer (the GUI thread).
+
+    Producers only append to a deque (atomic in CPython, no lock on the hot
+    path). The consumer drains everything that is queued in one go, typically
+    from a timer every few ms, and applies the batch in a single pass.
+    """
+
+    def __init__(self):
+        self._q: deque[tuple[str, object]] = deque()
+        self._lock = threading.Lock()       # guards the stats only
+        self._stats = {"batches": 0, "events": 0, "max_batch": 0, "drain_s": 0.0, "max_drain_s": 0.0}
+
+    # ---------- Producers (any thread) ----------
+
+    def post_file(self, ev: FileEvent) -> None: self._q.append(("file", ev))
+    def post_image(self, ev: FileEvent) -> None: self._q.append(("image", ev))
+    def post_log(self, msg: str) -> None: self._q.append(("log", msg))
+
+    # ---------- Consumer ----------
+
+    def __len__(self) -> int:
+        return len(self._q)
+
+    def drain(self, max_items: int = 5000) -> Batch:
+        b = Batch([], [], [])
+        q = self._q; sink = {"file": b.files, "image": b.images, "log": b.logs}
+        for _ in range(min(max_items, len(q))):
+            kind, payload = q.popleft()
+            sink[kind].append(payload)
+        return b
+
+    def record_drain(self, n: int, seconds: float) -> None:
+        DRAIN_SECONDS.observe(seconds); DRAIN_EVENTS.inc(n)
+        with self._lock:
+            st = self._stats
+            st["batches"] += 1; st["events"] += n; st["drain_s"] += seconds
+            st["max_batch"] = max(st["max_batch"], n); st["max_drain_s"] = max(st["max_drain_s"], seconds)
+
+    def stats(self) -> dict:
+        with self._lock: st = dict(self._stats)
+        n = st["batches"] or 1
+        return {"backlog": len(self), "batches": st["batches"], "events_per_batch": round(st["events"] / n, 1),
+                "max_batch": st["max_batch"], "drain_ms_avg": round(st["drain_s"] / n * 1000, 2),
+                "drain_ms_max": round(st["max_drain_s"] * 1000, 2)}
@@ -1,22 +1,31 @@
 import time
+from shared.metrics import APPEND_SECONDS, HANDLE_SECONDS
 from typing import NamedTuple
 from domain.models import FileEvent, Direction
 from domain.heuristics import decide_direction
-from .ports import CameraRepo, CountsRepo
+from .ports import CameraRepo, CountsRepo, RollupRepo, SnapshotLinkRepo
 
 class EventOutcome(NamedTuple):
     direction: Direction
 
 class EventProcessor:
-    def __init__(self, cams: CameraRepo, counts: CountsRepo):
-        self.cams = cams; self.counts = counts
+    def __init__(self, cams: CameraRepo, counts: CountsRepo, rollups: RollupRepo | None = None,
+                 links: SnapshotLinkRepo | None = None):
+        self.cams = cams; self.counts = counts; self.rollups = rollups; self.links = links
 
     def handle(self, ev: FileEvent) -> EventOutcome:
+        t0 = time.perf_counter()
         cam = self.cams.find_by_ip(ev.camera_ip)
         direction = decide_direction(cam, ev.raw_name)
         row = {"ts": ev.when if ev.when else time.time(),
                "camera_ip": ev.camera_ip,
                "camera_name": (cam.name if cam and cam.name else ev.camera_ip),
                "direction": direction, "file": ev.path, "raw": ev.raw_name}
-        self.counts.append(row)
+        t1 = time.perf_counter(); self.counts.append(row); APPEND_SECONDS.observe(time.perf_counter() - t1)
+        if self.rollups is not None: self.rollups.add(row["camera_ip"], direction, row["ts"])
+        HANDLE_SECONDS.observe(time.perf_counter() - t0)
         return EventOutcome(direction)
+
+    def attach_image(self, ev: FileEvent) -> None:
+        """Record the snapshot of an earlier count (same camera_ip and when) for the export's file column."""
+        if self.links is not None and ev.path: self.links.add(ev.camera_ip, ev.when, ev.path)
@@ -0,0 +1,86 @@
+import time
+from domain.models import Direction
+from domain.rollups import bucket_start, next_bucket
+from .ports import CheckpointStore, CountsRepo
+
+CHECKPOINT_VERSION = 1
+
+
+def reset_boundary(mode: str, now: float | None = None) -> float:
+    """Start of the counting period: local midnight for "day", the epoch for "never"."""
+    if mode == "day": return float(bucket_start(time.time() if now is None else now, "day"))
+    if mode == "never": return 0.0
+    raise ValueError(f"unknown counters_reset: {mode!r}")
+
+
+def _period_end(mode: str, since: float) -> float:
+    return float(next_bucket(int(since), "day")) if mode == "day" else float("inf")
+
+
+class LiveCounters:
+    """Per-camera IN/OUT/TOTAL since the reset boundary, restored from a checkpoint.
+
+    A checkpoint stores the counters together with the counts-log position
+    they correspond to, so startup loads it and replays only the rows written
+    after that position. `add` and `checkpoint` must run on the same thread
+    as EventProcessor.handle (the GUI / daemon drain), which keeps the
+    counters and the log position consistent. An event past the end of the
+    period rolls the counters over before it is counted, so the period
+    boundary never depends on when the checkpoint timer runs.
+    """
+
+    def __init__(self, counts: CountsRepo, store: CheckpointStore, reset: str = "day", now: float | None = None):
+        self.repo = counts; self.store = store; self.reset = reset
+        self.since = reset_boundary(reset, now); self._until = _period_end(reset, self.since)
+        self._counts: dict[str, list[int]] = {}
+
+    # ---------- Counters ----------
+
+    def add(self, camera_ip: str, direction: Direction, ts: float) -> bool:
+        """Count one event; True if it started a new period first (the earlier counters were reset)."""
+        rolled = ts >= self._until and self.roll(ts)
+        if ts < self.since or direction not in ("IN", "OUT"): return rolled
+        c = self._counts.get(camera_ip)
+        if c is None: c = self._counts[camera_ip] = [0, 0, 0]
+        c[0 if direction == "IN" else 1] += 1; c[2] += 1
+        return rolled
+
+    def snapshot(self) -> dict[str, tuple[int, int, int]]:
+        return {ip: tuple(c) for ip, c in self._counts.items()}
+
+    def totals(self) -> tuple[int, int, int]:
+        return tuple(sum(c[k] for c in self._counts.values()) for k in range(3))
+
+    def roll(self, now: float | None = None) -> bool:
+        """Start a new period when the boundary moved (e.g. past midnight); True if counters were reset."""
+        since = reset_boundary(self.reset, now)
+        if since <= self.since: return False
+        self.since = since; self._until = _period_end(self.reset, since); self._counts = {}
+        return True
+
+    # ---------- Checkpoints ----------
+
+    def checkpoint(self) -> None:
+        self.store.save({"version": CHECKPOINT_VERSION, "reset": self.reset, "since": self.since,
+                         "saved_at": time.time(), "position": self.repo.position(), "counts": self._counts})
+
+    def restore(self) -> dict:
+        """Load the latest checkpoint and replay the log tail; falls back to a range scan since the boundary."""
+        t = time.perf_counter(); ck = self.store.load(); self._counts = {}; rows = 0
+        usable = (ck and ck.get("version") == CHECKPOINT_VERSION and ck.get("reset") == self.reset
+                  and (ck["since"] == self.since or ck["saved_at"] <= self.since))
+        mode = "checkpoint" if usable else "rebuild"
+        try:
+            if usable:
+                if ck["since"] == self.since: self._counts = {ip: list(c) for ip, c in ck["counts"].items()}
+                src = self.repo.read_since(ck["position"])
+            else:
+                src = self.repo.read_range(self.since, time.time() + 86400)
+            for r in src:
+                self.add(r.get("camera_ip", ""), r.get("direction", "?"), float(r.get("ts", 0))); rows += 1
+        except ValueError:          # stale position (log rotated, backend switched): rebuild
+            self._counts = {}; rows = 0; mode = "rebuild"
+            for r in self.repo.read_range(self.since, time.time() + 86400):
+                self.add(r.get("camera_ip", ""), r.get("direction", "?"), float(r.get("ts", 0))); rows += 1
+        self.checkpoint()
+        return {"mode": mode, "rows": rows, "seconds": round(time.perf_counter() - t, 3)}
@@ -1,5 +1,6 @@
 from typing import Protocol, Iterable, Callable
-from domain.models import CameraConf, FileEvent
+from domain.models import CameraConf, FileEvent, Direction
+from domain.rollups import Granularity
 
 class CameraRepo(Protocol):
     def load_all(self) -> list[CameraConf]: ...
@@ -9,12 +10,43 @@ class CameraRepo(Protocol):
 class CountsRepo(Protocol):
     def append(self, row: dict) -> None: ...
     def read_range(self, t0: float, t1: float) -> Iterable[dict]: ...
+    def position(self) -> dict: ...                           # opaque, JSON-serialisable end-of-log marker
+    def read_since(self, pos: dict) -> Iterable[dict]: ...    # rows appended after `pos`; ValueError if stale
+    def flush(self) -> None: ...
+    def close(self) -> None: ...
+
+class RollupRepo(Protocol):
+    def add(self, camera_ip: str, direction: Direction, ts: float, n: int = 1) -> None: ...
+    def query(self, t0: float, t1: float, granularity: Granularity = "hour",
+              camera_ip: str | None = None) -> list[tuple[int, str, str, int]]: ...
+    def totals(self, t0: float, t1: float, camera_ip: str | None = None) -> dict[tuple[str, str], int]: ...
+    def flush(self) -> None: ...
+    def close(self) -> None: ...
+
+class SnapshotLinkRepo(Protocol):
+    def add(self, camera_ip: str, ts: float, path: str) -> None: ...
+    def forget(self, paths: Iterable[str]) -> None: ...                         # images evicted from the store
+    def reader(self) -> Callable[[str, float], str]: ...                        # lookup(camera_ip, ts) -> path
+    def close(self) -> None: ...
+
+class CheckpointStore(Protocol):
+    def load(self) -> dict | None: ...
+    def save(self, doc: dict) -> None: ...
 
 class ImageStore(Protocol):
+    def store(self, chunks: Iterable[bytes], remote_ip: str, raw_name: str) -> str: ...
     def move_and_stamp(self, tmp_path: str, remote_ip: str, raw_name: str) -> str: ...
+    def read(self, path: str) -> bytes | None: ...
     def purge_older_than(self, seconds: float) -> int: ...
+    def add_evict_listener(self, fn: Callable[[list[str]], None]) -> None: ...
 
 class EventSource(Protocol):
-    def start(self, on_file: Callable[[FileEvent], None], on_log: Callable[[str], None]) -> None: ...
+    # Snapshots are only fetched (and stored) when on_image is given; an image event carries
+    # the camera_ip and when of the count it belongs to, which is how SnapshotLinkRepo keys it.
+    def start(self, on_file: Callable[[FileEvent], None], on_log: Callable[[str], None],
+              on_image: Callable[[FileEvent], None] | None = None) -> None: ...
     def stop(self) -> None: ...
     def is_running(self) -> bool: ...
+    def stats(self) -> dict: ...
+    # Re-read the camera repo; start / stop / restart only the cameras that changed.
+    def reconcile(self) -> None: ...
@@ -0,0 +1,65 @@
+"""alertStream parser throughput in MB/s on one core.
+
+    python -m benchmarks.bench_alert_parser [capture ...]
+
+Each capture is a raw alertStream body as recorded from a camera (bytes
+after the HTTP headers). Without arguments a Hikvision-like stream is
+synthesised: mostly videoloss heartbeats with some line-crossing alerts.
+The legacy `buf += chunk` / finditer loop is measured on the same input.
+"""
+import random, re, sys, time
+from pathlib import Path
+from infrastructure.alert_stream_parser import AlertStreamParser
+
+ALERT = (b'<EventNotificationAlert version="2.0" xmlns="http://www.hikvision.com/ver20/XMLSchema">\r\n'
+         b"<ipAddress>192.168.1.64</ipAddress>\r\n<portNo>80</portNo>\r\n<protocol>HTTP</protocol>\r\n"
+         b"<macAddress>44:19:b6:00:00:01</macAddress>\r\n<channelID>%d</channelID>\r\n"
+         b"<dateTime>2026-01-01T12:00:%02d+00:00</dateTime>\r\n<activePostCount>1</activePostCount>\r\n"
+         b"<eventType>%s</eventType>\r\n<eventState>%s</eventState>\r\n"
+         b"<eventDescription>%s alarm</eventDescription>\r\n</EventNotificationAlert>\r\n")
+
+
+def synth_stream(n_parts: int = 20_000, seed: int = 1) -> bytes:
+    rnd = random.Random(seed); out = []
+    for i in range(n_parts):
+        et, st = (b"linedetection", b"active") if rnd.random() < 0.2 else (b"videoloss", b"inactive")
+        body = ALERT % (rnd.randint(1, 4), i % 60, et, st, et)
+        out.append(b"--boundary\r\nContent-Type: application/xml; charset=\"UTF-8\"\r\n"
+                   b"Content-Length: %d\r\n\r\n%s\r\n" % (len(body), body))
+    return b"".join(out)
+
+
+def legacy(chunks) -> int:
+    EVENT_BLOCK = re.compile(br"<EventNotificationAlert.*?</EventNotificationAlert>", re.IGNORECASE | re.DOTALL)
+    def GET(tag, blob): return re.search(fr"<{tag}>([^<]+)</{tag}>".encode(), blob, re.IGNORECASE | re.DOTALL)
+    buf = b""; n = 0
+    for chunk in chunks:
+        buf += chunk; keep_from = 0
+        for m in EVENT_BLOCK.finditer(buf):
+            part = m.group(0)
+            if GET("eventType", part): GET("eventState", part); GET("channelID", part); n += 1
+            keep_from = m.end()
+        if keep_from: buf = buf[keep_from:]
+    return n
+
+
+def streaming(chunks) -> int:
+    p = AlertStreamParser("multipart/mixed; boundary=boundary"); n = 0
+    for chunk in chunks: n += len(p.feed(chunk))
+    return n
+
+
+def run(label: str, data: bytes, chunk: int = 4096) -> None:
+    chunks = [data[i:i+chunk] for i in range(0, len(data), chunk)]
+    for name, fn in (("streaming", streaming), ("legacy", legacy)):
+        t = time.process_time(); n = fn(chunks); dt = time.process_time() - t
+        print(f"{label:<24}{name:<11}{len(data) / dt / 1e6:>9.1f} MB/s  {n:>8} alerts")
+
+
+def main(paths: list[str]) -> None:
+    if not paths: run("synthetic", synth_stream())
+    for p in paths: run(Path(p).name, Path(p).read_bytes())
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,41 @@
+"""Events/s for counts.jsonl appends: per-row open/close vs BufferedAppender.
+
+    python -m benchmarks.bench_counts_append [N]
+"""
+import json, sys, tempfile, time
+from pathlib import Path
+from infrastructure.jsonl_counts_repo import JsonlCountsRepo
+
+
+def _row(i: int) -> dict:
+    return {"ts": 1_700_000_000 + i * 0.1, "camera_ip": f"10.0.0.{i % 200}", "camera_name": f"cam{i % 200}",
+            "direction": "IN" if i % 3 else "OUT", "file": "", "raw": "LINE_CROSSING_DETECTION"}
+
+
+def bench_open_close(path: Path, n: int) -> float:
+    t = time.perf_counter()
+    for i in range(n):
+        with path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(_row(i))+"\n")
+    return n / (time.perf_counter() - t)
+
+
+def bench_buffered(path: Path, n: int, fsync: str) -> float:
+    repo = JsonlCountsRepo(path, fsync=fsync, legacy=None)
+    t = time.perf_counter()
+    for i in range(n): repo.append(_row(i))
+    repo.close()
+    return n / (time.perf_counter() - t)
+
+
+def main(n: int = 50_000) -> None:
+    with tempfile.TemporaryDirectory() as d:
+        d = Path(d)
+        print(f"{'per-row open/close':<28}{bench_open_close(d / 'a.jsonl', n):>12,.0f} ev/s")
+        for pol in ("none", "interval", "batch"):
+            rate = bench_buffered(d / f"seg_{pol}", n, pol)
+            print(f"{'buffered fsync=' + pol:<28}{rate:>12,.0f} ev/s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
@@ -0,0 +1,53 @@
+"""Insert throughput and range-query latency: JSONL day segments vs SQLite.
+
+    python -m benchmarks.bench_counts_backends [N_ROWS]     (default 10,000,000)
+
+Rows are spread over ~60 days across 200 cameras; queries are random
+one-hour and one-day windows, each fully drained.
+"""
+import random, statistics, sys, tempfile, time
+from pathlib import Path
+from infrastructure.jsonl_counts_repo import JsonlCountsRepo
+from infrastructure.sqlite_counts_repo import SqliteCountsRepo
+
+T0   = 1_760_000_000.0
+SPAN = 60 * 86400
+
+
+def _rows(n: int):
+    step = SPAN / n
+    for i in range(n):
+        yield {"ts": T0 + i * step, "camera_ip": f"10.0.{i % 200 // 100}.{i % 100}", "camera_name": f"cam{i % 200}",
+               "direction": "IN" if i % 3 else "OUT", "file": "", "raw": "LINE_CROSSING_DETECTION"}
+
+
+def _insert(repo, n: int) -> float:
+    t = time.perf_counter()
+    for r in _rows(n): repo.append(r)
+    repo.flush()
+    return n / (time.perf_counter() - t)
+
+
+def _query(repo, window: float, k: int = 20) -> tuple[float, float]:
+    rnd = random.Random(42); lat = []; rows = 0
+    for _ in range(k):
+        a = T0 + rnd.uniform(0, SPAN - window)
+        t = time.perf_counter(); rows += sum(1 for _ in repo.read_range(a, a + window)); lat.append(time.perf_counter() - t)
+    return statistics.median(lat) * 1000, rows / k
+
+
+def main(n: int = 10_000_000) -> None:
+    with tempfile.TemporaryDirectory() as d:
+        d = Path(d)
+        for name, repo in (("jsonl", JsonlCountsRepo(d / "seg", batch_rows=4096, fsync="none", legacy=None)),
+                           ("sqlite", SqliteCountsRepo(d / "c.sqlite3", batch_rows=4096, fsync="none"))):
+            rate = _insert(repo, n)
+            print(f"{name:<7} insert {rate:>12,.0f} rows/s")
+            for label, w in (("1h", 3600.0), ("1d", 86400.0)):
+                ms, avg = _query(repo, w)
+                print(f"{name:<7} range {label:<3} median {ms:>9.1f} ms  ({avg:,.0f} rows)")
+            repo.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000)
@@ -0,0 +1,122 @@
+"""End-to-end load test: N simulated cameras -> event source -> EventProcessor.
+
+    python -m benchmarks.bench_load [-n 50] [--rate 1] [--noise 0.5] [--duration 20]
+                                    [--source threads|asyncio] [--shards N] [--backend jsonl|sqlite] [--images]
+
+The cameras run in a `python -m sim` subprocess so that CPU and RSS below
+belong to the ingestion side only. Latency is measured from the moment the
+simulator wrote a counted alert to the moment EventProcessor.handle returned
+for it (k-th sent alert of a camera <-> k-th counted event of that camera).
+"""
+import argparse, json, os, resource, statistics, subprocess, sys, tempfile, time
+from pathlib import Path
+from domain.models import CameraConf
+from application.event_bus import EventBus
+from application.event_processor import EventProcessor
+from infrastructure.factory import make_event_source
+from infrastructure.image_store import MemoryImageStore
+from infrastructure.rollup_store import JsonRollupStore
+from shared.settings import Settings
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+class _Cams:
+    def __init__(self, cams: list[CameraConf]): self._cams = cams; self._by_ip = {c.ip: c for c in cams}
+    def load_all(self) -> list[CameraConf]: return list(self._cams)
+    def save_all(self, items: list[CameraConf]) -> None: pass
+    def find_by_ip(self, ip: str) -> CameraConf | None: return self._by_ip.get(ip)
+
+
+def _rss_mb() -> float:
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmRSS:"): return int(line.split()[1]) / 1024
+    except OSError: pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _proc_cpu(pid: int) -> float:
+    """utime + stime of another process (a shard), in seconds."""
+    try: f = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+    except (OSError, IndexError): return 0.0
+    return (int(f[11]) + int(f[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def _pct(xs: list[float], q: float) -> float:
+    return sorted(xs)[min(len(xs) - 1, int(q * len(xs)))] * 1000 if xs else 0.0
+
+
+def main(argv: list[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(prog="python -m benchmarks.bench_load")
+    ap.add_argument("-n", "--cameras", type=int, default=50)
+    ap.add_argument("--port", type=int, default=18000)
+    ap.add_argument("--rate", type=float, default=1.0, help="counted alerts per second per camera")
+    ap.add_argument("--noise", type=float, default=0.5)
+    ap.add_argument("--heartbeat", type=float, default=1.0)
+    ap.add_argument("--channels", type=int, default=1, help="channels per camera (NVR)")
+    ap.add_argument("--dup", type=float, default=0.0, help="share of counted alerts the cameras retransmit")
+    ap.add_argument("--post-count", choices=("part", "alarm"), default="part",
+                    help="activePostCount the cameras send: a counter over all parts, or per alarm (always 1)")
+    ap.add_argument("--duration", type=float, default=20.0)
+    ap.add_argument("--source", choices=("threads", "asyncio"), default="threads")
+    ap.add_argument("--shards", type=int, default=0, help="spread the cameras over this many processes")
+    ap.add_argument("--backend", choices=("jsonl", "sqlite"), default="jsonl")
+    ap.add_argument("--images", action="store_true", help="also fetch a snapshot per event (memory image store)")
+    a = ap.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as d:
+        d = Path(d); sent_log = d / "sent.json"
+        sim = subprocess.Popen([sys.executable, "-m", "sim", "-n", str(a.cameras), "--port", str(a.port),
+                                "--rate", str(a.rate), "--noise", str(a.noise), "--heartbeat", str(a.heartbeat),
+                                "--channels", str(a.channels), "--dup", str(a.dup), "--post-count", a.post_count,
+                                "--sent-log", str(sent_log)], cwd=ROOT, stdout=subprocess.PIPE, text=True)
+        try:
+            if sim.stdout.readline().strip() != "ready": raise SystemExit("simulator did not start")
+            cams = _Cams([CameraConf(name=f"sim-{i}", ip=f"127.0.0.1:{a.port + i}", password="sim") for i in range(a.cameras)])
+            if a.backend == "sqlite":
+                from infrastructure.sqlite_counts_repo import SqliteCountsRepo
+                counts = SqliteCountsRepo(d / "counts.sqlite3")
+            else:
+                from infrastructure.jsonl_counts_repo import JsonlCountsRepo
+                counts = JsonlCountsRepo(d / "counts", legacy=None)
+            rollups = JsonRollupStore(d / "rollups")
+            processor = EventProcessor(cams, counts, rollups); bus = EventBus()
+            source = make_event_source(Settings(event_source=a.source, event_shards=a.shards), MemoryImageStore(max_bytes=64 << 20), cams)
+            done: dict[str, list[float]] = {c.ip: [] for c in cams.load_all()}
+
+            ru0 = resource.getrusage(resource.RUSAGE_SELF); t0 = time.monotonic(); peak_rss = _rss_mb()
+            source.start(bus.post_file, lambda m: None, (lambda ev: None) if a.images else None)
+            while time.monotonic() - t0 < a.duration:
+                time.sleep(0.01)
+                b = bus.drain()
+                for ev in b.files:
+                    processor.handle(ev); done[ev.camera_ip].append(time.time())
+                peak_rss = max(peak_rss, _rss_mb())
+            wall = time.monotonic() - t0; ru1 = resource.getrusage(resource.RUSAGE_SELF)
+            src_stats = source.stats()
+            shard_cpu = sum(_proc_cpu(s["pid"]) for s in src_stats.get("shards", []) if s["pid"])
+            source.stop(); counts.close(); rollups.close()
+        finally:
+            sim.terminate(); sim.wait(10)
+        sent = json.loads(sent_log.read_text()) if sent_log.exists() else {}
+
+    lat = []; n_sent = 0; n_done = sum(map(len, done.values()))
+    for ip, ts in done.items():
+        s = sent.get(ip, []); n_sent += sum(1 for t in s if t <= ts[-1]) if ts else 0
+        lat += [t - s[k] for k, t in enumerate(ts) if k < len(s)]
+    cpu = (ru1.ru_utime - ru0.ru_utime) + (ru1.ru_stime - ru0.ru_stime) + shard_cpu
+    print(f"{a.cameras} cameras  source={a.source}{f' x{a.shards} processes' if a.shards else ''}  backend={a.backend}  images={'on' if a.images else 'off'}  "
+          f"rate={a.rate}/s/cam  {wall:.1f} s")
+    print(f"events      {n_done:>9,} counted   {n_done / wall:>9,.1f} ev/s   "
+          f"({max(0, n_sent - n_done)} sent but not counted, {max(0, n_done - n_sent)} counted twice)")
+    print(f"latency     p50 {_pct(lat, .5):>7.1f} ms   p95 {_pct(lat, .95):>7.1f} ms   p99 {_pct(lat, .99):>7.1f} ms   "
+          f"max {_pct(lat, 1.0):>7.1f} ms")
+    print(f"cpu         {cpu / wall * 100:>7.1f} % of one core   ({cpu:.2f} s)")
+    print(f"rss         {_rss_mb():>7.1f} MB now   {peak_rss:>7.1f} MB peak")
+    if src_stats.get("dedup"): print(f"dedup       {src_stats['dedup']}")
+    if src_stats.get("snapshots", {}).get("fetched"): print(f"snapshots   {src_stats['snapshots']}")
+
+
+if __name__ == "__main__":
+    main()
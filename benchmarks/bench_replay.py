@@ -0,0 +1,41 @@
+"""Replay recorded alertStream captures as fast as possible through parser + EventProcessor.
+
+    python -m benchmarks.bench_replay [--cameras cameras.jsonl] capture.pccap ...
+
+Captures come from settings.capture_streams (APP_DIR/captures). The output
+(alerts, counted events, IN/OUT split) is deterministic for a given set of
+captures, so it doubles as a regression check for the parser and heuristics.
+"""
+import argparse, json, tempfile, time
+from collections import Counter
+from pathlib import Path
+from domain.models import CameraConf
+from application.event_processor import EventProcessor
+from infrastructure.jsonl_counts_repo import JsonlCountsRepo
+from infrastructure.replay_event_source import ReplayEventSource
+from benchmarks.bench_load import _Cams
+
+
+def main(argv: list[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(prog="python -m benchmarks.bench_replay")
+    ap.add_argument("--cameras", help="cameras.jsonl used for direction heuristics (default: none)")
+    ap.add_argument("captures", nargs="+")
+    a = ap.parse_args(argv)
+    cams = _Cams([CameraConf.from_dict(json.loads(l)) for l in Path(a.cameras).read_text(encoding="utf-8").splitlines() if l.strip()]
+                 if a.cameras else [])
+    with tempfile.TemporaryDirectory() as d:
+        counts = JsonlCountsRepo(Path(d), fsync="none", legacy=None)
+        processor = EventProcessor(cams, counts); dirs: Counter = Counter()
+        src = ReplayEventSource(a.captures, speed=0)
+        t = time.perf_counter()
+        src.start(lambda ev: dirs.update([processor.handle(ev).direction]), lambda m: None)
+        src.wait(); counts.close()
+        dt = time.perf_counter() - t
+    st = src.stats()["replay"]
+    print(f"{st['files']} captures  {st['bytes'] / 1e6:.2f} MB  {dt:.3f} s  ({st['bytes'] / dt / 1e6:.1f} MB/s)")
+    print(f"alerts {st['alerts']}  counted {st['events']}  IN {dirs['IN']}  OUT {dirs['OUT']}  "
+          f"({st['alerts'] / dt:,.0f} alerts/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Headless people counter: cameras.jsonl -> event source -> counts, without Qt.
+
+    python -m daemon [--images] [--stats-every 60] [-v]
+
+Same wiring as MainWin (settings.json, counts backend, rollups, event source),
+with the main thread draining the EventBus instead of a GUI timer. SIGTERM /
+SIGINT stop the sources, drain what is queued and flush the repos; SIGHUP
+re-reads cameras.jsonl and reconnects only the cameras that changed.
+"""
+import argparse, logging, signal, sys, threading, time
+
+from shared.paths import ensure_dirs
+from shared.settings import load_settings
+from application.event_processor import EventProcessor
+from application.event_bus import EventBus
+from application.live_counters import LiveCounters
+from infrastructure.jsonl_camera_repo import JsonlCameraRepo
+from infrastructure.factory import make_counts_repo, make_event_source, make_image_store, make_metrics_server
+from infrastructure.rollup_store import JsonRollupStore
+from infrastructure.snapshot_links import JsonlSnapshotLinks
+from infrastructure.checkpoint_store import JsonCheckpointStore
+
+log = logging.getLogger("people_counter")
+
+
+def _log_source(msg: str) -> None:
+    # per-alert lines are chatty; keep them for -v
+    log.log(logging.DEBUG if msg.startswith("Event ") else logging.INFO, msg)
+
+
+def run(images: bool = False, stats_every: float = 60.0) -> int:
+    ensure_dirs(); st = load_settings()
+    cams = JsonlCameraRepo(); counts = make_counts_repo(st); rollups = JsonRollupStore()
+    if rollups.needs_backfill():
+        rollups.start_backfill(counts.read_range, on_done=lambda n: log.info("rollups rebuilt from %d log rows", n))
+    links = JsonlSnapshotLinks(); processor = EventProcessor(cams, counts, rollups, links); bus = EventBus()
+    image_store = make_image_store(st); image_store.add_evict_listener(links.forget); source = make_event_source(st, image_store, cams)
+    live = LiveCounters(counts, JsonCheckpointStore(), st.counters_reset); restored = live.restore()
+    log.info("counters restored (%s, %d log rows replayed in %.3f s)", restored["mode"], restored["rows"], restored["seconds"])
+    try:
+        metrics = make_metrics_server(st)
+        if metrics: log.info("metrics on http://%s:%d/metrics", *metrics.address)
+    except OSError as e:
+        metrics = None; log.warning("metrics endpoint not started: %s", e)
+
+    stop = threading.Event()
+    def on_signal(signum, frame):
+        log.info("signal %s, shutting down", signal.Signals(signum).name); stop.set()
+    signal.signal(signal.SIGTERM, on_signal); signal.signal(signal.SIGINT, on_signal)
+    reload = threading.Event()
+    if hasattr(signal, "SIGHUP"): signal.signal(signal.SIGHUP, lambda signum, frame: reload.set())
+
+    def drain() -> int:
+        b = bus.drain()
+        if not len(b): return 0
+        t = time.perf_counter()
+        for ev in b.files:
+            if live.add(ev.camera_ip, processor.handle(ev).direction, ev.when or time.time()):
+                log.info("counters reset for the new period")
+        for ev in b.images: processor.attach_image(ev)
+        for msg in b.logs: _log_source(msg)
+        bus.record_drain(len(b), time.perf_counter() - t)
+        return len(b)
+
+    if images:
+        image_store.start_purger(st.images_keep_min * 60, st.images_max_mb * 1024 * 1024, st.images_purge_s,
+                                 on_purged=lambda n: bus.post_log(f"{n} old images purged"))
+    source.start(bus.post_file, bus.post_log, bus.post_image if images else None)
+    next_stats = time.monotonic() + stats_every; next_ckpt = time.monotonic() + st.checkpoint_s
+    try:
+        while not stop.wait(st.ui_drain_ms / 1000):
+            drain()
+            if reload.is_set():
+                reload.clear(); log.info("SIGHUP: reloading cameras"); source.reconcile()
+            if time.monotonic() >= next_ckpt:
+                next_ckpt += st.checkpoint_s
+                if live.roll(): log.info("counters reset for the new period")
+                live.checkpoint()
+            if stats_every > 0 and time.monotonic() >= next_stats:
+                next_stats += stats_every
+                log.info("counts IN=%d OUT=%d total=%d  bus %s  source %s", *live.totals(), bus.stats(), source.stats())
+    finally:
+        source.stop()
+        while drain(): pass
+        live.checkpoint(); image_store.close(); counts.close(); rollups.close(); links.close()
+        if metrics: metrics.stop()
+        log.info("stopped; counts flushed (IN=%d OUT=%d total=%d)", *live.totals())
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m daemon", description="Headless people counter (no GUI).")
+    ap.add_argument("--images", action="store_true", help="also fetch event snapshots into the image store")
+    ap.add_argument("--stats-every", type=float, default=60.0, metavar="S", help="log counters every S seconds (0 = never)")
+    ap.add_argument("-v", "--verbose", action="store_true", help="log every camera event")
+    a = ap.parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if a.verbose else logging.INFO,
+                        format="%(asctime)s %(levelname)s %(message)s", stream=sys.stderr)
+    return run(images=a.images, stats_every=a.stats_every)
+
+
+if __name__ == "__main__": sys.exit(main())
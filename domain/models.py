@@ -31,6 +31,10 @@ class CameraConf:
             "scheme": self.scheme,       # NEW
         }
 
+    def connection(self) -> tuple:
+        """What the camera's streams depend on; edits elsewhere (name, direction, hint) need no reconnect."""
+        return (self.ip, self.scheme, self.login, self.password, getattr(self, "snap_channel", 101), self.enabled)
+
     @staticmethod
     def from_dict(d: dict) -> "CameraConf":
         return CameraConf(
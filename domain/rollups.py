@@ -0,0 +1,53 @@
+# domain/rollups.py
+from datetime import datetime
+from typing import Iterator, Literal
+
+Granularity = Literal["minute", "hour", "day"]
+GRANULARITIES: tuple[Granularity, ...] = ("minute", "hour", "day")
+
+
+def bucket_start(ts: float, g: Granularity) -> int:
+    """Start of the local-time bucket containing ts."""
+    if g == "minute": return int(ts // 60 * 60)
+    dt = datetime.fromtimestamp(ts)
+    if g == "hour": return int(dt.replace(minute=0, second=0, microsecond=0).timestamp())
+    if g == "day": return int(dt.replace(hour=0, minute=0, second=0, microsecond=0).timestamp())
+    raise ValueError(f"unknown granularity: {g!r}")
+
+
+def next_bucket(start: int, g: Granularity) -> int:
+    if g == "minute": return start + 60
+    if g == "hour": return start + 3600
+    return bucket_start(start + 36 * 3600, "day")   # lands inside the next day even across DST
+
+
+def ceil_bucket(ts: float, g: Granularity) -> int:
+    s = bucket_start(ts, g)
+    return s if s >= ts else next_bucket(s, g)
+
+
+def bucket_range(a: float, b: float, g: Granularity) -> Iterator[int]:
+    """Bucket starts s with a <= s < b."""
+    s = ceil_bucket(a, g)
+    while s < b:
+        yield s; s = next_bucket(s, g)
+
+
+def cover(t0: float, t1: float) -> list[tuple[Granularity, int, int]]:
+    """Split [t0, t1) (minute resolution) into the fewest whole buckets.
+
+    Whole days are taken from the day rollup, the edges from hours and the
+    remaining edges from minutes, so a month-long total touches ~30 + 2*24 +
+    2*60 buckets per series instead of every event.
+    """
+    spans = [(ceil_bucket(t0, "minute"), ceil_bucket(t1, "minute"))]
+    out: list[tuple[Granularity, int, int]] = []
+    for g in ("day", "hour"):
+        rest = []
+        for a, b in spans:
+            c, e = ceil_bucket(a, g), bucket_start(b, g)
+            if c < e: out.append((g, c, e)); rest += [(a, c), (e, b)]
+            else: rest.append((a, b))
+        spans = [(a, b) for a, b in rest if a < b]
+    out += [("minute", a, b) for a, b in spans]
+    return out
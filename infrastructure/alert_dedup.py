@@ -0,0 +1,55 @@
+from collections import OrderedDict
+from typing import Hashable
+
+
+class AlertDedup:
+    """Drops repeated alerts of one camera, keyed per channel and rule.
+
+    A retransmit repeats its alert byte for byte, so only an exact repeat of
+    an accepted alert's body (AlertEvent.payload), on the same channel, event
+    and rule, is a duplicate. When the body carries the camera's dateTime,
+    repeats are dropped for `window_s`, however late they arrive in that
+    window. Without a dateTime, distinct events can be identical, so repeats
+    are only merged for `burst_s`. No single field is trusted as an event id.
+    dateTime has one-second resolution, and activePostCount is a global
+    counter on some firmware but per alarm (often always 1) on other
+    firmware. The one ambiguous case is two events in the same second whose
+    bodies are identical: they cannot be told from a retransmit and count
+    once. Keys live in an insertion-ordered dict bounded by `max_keys`,
+    expired from the front, so memory is constant whatever the event rate.
+    """
+
+    def __init__(self, window_s: float = 60.0, burst_s: float = 0.5, max_keys: int = 4096):
+        self.window_s = window_s; self.burst_s = burst_s; self.max_keys = max_keys
+        self._seen: OrderedDict[Hashable, float] = OrderedDict()     # key -> expiry time
+        self.stats = {"accepted": 0, "duplicate": 0, "burst": 0, "evicted": 0}
+
+    def accept(self, channel: int | None, event: str, rule: str, date_time: str, payload: Hashable, now: float) -> bool:
+        """True if the alert is new (and remembers it), False for a duplicate."""
+        seen = self._seen
+        while seen:                                  # expire from the oldest insert
+            k, exp = next(iter(seen.items()))
+            if exp > now: break
+            del seen[k]
+        key = (channel, event, rule, payload); ided = bool(date_time)
+        exp = seen.get(key)
+        if exp is not None and exp > now:
+            self.stats["duplicate" if ided else "burst"] += 1
+            return False
+        if exp is not None: del seen[key]
+        seen[key] = now + (self.window_s if ided else self.burst_s)
+        if len(seen) > self.max_keys: seen.popitem(last=False); self.stats["evicted"] += 1
+        self.stats["accepted"] += 1
+        return True
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+
+def merge_stats(dedups) -> dict:
+    """Summed stats of several AlertDedup instances, plus the keys they hold."""
+    out = {"accepted": 0, "duplicate": 0, "burst": 0, "evicted": 0, "keys": 0}
+    for d in dedups:
+        for k, v in d.stats.items(): out[k] += v
+        out["keys"] += len(d)
+    return out
@@ -0,0 +1,166 @@
+import re
+from typing import NamedTuple
+
+
+# Ignore noisy/periodic event types and only act on 'active' (start) events
+NOISY = {
+    "VIDEOLOSS", "MOTION", "VMD", "SCENECHANGEDETECTION",
+    "DEFOCUSDETECTION", "AUDIOEXCEPTION", "SHELTERALARM",
+    "ALARMINPUT", "HOSTALARM", "VIDEOMISMATCH",
+}
+
+
+def token_from_event_type(et: bytes | str) -> str:
+    """Map many vendor event names down to a few canonical tokens."""
+    if isinstance(et, bytes):
+        e = et.decode(errors="ignore").lower()
+    else:
+        e = str(et).lower()
+    if "line" in e and ("cross" in e or "detect" in e):
+        return "LINE_CROSSING_DETECTION"
+    if "regionentrance" in e or ("region" in e and "entrance" in e):
+        return "REGION_ENTRANCE"
+    if "intrusion" in e:
+        return "INTRUSION"
+    if "motion" in e or "vmd" in e:
+        return "MOTION"
+    return e.upper()
+
+
+class AlertEvent(NamedTuple):
+    event_type: str          # lower-cased, e.g. "linedetection"
+    state: str               # lower-cased, "active" when the camera omits it
+    channel: int | None
+    date_time: str           # camera-side timestamp, verbatim
+    rule: str = ""           # regionID of smart events (line / region rules), when present
+    payload: int = 0         # hash of the whole alert body: a retransmit repeats it byte for byte
+
+
+# One pass over an alert body picks up every field we care about.
+_FIELDS = re.compile(rb"<(eventType|eventState|channelID|dynChannelID|dateTime|regionID)>\s*([^<]*?)\s*</", re.IGNORECASE)
+_BOUNDARY = re.compile(r'boundary="?([^";]+)"?', re.IGNORECASE)
+_ALERT_END = b"</EventNotificationAlert>"
+
+
+def parse_alert(blob: bytes | bytearray) -> AlertEvent | None:
+    """Extract eventType/eventState/channelID/dateTime/regionID from one EventNotificationAlert, plus its hash."""
+    vals: dict[bytes, bytes] = {}
+    for m in _FIELDS.finditer(blob):
+        vals.setdefault(m.group(1).lower(), m.group(2))
+    et = vals.get(b"eventtype")
+    if not et: return None
+    ch = vals.get(b"channelid") or vals.get(b"dynchannelid")
+    return AlertEvent(
+        event_type=et.decode(errors="ignore").lower(),
+        state=vals.get(b"eventstate", b"active").decode(errors="ignore").lower() or "active",
+        channel=int(ch) if ch and ch.isdigit() else None,
+        date_time=vals.get(b"datetime", b"").decode(errors="ignore"),
+        rule=vals.get(b"regionid", b"").decode(errors="ignore"),
+        payload=hash(bytes(blob).strip()),
+    )
+
+
+def classify(a: AlertEvent, dedup, now: float, counters: dict | None = None) -> str | None:
+    """The count token if the alert should be counted, else None; one decision shared by every source.
+
+    Noisy types and non-active states are "filtered", repeats rejected by
+    `dedup` (an AlertDedup) are "duplicate", the rest "counted". `counters`
+    maps those outcomes to metric children (ALERTS.labels(ip, outcome)).
+    """
+    token = token_from_event_type(a.event_type)
+    if token in NOISY or a.state != "active": outcome = "filtered"
+    elif not dedup.accept(a.channel, token, a.rule, a.date_time, a.payload, now): outcome = "duplicate"
+    else: outcome = "counted"
+    if counters: counters[outcome].inc()
+    return token if outcome == "counted" else None
+
+
+class AlertStreamParser:
+    """Incremental parser for the ISAPI alertStream (multipart/mixed of XML alerts).
+
+    Bytes are appended to one bytearray and consumed through an offset, and
+    every search resumes where the previous one stopped, so the cost is linear
+    in the stream length no matter how the chunks are split. Parts with a
+    Content-Length are sliced without scanning their body; image parts are
+    skipped. Streams without multipart framing fall back to splitting on
+    </EventNotificationAlert>.
+    """
+
+    def __init__(self, content_type: str | None = None):
+        self._buf = bytearray()
+        self._pos = 0                  # start of unconsumed data
+        self._scan = 0                 # where the next delimiter search resumes
+        m = _BOUNDARY.search(content_type or "")
+        self._delim: bytes | None = b"--" + m.group(1).strip().encode() if m else None
+        self._mode: str | None = "multipart" if self._delim else None
+        self._need: int | None = None  # remaining body bytes of a part with Content-Length
+        self._in_body = False          # inside a part without Content-Length
+        self._skip = False             # current part is not XML (e.g. image/jpeg)
+        self.stats = {"bytes": 0, "parts": 0, "events": 0}
+
+    def feed(self, chunk: bytes) -> list[AlertEvent]:
+        self._buf += chunk; self.stats["bytes"] += len(chunk)
+        if self._mode is None and not self._detect(): return []
+        out: list[AlertEvent] = []
+        if self._mode == "multipart": self._multipart(out)
+        else: self._xml(out)
+        if self._pos > 65536 or self._pos * 2 > len(self._buf):
+            del self._buf[:self._pos]; self._scan = max(0, self._scan - self._pos); self._pos = 0
+        return out
+
+    # ---------- Internals ----------
+
+    def _detect(self) -> bool:
+        head = self._buf.lstrip()
+        if len(head) < 2: return False
+        if head.startswith(b"--"):
+            eol = head.find(b"\r\n")
+            if eol < 0: return False
+            self._delim = bytes(head[:eol]).strip(); self._mode = "multipart"
+        else:
+            self._mode = "xml"
+        return True
+
+    def _emit(self, body: bytearray, out: list[AlertEvent]) -> None:
+        self.stats["parts"] += 1
+        if self._skip: return
+        ev = parse_alert(body)
+        if ev: self.stats["events"] += 1; out.append(ev)
+
+    def _multipart(self, out: list[AlertEvent]) -> None:
+        buf, delim = self._buf, self._delim
+        while True:
+            if self._need is not None:
+                if len(buf) - self._pos < self._need: return
+                end = self._pos + self._need
+                self._emit(buf[self._pos:end], out)
+                self._pos = self._scan = end; self._need = None
+                continue
+            if self._in_body:
+                k = buf.find(delim, self._scan)
+                if k < 0: self._scan = max(self._pos, len(buf) - len(delim)); return
+                self._emit(buf[self._pos:k], out)
+                self._pos = self._scan = k; self._in_body = False
+                continue
+            j = buf.find(delim, self._scan)
+            if j < 0:   # junk between parts (CRLFs, closing "--"); keep a possible partial delimiter
+                self._pos = self._scan = max(self._pos, len(buf) - len(delim)); return
+            h = buf.find(b"\r\n\r\n", j)
+            if h < 0: self._pos = self._scan = j; return
+            headers = bytes(buf[j:h]).lower()
+            self._skip = b"content-type:" in headers and b"xml" not in headers
+            self._pos = self._scan = h + 4
+            i = headers.find(b"content-length:")
+            if i >= 0:
+                try: self._need = int(headers[i+15:].split(b"\r\n", 1)[0].strip())
+                except ValueError: self._need = None
+            if self._need is None: self._in_body = True
+
+    def _xml(self, out: list[AlertEvent]) -> None:
+        buf = self._buf
+        while True:
+            k = buf.find(_ALERT_END, self._scan)
+            if k < 0: self._scan = max(self._pos, len(buf) - len(_ALERT_END)); return
+            end = k + len(_ALERT_END)
+            self._emit(buf[self._pos:end], out)
+            self._pos = self._scan = end
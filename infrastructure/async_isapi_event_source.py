@@ -0,0 +1,273 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable
+
+from domain.models import FileEvent, CameraConf
+from shared.metrics import ALERTS, PARSE_SECONDS, RECONNECTS
+from application.ports import EventSource, ImageStore
+from .alert_stream_parser import AlertEvent, AlertStreamParser, classify
+from .alert_dedup import AlertDedup, merge_stats
+from .digest import DigestAuth
+from .reconnect import DOWN, STALL_S, CameraLink
+from .snapshot_pipeline import SnapshotStats
+from .stream_capture import CaptureWriter, capture_path
+
+CONNECT_TIMEOUT = 5
+SNAP_QUEUE      = 4      # pending snapshots per camera; the oldest is dropped beyond this
+
+
+def _host_port(ip: str) -> tuple[str, int]:
+    host, _, port = ip.partition(":")
+    return host, int(port) if port else 80
+
+
+class _HttpError(Exception):
+    pass
+
+
+async def _read_head(reader: asyncio.StreamReader) -> tuple[int, dict[str, str]]:
+    status_line = await reader.readline()
+    parts = status_line.split(None, 2)
+    if len(parts) < 2 or not parts[0].startswith(b"HTTP/"): raise _HttpError(f"bad status line {status_line[:60]!r}")
+    headers: dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""): break
+        k, _, v = line.decode("latin-1").partition(":")
+        headers[k.strip().lower()] = v.strip()
+    return int(parts[1]), headers
+
+
+async def _body(reader: asyncio.StreamReader, headers: dict[str, str], timeout: float):
+    """Yield body chunks: chunked transfer-encoding, Content-Length or read-until-close."""
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        while True:
+            size = int((await asyncio.wait_for(reader.readline(), timeout)).split(b";")[0].strip() or b"0", 16)
+            if size == 0: return
+            yield await asyncio.wait_for(reader.readexactly(size), timeout)
+            await reader.readline()
+    elif "content-length" in headers:
+        left = int(headers["content-length"])
+        while left > 0:
+            b = await asyncio.wait_for(reader.read(min(left, 65536)), timeout)
+            if not b: raise _HttpError("connection closed mid-body")
+            left -= len(b); yield b
+    else:
+        while True:
+            b = await asyncio.wait_for(reader.read(4096), timeout)
+            if not b: return
+            yield b
+
+
+class AsyncIsapiEventSource(EventSource):
+    """All alertStream connections multiplexed on one asyncio loop in one thread.
+
+    Every camera is a coroutine on non-blocking sockets (digest auth with a
+    cached nonce, reconnect with CameraLink backoff). Counts are emitted as soon as the
+    alert is parsed; snapshots go through a bounded per-camera queue served
+    by a separate task and are delivered later through on_image. Callbacks
+    are only ever called from the loop thread, which makes that thread the
+    single hand-off channel to the UI.
+    """
+
+    def __init__(self, image_store: ImageStore, cam_repo, capture_dir: Path | None = None):
+        self._image_store = image_store
+        self._repo = cam_repo
+        self._capture_dir = capture_dir     # record raw alertStream bytes here (see stream_capture)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self._cams: dict[str, tuple[CameraConf, asyncio.Task]] = {}    # ip -> (config, camera task); loop thread only
+        self._halt: asyncio.Event | None = None
+        self._snap_stats = SnapshotStats()
+        self._dedup: dict[str, AlertDedup] = {}
+        self._links: dict[str, CameraLink] = {}
+
+    # ---------- EventSource ----------
+
+    def start(self, on_file: Callable[[FileEvent], None], on_log: Callable[[str], None],
+              on_image: Callable[[FileEvent], None] | None = None) -> None:
+        if self.is_running():
+            on_log("ISAPI already running")
+            return
+        self._on_file, self._on_log, self._on_image = on_file, on_log, on_image
+        self._snap_stats = SnapshotStats(); self._dedup = {}; self._links = {}
+        cams = [c for c in self._repo.load_all() if getattr(c, "enabled", True)]
+        self._loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(cams, ready), name="isapi-async", daemon=True)
+        self._thread.start(); ready.wait(5)
+        on_log(f"ISAPI started for {len(cams)} cameras (asyncio)")
+
+    def stop(self) -> None:
+        loop, th = self._loop, self._thread
+        if loop is None or th is None: return
+        loop.call_soon_threadsafe(lambda: self._halt and self._halt.set())
+        th.join(3)
+        self._loop = self._thread = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def stats(self) -> dict:
+        return {"snapshots": self._snap_stats.snapshot(), "dedup": merge_stats(list(self._dedup.values())),
+                "links": {ip: link.snapshot() for ip, link in list(self._links.items())}}
+
+    def reconcile(self) -> None:
+        """Diff the repo against the running cameras (applied on the loop): new ones start, removed or
+        disabled ones stop, ones with changed connection settings restart (keeping their dedup and link state);
+        the rest keep their streams."""
+        loop = self._loop
+        if loop is None or not self.is_running(): return
+        want = {c.ip: c for c in self._repo.load_all() if getattr(c, "enabled", True)}
+        loop.call_soon_threadsafe(self._apply, want)
+
+    def _apply(self, want: dict[str, CameraConf]) -> None:
+        have = self._cams
+        kept = {ip for ip, (c, _) in have.items() if ip in want and want[ip].connection() == c.connection()}
+        for ip in kept: have[ip] = (want[ip], have[ip][1])
+        removed = len(have.keys() - want.keys()); added = len(want.keys() - have.keys())
+        for ip, (_, task) in list(have.items()):
+            if ip in kept: continue
+            task.cancel(); del have[ip]
+            if ip not in want: self._dedup.pop(ip, None); self._links.pop(ip, None)
+        for ip, cam in want.items():
+            if ip not in kept: self._start_camera(cam)
+        changed = len(want) - len(kept) - added
+        if added or removed or changed:
+            self._on_log(f"ISAPI reconciled: {added} started, {changed} restarted, {removed} stopped, {len(kept)} untouched")
+
+    # ---------- Loop ----------
+
+    def _run(self, cams: list[CameraConf], ready: threading.Event) -> None:
+        loop = self._loop
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(self._main(cams, ready))
+        finally:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+
+    async def _main(self, cams: list[CameraConf], ready: threading.Event) -> None:
+        self._halt = asyncio.Event(); self._cams = {}
+        for cam in cams: self._start_camera(cam)
+        ready.set()
+        await self._halt.wait()
+        for t in list(self._tasks): t.cancel()
+        await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def _start_camera(self, cam: CameraConf) -> None:
+        self._cams[cam.ip] = (cam, self._spawn(self._camera(cam)))
+
+    def _spawn(self, coro) -> asyncio.Task:
+        t = self._loop.create_task(coro)
+        self._tasks.add(t); t.add_done_callback(self._tasks.discard)
+        return t
+
+    async def _get(self, cam: CameraConf, auth: DigestAuth, path: str, timeout: float):
+        """Open a GET, answering one digest challenge; returns (reader, writer, headers)."""
+        host, port = _host_port(cam.ip)
+        for attempt in range(2):
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), CONNECT_TIMEOUT)
+            try:
+                lines = [f"GET {path} HTTP/1.1", f"Host: {cam.ip}", "Connection: close"]
+                h = auth.header("GET", path)
+                if h: lines.append(f"Authorization: {h}")
+                writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+                await writer.drain()
+                status, headers = await asyncio.wait_for(_read_head(reader), timeout)
+            except BaseException:
+                writer.close(); raise
+            if status == 401 and attempt == 0 and auth.challenge(headers.get("www-authenticate", "")):
+                writer.close(); continue
+            if status >= 400:
+                writer.close(); raise _HttpError(f"HTTP {status} for {path}")
+            return reader, writer, headers
+        raise _HttpError(f"HTTP 401 for {path}")
+
+    async def _camera(self, cam: CameraConf) -> None:
+        auth = DigestAuth(cam.login, cam.password)
+        snaps: deque = deque(maxlen=SNAP_QUEUE); wake = asyncio.Event()
+        snap_task = self._spawn(self._snapshots(cam, snaps, wake))
+        capture = CaptureWriter(capture_path(self._capture_dir, cam.ip), cam.ip) if self._capture_dir else None
+        try:
+            await self._alert_stream(cam, auth, snaps, wake, capture)
+        finally:
+            snap_task.cancel()
+            if capture: capture.close()
+
+    async def _alert_stream(self, cam: CameraConf, auth: DigestAuth, snaps: deque, wake: asyncio.Event,
+                            capture: CaptureWriter | None) -> None:
+        dedup = self._dedup.setdefault(cam.ip, AlertDedup())   # kept across reconnects
+        counters = {k: ALERTS.labels(cam.ip, k) for k in ("counted", "filtered", "duplicate")}
+        link = self._links.get(cam.ip) or self._links.setdefault(cam.ip, CameraLink(cam.ip))
+        while True:
+            writer = None
+            try:
+                # the read timeout doubles as stall detection: cameras send heartbeats well within STALL_S
+                reader, writer, headers = await self._get(cam, auth, "/ISAPI/Event/notification/alertStream", STALL_S)
+                link.connected(); self._on_log(f"ISAPI connected: {cam.ip} (HTTP)")
+                parser = AlertStreamParser(headers.get("content-type"))
+                if capture: capture.connect(headers.get("content-type"))
+                async for chunk in _body(reader, headers, STALL_S):
+                    link.data()
+                    if capture: capture.data(chunk)
+                    t = time.perf_counter(); alerts = parser.feed(chunk); PARSE_SECONDS.observe(time.perf_counter() - t)
+                    for a in alerts:
+                        self._handle_alert(cam, a, dedup, counters, snaps, wake)
+                error = "stream closed"
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = repr(e)
+            finally:
+                if writer is not None: writer.close()
+            delay = link.failed(error); RECONNECTS.labels(cam.ip).inc()
+            down = " (camera down)" if link.state == DOWN else ""
+            self._on_log(f"ISAPI stream error {cam.ip}: {error}; retrying in {delay:.0f}s{down}")
+            await asyncio.sleep(delay)
+
+    def _handle_alert(self, cam: CameraConf, a: AlertEvent, dedup: AlertDedup, counters: dict, snaps: deque,
+                      wake: asyncio.Event) -> None:
+        self._on_log(f"Event {cam.ip}: eventType={a.event_type}, state={a.state}")
+        now = time.time(); token = classify(a, dedup, now, counters)
+        if token is None: return
+        ch = a.channel if a.channel is not None else getattr(cam, "snap_channel", 101)
+        self._on_file(FileEvent(path="", camera_ip=cam.ip, raw_name=token, when=now))
+        if self._on_image is None: return
+        st = self._snap_stats
+        if len(snaps) == snaps.maxlen: st.dropped += 1; st.queued -= 1
+        snaps.append((ch, token, now)); st.queued += 1; wake.set()
+
+    # ---------- Snapshots ----------
+
+    async def _snapshots(self, cam: CameraConf, snaps: deque, wake: asyncio.Event) -> None:
+        """Per-camera consumer: one fetch in flight, oldest-first, with its own digest state."""
+        auth = DigestAuth(cam.login, cam.password)
+        while True:
+            await wake.wait(); wake.clear()
+            while snaps:
+                ch, token, when = snaps.popleft(); self._snap_stats.queued -= 1
+                t = time.monotonic()
+                dest = await self._snapshot(cam, auth, ch, token)
+                self._snap_stats.fetch_done(time.monotonic() - t, bool(dest))
+                if dest and self._on_image:
+                    self._on_image(FileEvent(path=dest, camera_ip=cam.ip, raw_name=f"{token}.jpg", when=when))
+
+    async def _snapshot(self, cam: CameraConf, auth: DigestAuth, ch: int, token: str) -> str:
+        path = f"/ISAPI/Streaming/channels/{int(ch)}/picture?snapShotImageType=JPEG"
+        writer = None
+        try:
+            reader, writer, headers = await self._get(cam, auth, path, 10)
+            data = b"".join([b async for b in _body(reader, headers, 10)])
+            return await self._loop.run_in_executor(None, self._image_store.store, [data], cam.ip, f"{token}.jpg") if data else ""
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._on_log(f"Snapshot error {cam.ip}: {e!r}")
+            return ""
+        finally:
+            if writer is not None: writer.close()
@@ -0,0 +1,91 @@
+import os, threading, time
+from pathlib import Path
+from typing import Literal
+
+FsyncPolicy = Literal["none", "interval", "batch"]
+
+
+class BufferedAppender:
+    """Write-behind line appender: one open handle, flushed in batches.
+
+    Lines are buffered in memory and written when `batch_rows` accumulate or
+    when the oldest pending line is `flush_interval` seconds old (a daemon
+    thread takes care of the time-based case). Durability after a write:
+      "none"     - leave it to the OS page cache
+      "interval" - fsync at most every `fsync_interval` seconds
+      "batch"    - fsync after every batch
+    """
+
+    def __init__(self, path: Path, batch_rows: int = 256, flush_interval: float = 0.5,
+                 fsync: FsyncPolicy = "interval", fsync_interval: float = 1.0):
+        if fsync not in ("none", "interval", "batch"):
+            raise ValueError(f"unknown fsync policy: {fsync!r}")
+        self.path = Path(path)
+        self.batch_rows = max(1, int(batch_rows))
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._pending: list[bytes] = []
+        self._first_pending_at = 0.0
+        self._f = None
+        self._dirty = False              # written but not fsynced yet
+        self._synced_at = time.monotonic()
+        self._closed = False
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"appender:{self.path.name}", daemon=True)
+        self.stats = {"rows": 0, "batches": 0, "fsyncs": 0}
+        self._thread.start()
+
+    # ---------- Public ----------
+
+    def write(self, line: str) -> None:
+        with self._lock:
+            if self._closed: raise ValueError("appender is closed")
+            if not self._pending: self._first_pending_at = time.monotonic()
+            self._pending.append(line.encode("utf-8"))
+            self.stats["rows"] += 1
+            if len(self._pending) >= self.batch_rows: self._flush_locked()
+
+    def flush(self, sync: bool = False) -> None:
+        with self._lock:
+            self._flush_locked()
+            if sync and self._dirty: self._sync_locked()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed: return
+            self._flush_locked()
+            if self._dirty and self.fsync != "none": self._sync_locked()
+            self._closed = True
+            if self._f: self._f.close(); self._f = None
+        self._wake.set(); self._thread.join(2)
+
+    # ---------- Internals ----------
+
+    def _flush_locked(self) -> None:
+        if not self._pending: return
+        if self._f is None: self._f = self.path.open("ab")
+        self._f.write(b"".join(self._pending)); self._f.flush()
+        self._pending.clear(); self._dirty = True
+        self.stats["batches"] += 1
+        if self.fsync == "batch" or (self.fsync == "interval" and
+                                     time.monotonic() - self._synced_at >= self.fsync_interval):
+            self._sync_locked()
+
+    def _sync_locked(self) -> None:
+        os.fsync(self._f.fileno())
+        self._dirty = False; self._synced_at = time.monotonic()
+        self.stats["fsyncs"] += 1
+
+    def _run(self) -> None:
+        tick = max(0.01, min(self.flush_interval, self.fsync_interval) / 2)
+        while not self._wake.wait(tick):
+            with self._lock:
+                if self._closed: return
+                now = time.monotonic()
+                if self._pending and now - self._first_pending_at >= self.flush_interval:
+                    self._flush_locked()
+                if (self._dirty and self.fsync == "interval"
+                        and now - self._synced_at >= self.fsync_interval):
+                    self._sync_locked()
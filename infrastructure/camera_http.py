@@ -0,0 +1,212 @@
+import socket, threading, time, weakref
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import AuthBase
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NameResolutionError, NewConnectionError
+
+from domain.models import CameraConf
+from .digest import DigestAuth
+
+
+class SharedDigestAuth(AuthBase):
+    """requests auth over digest.DigestAuth, one cached nonce for every thread.
+
+    requests' HTTPDigestAuth keeps its nonce and nc in a threading.local, so
+    each snapshot thread would pay its own 401. Here signing and re-challenging
+    happen under one lock; a 401 refreshes the challenge and the request is
+    resent once.
+    """
+
+    def __init__(self, user: str, password: str):
+        self._auth = DigestAuth(user, password); self._lock = threading.Lock()
+
+    def _sign(self, r: requests.PreparedRequest) -> None:
+        with self._lock: h = self._auth.header(r.method, r.path_url)
+        if h: r.headers["Authorization"] = h
+
+    def __call__(self, r: requests.PreparedRequest) -> requests.PreparedRequest:
+        self._sign(r); r.register_hook("response", self._on_response)
+        return r
+
+    def _on_response(self, r: requests.Response, **kw) -> requests.Response:
+        if r.status_code != 401 or getattr(r.request, "_digest_retry", False): return r
+        with self._lock: ok = self._auth.challenge(r.headers.get("www-authenticate", ""))
+        if not ok: return r
+        r.content; r.close()                    # drain, so the connection goes back to the pool
+        prep = r.request.copy(); prep._digest_retry = True; self._sign(prep)
+        again = r.connection.send(prep, **kw)
+        again.history.append(r); again.request = prep
+        return again
+
+
+# ---------- Abortable connections ----------
+
+class SocketGuard:
+    """Every socket a session opens, so another thread can abort whatever the session is blocked on.
+
+    Sockets are registered before connect(), so `abort` interrupts a pending
+    connect, a wait for response headers and a body read alike (shutdown()
+    wakes them; close() alone does not). After `abort` new connections fail
+    at once. Sockets are held weakly and vanish when http.client drops them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock(); self._socks: weakref.WeakSet = weakref.WeakSet(); self.aborted = False
+
+    def add(self, sock: socket.socket) -> None:
+        with self._lock:
+            if not self.aborted: self._socks.add(sock); return
+        sock.close(); raise ConnectionAbortedError("connection aborted")
+
+    def abort(self) -> None:
+        with self._lock: self.aborted = True; socks = list(self._socks)
+        for s in socks:
+            try: s.shutdown(socket.SHUT_RDWR)
+            except OSError: pass
+
+
+def _connect(guard: SocketGuard, address: tuple[str, int], timeout, source_address, options) -> socket.socket:
+    """socket.create_connection, registering each socket with `guard` before it connects."""
+    host, port = address; err: OSError | None = None
+    for af, kind, proto, _, sa in socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM):
+        sock = socket.socket(af, kind, proto); guard.add(sock)
+        try:
+            for opt in options or (): sock.setsockopt(*opt)
+            if timeout is None or isinstance(timeout, (int, float)): sock.settimeout(timeout)
+            if source_address: sock.bind(source_address)
+            sock.connect(sa)
+            return sock
+        except OSError as e:
+            sock.close(); err = e
+    raise err or OSError(f"no address for {host}")
+
+
+class _Guarded:
+    """urllib3 connection mixin that registers its sockets (plain and TLS-wrapped) with `guard`."""
+    guard: SocketGuard
+
+    def _new_conn(self) -> socket.socket:     # urllib3's, with _connect in place of create_connection
+        try:
+            return _connect(self.guard, (self._dns_host, self.port), self.timeout, self.source_address, self.socket_options)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        except socket.timeout as e:
+            raise ConnectTimeoutError(self, f"Connection to {self.host} timed out. (connect timeout={self.timeout})") from e
+        except OSError as e:
+            raise NewConnectionError(self, f"Failed to establish a new connection: {e}") from e
+
+    def connect(self) -> None:
+        super().connect()
+        if self.sock is not None: self.guard.add(self.sock)
+
+
+class GuardedAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections all report to one SocketGuard."""
+
+    def __init__(self, guard: SocketGuard, **kw):
+        self.guard = guard; super().__init__(**kw)
+
+    def init_poolmanager(self, *args, **kw) -> None:
+        super().init_poolmanager(*args, **kw)
+        pools = {}
+        for scheme, pool, conn in (("http", HTTPConnectionPool, HTTPConnection), ("https", HTTPSConnectionPool, HTTPSConnection)):
+            cls = type(f"Guarded{conn.__name__}", (_Guarded, conn), {"guard": self.guard})
+            pools[scheme] = type(f"Guarded{pool.__name__}", (pool,), {"ConnectionCls": cls})
+        self.poolmanager.pool_classes_by_scheme = pools
+
+
+class CameraHttp:
+    """Keep-alive HTTP sessions owned by one camera.
+
+    The alertStream and the snapshots get separate sessions (and connection
+    pools of `stream_pool` / `snapshot_pool` connections), so a long-lived
+    stream never holds up a picture. Both sessions share one SharedDigestAuth,
+    which caches the nonce and counts nc across threads, so after the
+    camera's first challenge every request, from whichever snapshot thread,
+    is signed up front instead of paying a 401 round trip.
+    """
+
+    def __init__(self, cam: CameraConf, stream_pool: int = 1, snapshot_pool: int = 2):
+        self.cam = cam
+        self.auth = SharedDigestAuth(cam.login, cam.password)
+        self.stream_guard = SocketGuard(); self.snapshot_guard = SocketGuard()
+        self.stream = self._session(stream_pool, self.stream_guard)
+        self.snapshots = self._session(snapshot_pool, self.snapshot_guard)
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "new_connections": 0, "challenges": 0,
+                       "cold_n": 0, "cold_s": 0.0, "warm_n": 0, "warm_s": 0.0}
+
+    def _session(self, pool: int, guard: SocketGuard) -> requests.Session:
+        s = requests.Session()
+        s.auth = self.auth
+        a = GuardedAdapter(guard, pool_connections=1, pool_maxsize=pool)
+        s.mount("http://", a); s.mount("https://", a)
+        return s
+
+    def _connections(self, s: requests.Session) -> int:
+        adapters = {id(a): a for a in s.adapters.values()}.values()
+        return sum(getattr(a.poolmanager.pools[k], "num_connections", 0)
+                   for a in adapters for k in a.poolmanager.pools.keys())
+
+    @contextmanager
+    def get(self, session: requests.Session, url: str, **kw):
+        """session.get as a context manager, recording connection reuse and digest challenges."""
+        before = self._connections(session); t = time.monotonic()
+        with session.get(url, **kw) as r:
+            try: yield r
+            finally:
+                dt = time.monotonic() - t
+                cold = self._connections(session) > before or any(h.status_code == 401 for h in r.history)
+                with self._lock:
+                    st = self._stats
+                    st["requests"] += 1
+                    st["new_connections"] += self._connections(session) > before
+                    st["challenges"] += sum(h.status_code == 401 for h in r.history)
+                    if session is self.snapshots:
+                        k = "cold" if cold else "warm"; st[k + "_n"] += 1; st[k + "_s"] += dt
+
+    def stats(self) -> dict:
+        with self._lock: return dict(self._stats)
+
+    def abort_stream(self) -> None:
+        """From any thread: fail the stream session's connect, header wait or read now, and every later one."""
+        self.stream_guard.abort()
+
+    def abort(self) -> None:
+        """abort_stream for both sessions: whatever this camera's requests are blocked on fails now."""
+        self.stream_guard.abort(); self.snapshot_guard.abort()
+
+    def close(self) -> None:
+        self.stream.close(); self.snapshots.close()
+
+
+def iter_arrived(r: requests.Response, size: int = 4096):
+    """Yield body bytes as soon as they arrive (at most `size` at a time).
+
+    `iter_content(size)` on a non-chunked body blocks until `size` bytes are
+    buffered, which holds a short alert back until the next heartbeat.
+    """
+    raw = r.raw
+    if getattr(raw, "chunked", False) or not hasattr(raw, "read1"):
+        yield from r.iter_content(size); return     # chunked reads already return per chunk
+    while b := raw.read1(size):
+        yield b
+
+
+def summarize(per_camera: list[dict]) -> dict:
+    """Fold CameraHttp.stats() of many cameras into reuse ratio and snapshot time saved."""
+    tot: dict = {}
+    for st in per_camera:
+        for k, v in st.items(): tot[k] = tot.get(k, 0) + v
+    if not tot: return {}
+    req = tot["requests"] or 1
+    cold = tot["cold_s"] / tot["cold_n"] if tot["cold_n"] else 0.0
+    warm = tot["warm_s"] / tot["warm_n"] if tot["warm_n"] else 0.0
+    return {"requests": tot["requests"], "connection_reuse": round(1 - tot["new_connections"] / req, 3),
+            "digest_challenges": tot["challenges"],
+            "snapshot_cold_ms": round(cold * 1000, 1), "snapshot_warm_ms": round(warm * 1000, 1),
+            "snapshot_saved_s": round(max(0.0, cold - warm) * tot["warm_n"], 2) if tot["cold_n"] else 0.0}
@@ -0,0 +1,126 @@
+import re, threading, time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Iterable
+
+import requests
+
+from domain.models import CameraConf
+from .camera_http import CameraHttp
+
+PROBE_TIMEOUT_S = 3.0       # budget per camera for all its checks
+MIN_STEP_S = 0.5           # floor for a step's (connect, read) timeout when little budget is left
+PROBE_WORKERS = 128         # cameras probed at once; threads mostly wait on sockets
+JPEG_MAGIC = b"\xff\xd8"
+
+# check outcomes
+OK, FAIL, SKIPPED = "ok", "fail", "skipped"
+
+
+@dataclass
+class ProbeResult:
+    """Outcome of one camera's self-test; `checks` maps auth / stream / snapshot to (outcome, ms, detail)."""
+    ip: str
+    name: str
+    checks: dict[str, tuple[str, float, str]] = field(default_factory=dict)
+    total_ms: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return all(o == OK for o, _, _ in self.checks.values())
+
+    @property
+    def error(self) -> str:
+        return next((f"{k}: {d}" for k, (o, _, d) in self.checks.items() if o == FAIL), "")
+
+
+def _ms(t: float) -> float:
+    return round((time.monotonic() - t) * 1000, 1)
+
+
+def _why(e: requests.RequestException) -> str:
+    """The root cause in a few words instead of urllib3's nested "Max retries exceeded ..." text."""
+    if isinstance(e, requests.Timeout): return "timed out"
+    x: BaseException = e
+    while (nxt := x.reason if isinstance(getattr(x, "reason", None), BaseException)
+           else next((a for a in x.args if isinstance(a, BaseException)), None)) is not None:
+        x = nxt
+    msg = x.strerror if isinstance(x, OSError) and x.strerror else str(x) or type(x).__name__
+    m = re.search(r"\[Errno -?\d+\] ([^)'\"]+)", msg)
+    return m.group(1) if m else msg
+
+
+def _budget(deadline: float) -> tuple[float, float]:
+    """(connect, read) timeouts for the next request: whatever is left until `deadline`."""
+    left = max(MIN_STEP_S, deadline - time.monotonic())
+    return left, left
+
+
+def probe_camera(cam: CameraConf, timeout: float = PROBE_TIMEOUT_S) -> ProbeResult:
+    """Open the alertStream (reachability + digest auth), then fetch one snapshot, within `timeout` overall.
+
+    The stream is closed as soon as its headers arrive; the snapshot reuses the
+    nonce from the first request, so it costs no extra challenge. Checks that
+    cannot run because an earlier one failed are SKIPPED.
+
+    requests times the connect and every read separately (and the digest
+    retry is another round trip), so each step gets the remaining budget and
+    a watchdog aborts the camera's sockets once `deadline` passes.
+    """
+    res = ProbeResult(cam.ip, cam.name or cam.ip); start = time.monotonic(); deadline = start + timeout
+    base = f"{getattr(cam, 'scheme', 'http') or 'http'}://{cam.ip}"
+    http = CameraHttp(cam); watchdog = threading.Timer(timeout, http.abort); watchdog.daemon = True
+    why = lambda e: "timed out" if time.monotonic() >= deadline else _why(e)
+    watchdog.start()
+    try:
+        t = time.monotonic()
+        try:
+            with http.get(http.stream, f"{base}/ISAPI/Event/notification/alertStream", stream=True,
+                          timeout=_budget(deadline), verify=False) as r:
+                status, ctype = r.status_code, r.headers.get("Content-Type", "")
+        except requests.RequestException as e:
+            res.checks["stream"] = (FAIL, _ms(t), why(e))
+            res.checks["auth"] = res.checks["snapshot"] = (SKIPPED, 0.0, "camera unreachable")
+            return res
+        ms = _ms(t)
+        if status in (401, 403):
+            res.checks["auth"] = (FAIL, ms, f"HTTP {status}: wrong login or password")
+            res.checks["stream"] = res.checks["snapshot"] = (SKIPPED, 0.0, "not authorized")
+            return res
+        res.checks["auth"] = (OK, ms, "digest" if r.history else "no login required")
+        res.checks["stream"] = (OK, ms, ctype.split(";")[0]) if status == 200 else (FAIL, ms, f"HTTP {status}")
+
+        t = time.monotonic(); chan = int(getattr(cam, "snap_channel", 101))
+        try:
+            with http.get(http.snapshots, f"{base}/ISAPI/Streaming/channels/{chan}/picture?snapShotImageType=JPEG",
+                          timeout=_budget(deadline), verify=False) as r:
+                if r.status_code != 200: res.checks["snapshot"] = (FAIL, _ms(t), f"HTTP {r.status_code}")
+                elif not r.content.startswith(JPEG_MAGIC): res.checks["snapshot"] = (FAIL, _ms(t), "not a JPEG")
+                else: res.checks["snapshot"] = (OK, _ms(t), f"{len(r.content) // 1024} KB")
+        except requests.RequestException as e:
+            res.checks["snapshot"] = (FAIL, _ms(t), why(e))
+        return res
+    finally:
+        watchdog.cancel(); http.close(); res.total_ms = _ms(start)
+
+
+def probe_all(cams: Iterable[CameraConf], on_result: Callable[[ProbeResult], None],
+              timeout: float = PROBE_TIMEOUT_S, workers: int = PROBE_WORKERS,
+              cancelled: Callable[[], bool] | None = None) -> list[ProbeResult]:
+    """Probe cameras concurrently on a bounded pool; `on_result` is called (on this thread) as each finishes.
+
+    With at least as many workers as cameras the whole run takes about one
+    `timeout`. If `cancelled` turns true, queued probes are dropped and only
+    the ones already running are waited for.
+    """
+    cams = list(cams); out: list[ProbeResult] = []
+    if not cams: return out
+    pool = ThreadPoolExecutor(max_workers=max(1, min(workers, len(cams))), thread_name_prefix="probe")
+    try:
+        futures = [pool.submit(probe_camera, c, timeout) for c in cams]
+        for f in as_completed(futures):
+            if cancelled and cancelled(): break
+            out.append(f.result()); on_result(out[-1])
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+    return out
@@ -0,0 +1,20 @@
+import json, os
+from pathlib import Path
+from shared.paths import CHECKPOINT_FILE
+
+
+class JsonCheckpointStore:
+    """One small JSON document, replaced atomically (write temp + os.replace)."""
+
+    def __init__(self, path: Path = CHECKPOINT_FILE):
+        self.path = Path(path)
+
+    def load(self) -> dict | None:
+        try: return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError): return None
+
+    def save(self, doc: dict) -> None:
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(doc, f, separators=(",", ":")); f.flush(); os.fsync(f.fileno())
+        os.replace(tmp, self.path)
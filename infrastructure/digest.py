@@ -0,0 +1,61 @@
+import hashlib, os, re
+
+_PARAM = re.compile(r'(\w+)\s*=\s*(?:"([^"]*)"|([^\s,]+))')
+
+
+def parse_challenge(header: str) -> dict[str, str] | None:
+    """Parse a `WWW-Authenticate: Digest ...` value; None for other schemes."""
+    scheme, _, rest = header.strip().partition(" ")
+    if scheme.lower() != "digest": return None
+    return {m.group(1).lower(): m.group(2) if m.group(2) is not None else m.group(3) for m in _PARAM.finditer(rest)}
+
+
+def _hash(algorithm: str):
+    algo = algorithm.upper().replace("-SESS", "")
+    return (lambda s: hashlib.sha256(s.encode()).hexdigest()) if algo == "SHA-256" else \
+           (lambda s: hashlib.md5(s.encode()).hexdigest())
+
+
+def digest_response(ch: dict[str, str], user: str, password: str, method: str, uri: str,
+                    nc: str = "", cnonce: str = "") -> str:
+    """The `response=` value for a challenge (RFC 7616, qop=auth or legacy no-qop)."""
+    H = _hash(ch.get("algorithm", "MD5"))
+    ha1 = H(f"{user}:{ch.get('realm', '')}:{password}")
+    if ch.get("algorithm", "").upper().endswith("-SESS"): ha1 = H(f"{ha1}:{ch['nonce']}:{cnonce}")
+    ha2 = H(f"{method}:{uri}")
+    if "auth" in [q.strip() for q in ch.get("qop", "").split(",")]:
+        return H(f"{ha1}:{ch['nonce']}:{nc}:{cnonce}:auth:{ha2}")
+    return H(f"{ha1}:{ch['nonce']}:{ha2}")
+
+
+class DigestAuth:
+    """Client-side digest auth that keeps the server nonce and counts nc.
+
+    After the first 401 every request is signed up front, so a camera that
+    accepts the cached nonce answers without another challenge round trip.
+    A 401 (e.g. stale=true) just replaces the cached challenge.
+    """
+
+    def __init__(self, user: str, password: str):
+        self.user = user; self.password = password
+        self._ch: dict[str, str] | None = None
+        self._nc = 0
+
+    def challenge(self, header: str) -> bool:
+        ch = parse_challenge(header)
+        if ch is None or "nonce" not in ch: return False
+        self._ch = ch; self._nc = 0
+        return True
+
+    def header(self, method: str, uri: str) -> str | None:
+        ch = self._ch
+        if ch is None: return None
+        self._nc += 1
+        nc = f"{self._nc:08x}"; cnonce = os.urandom(8).hex()
+        resp = digest_response(ch, self.user, self.password, method, uri, nc, cnonce)
+        parts = [f'username="{self.user}"', f'realm="{ch.get("realm", "")}"', f'nonce="{ch["nonce"]}"',
+                 f'uri="{uri}"', f'response="{resp}"', f'algorithm={ch.get("algorithm", "MD5")}']
+        if "opaque" in ch: parts.append(f'opaque="{ch["opaque"]}"')
+        if "auth" in [q.strip() for q in ch.get("qop", "").split(",")]:
+            parts += ["qop=auth", f"nc={nc}", f'cnonce="{cnonce}"']
+        return "Digest " + ", ".join(parts)
@@ -0,0 +1,153 @@
+import csv, json, os, struct
+from array import array
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Sequence
+
+from domain.rollups import bucket_start, next_bucket
+from shared.paths import fmt_ts
+
+Column = tuple[str, str]            # (name, type): "f8" float64, "i8" int64, "str" dictionary-encoded text
+
+ROW_COLUMNS: list[Column] = [("ts", "f8"), ("camera_name", "str"), ("camera_ip", "str"), ("direction", "str"),
+                             ("file", "str"), ("raw", "str")]
+HOURLY_COLUMNS: list[Column] = [("hour", "i8"), ("camera_name", "str"), ("camera_ip", "str"),
+                                ("in", "i8"), ("out", "i8"), ("total", "i8")]
+CSV_HEADERS = {"ts": "DateTime", "camera_name": "Camera Name", "camera_ip": "Camera IP", "direction": "Direction",
+               "file": "Saved File", "raw": "Original Name", "hour": "Hour", "in": "IN", "out": "OUT", "total": "TOTAL"}
+FORMATS = ("csv", "columnar", "parquet")
+
+COLUMNAR_MAGIC = b"PCCOL1\n"
+_GROUP = struct.Struct("<II")       # rows in the group, length of its JSON header
+GROUP_ROWS = 65536
+
+
+class Cancelled(Exception):
+    pass
+
+
+# ---------- Row sources ----------
+
+def count_rows(rows: Iterable[dict], names: dict[str, str] | None = None,
+               files: Callable[[str, float], str] | None = None) -> Iterator[tuple]:
+    """Raw counts-log rows as ROW_COLUMNS tuples; `files` (SnapshotLinkRepo.reader) fills in the snapshots."""
+    names = names or {}
+    for r in rows:
+        ip = r.get("camera_ip", ""); ts = float(r.get("ts", 0))
+        yield (ts, r.get("camera_name") or names.get(ip) or ip, ip, r.get("direction", ""),
+               os.path.basename(r.get("file") or (files(ip, ts) if files else "")), r.get("raw", ""))
+
+
+def hourly_rows(rollups, t0: float, t1: float, names: dict[str, str] | None = None) -> Iterator[tuple]:
+    """Per hour per camera IN/OUT/TOTAL from the hour rollup, one day at a time (HOURLY_COLUMNS tuples).
+
+    Only whole hours starting in [t0, t1) are included.
+    """
+    names = names or {}; day = bucket_start(t0, "day")
+    while day < t1:
+        end = min(next_bucket(day, "day"), t1); acc: dict[tuple[int, str], list[int]] = {}
+        for b, ip, direction, c in rollups.query(max(day, t0), end, "hour"):
+            if direction not in ("IN", "OUT"): continue
+            acc.setdefault((b, ip), [0, 0])[0 if direction == "IN" else 1] += c
+        for (b, ip), (i, o) in sorted(acc.items()):
+            yield (b, names.get(ip) or ip, ip, i, o, i + o)
+        day = next_bucket(day, "day")
+
+
+# ---------- Writers ----------
+
+def _csv(path: Path, columns: Sequence[Column], rows: Iterable[tuple]) -> None:
+    ts_cols = {i for i, (n, _) in enumerate(columns) if n in ("ts", "hour")}
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f); w.writerow([CSV_HEADERS.get(n, n) for n, _ in columns])
+        for r in rows: w.writerow([fmt_ts(v) if i in ts_cols else v for i, v in enumerate(r)])
+
+
+def _groups(rows: Iterable[tuple], n: int) -> Iterator[list[tuple]]:
+    buf = []
+    for r in rows:
+        buf.append(r)
+        if len(buf) >= n: yield buf; buf = []
+    if buf: yield buf
+
+
+def _columnar(path: Path, columns: Sequence[Column], rows: Iterable[tuple]) -> None:
+    """Row groups of up to GROUP_ROWS: header (rows, JSON length), JSON {columns, dicts, sizes}, column arrays.
+
+    Numbers are raw little-endian float64/int64 arrays; text columns are uint32
+    codes into the group's dictionary, so memory stays bounded by one group.
+    """
+    with open(path, "wb") as f:
+        f.write(COLUMNAR_MAGIC)
+        for g in _groups(rows, GROUP_ROWS):
+            dicts = {}; blobs = []
+            for i, (name, kind) in enumerate(columns):
+                if kind == "str":
+                    codes: dict[str, int] = {}
+                    a = array("I", (codes.setdefault(r[i], len(codes)) for r in g)); dicts[name] = list(codes)
+                else:
+                    a = array("d" if kind == "f8" else "q", (r[i] for r in g))
+                blobs.append(a.tobytes())
+            head = json.dumps({"columns": columns, "dicts": dicts, "sizes": [len(b) for b in blobs]},
+                              separators=(",", ":")).encode()
+            f.write(_GROUP.pack(len(g), len(head))); f.write(head)
+            for b in blobs: f.write(b)
+
+
+def read_columnar(path: Path) -> Iterator[dict]:
+    """Rows of a columnar export, as dicts."""
+    with open(path, "rb") as f:
+        if f.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC: raise ValueError(f"{path}: not a columnar export")
+        while len(h := f.read(_GROUP.size)) == _GROUP.size:
+            n, hl = _GROUP.unpack(h); head = json.loads(f.read(hl)); cols = []
+            for (name, kind), size in zip(head["columns"], head["sizes"]):
+                a = array({"f8": "d", "i8": "q", "str": "I"}[kind]); a.frombytes(f.read(size))
+                cols.append([head["dicts"][name][c] for c in a] if kind == "str" else a)
+            names = [c[0] for c in head["columns"]]
+            for i in range(n): yield {k: col[i] for k, col in zip(names, cols)}
+
+
+def _parquet(path: Path, columns: Sequence[Column], rows: Iterable[tuple]) -> None:
+    import pyarrow as pa, pyarrow.parquet as pq     # optional: only needed for this format
+    types = {"f8": pa.float64(), "i8": pa.int64(), "str": pa.string()}
+    schema = pa.schema([(n, pa.dictionary(pa.int32(), pa.string()) if k == "str" else types[k]) for n, k in columns])
+    with pq.ParquetWriter(path, schema) as w:
+        for g in _groups(rows, GROUP_ROWS):
+            arrays = []
+            for i, (_, k) in enumerate(columns):
+                a = pa.array([r[i] for r in g], type=types[k])
+                arrays.append(a.dictionary_encode() if k == "str" else a)
+            w.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+
+def parquet_available() -> bool:
+    try: import pyarrow.parquet   # noqa: F401
+    except ImportError: return False
+    return True
+
+
+_WRITERS = {"csv": _csv, "columnar": _columnar, "parquet": _parquet}
+
+
+def export(path: Path, fmt: str, columns: Sequence[Column], rows: Iterable[tuple],
+           on_row: Callable[[tuple], None] | None = None, cancelled: Callable[[], bool] | None = None) -> int:
+    """Stream rows into `path` in the given format; returns the row count.
+
+    Writes to a hidden temp file renamed on success, so a cancelled or failed
+    export (Cancelled / OSError) leaves nothing behind. `on_row` sees every
+    row before it is written (progress); `cancelled` is polled every 1024 rows.
+    """
+    if fmt not in _WRITERS: raise ValueError(f"unknown export format: {fmt!r}")
+    path = Path(path); tmp = path.with_name(f".{path.name}.part"); n = 0
+
+    def feed() -> Iterator[tuple]:
+        nonlocal n
+        for r in rows:
+            if not n & 1023 and cancelled and cancelled(): raise Cancelled()
+            if on_row: on_row(r)
+            n += 1; yield r
+    try:
+        _WRITERS[fmt](tmp, columns, feed())
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True); raise
+    return n
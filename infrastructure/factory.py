@@ -0,0 +1,58 @@
+# infrastructure/factory.py
+from shared.paths import CAPTURE_DIR
+from shared.settings import Settings
+from application.ports import CountsRepo, EventSource, ImageStore
+
+
+def make_counts_repo(st: Settings) -> CountsRepo:
+    """Counts backend selected by settings.counts_backend."""
+    opts = dict(batch_rows=st.counts_flush_rows, flush_interval=st.counts_flush_ms / 1000,
+                fsync=st.counts_fsync, fsync_interval=st.counts_fsync_ms / 1000)
+    if st.counts_backend == "sqlite":
+        from .sqlite_counts_repo import SqliteCountsRepo
+        return SqliteCountsRepo(**opts)
+    if st.counts_backend == "jsonl":
+        from .jsonl_counts_repo import JsonlCountsRepo
+        return JsonlCountsRepo(**opts)
+    raise ValueError(f"unknown counts_backend: {st.counts_backend!r}")
+
+
+def make_event_source(st: Settings, image_store: ImageStore, cam_repo) -> EventSource:
+    """Camera ingestion selected by settings.event_source; reconciled after every cam_repo.save_all."""
+    source = _event_source(st, image_store, cam_repo)
+    if hasattr(cam_repo, "add_listener"): cam_repo.add_listener(source.reconcile)
+    return source
+
+
+def _event_source(st: Settings, image_store: ImageStore, cam_repo) -> EventSource:
+    capture_dir = CAPTURE_DIR if st.capture_streams else None
+    if st.event_shards > 0 and st.event_source in ("threads", "asyncio"):
+        from .sharded_event_source import ShardedEventSource
+        return ShardedEventSource(image_store, cam_repo, st.event_shards, st.event_source, capture_dir)
+    if st.event_source == "asyncio":
+        from .async_isapi_event_source import AsyncIsapiEventSource
+        return AsyncIsapiEventSource(image_store, cam_repo, capture_dir)
+    if st.event_source == "threads":
+        from .isapi_event_source import IsapiEventSource
+        return IsapiEventSource(image_store, cam_repo, capture_dir)
+    if st.event_source == "replay":
+        from .replay_event_source import ReplayEventSource
+        return ReplayEventSource(sorted(CAPTURE_DIR.glob("*.pccap")), st.replay_speed)
+    raise ValueError(f"unknown event_source: {st.event_source!r}")
+
+
+def make_image_store(st: Settings) -> ImageStore:
+    """Where event photos live, selected by settings.images_store."""
+    from .image_store import MEMORY_MAX_MB, LocalImageStore, MemoryImageStore
+    if st.images_store == "memory":     # always capped: RAM is not a place for "no size cap"
+        return MemoryImageStore(max_bytes=(st.images_max_mb or MEMORY_MAX_MB) * 1024 * 1024)
+    if st.images_store == "disk":
+        return LocalImageStore()
+    raise ValueError(f"unknown images_store: {st.images_store!r}")
+
+
+def make_metrics_server(st: Settings):
+    """Started /metrics endpoint, or None when settings.metrics_port is 0 (OSError if the port is taken)."""
+    if not st.metrics_port: return None
+    from .metrics_http import MetricsServer
+    return MetricsServer(st.metrics_host, st.metrics_port).start()
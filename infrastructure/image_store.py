@@ -1,16 +1,184 @@
-import shutil, time
+import os, shutil, threading, time
+from abc import ABC, abstractmethod
+from collections import deque
 from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable
 from shared.paths import EV_DIR
 
-class LocalImageStore:
-    def move_and_stamp(self, tmp_path: str, remote_ip: str, raw_name: str) -> str:
-        stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-        dest = EV_DIR / f"{stamp}__{raw_name}"
-        shutil.move(tmp_path, dest); return str(dest)
+MEM_PREFIX = "mem:"
+MEMORY_MAX_MB = 256          # default RAM cap of MemoryImageStore (age alone does not bound a burst)
+
+
+class _ExpiringStore(ABC):
+    """Time-ordered index of (written_at, key, size) shared by the image stores.
+
+    Purges pop expired entries from the left of the deque and hand them to
+    `_evict`, then tell the evict listeners which keys went; `start_purger`
+    runs `scan` once and then the purges on a background thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index: deque[tuple[float, str, int]] = deque()
+        self._bytes = 0
+        self._stop = threading.Event(); self._thread: threading.Thread | None = None
+        self.stats = {"indexed": 0, "purged": 0, "purged_bytes": 0}
+        self._listeners: list[Callable[[list[str]], None]] = []
+        self._seq = 0
+
+    @abstractmethod
+    def _evict(self, key: str) -> None:
+        """Release the image behind an index entry that was just purged."""
+
+    def scan(self) -> int: return 0
+
+    def _stamped(self, remote_ip: str, raw_name: str) -> str:
+        """<time>_<seq>__<ip>__<name>: unique within the store even for one token stored by many threads in one tick."""
+        with self._lock: self._seq += 1; seq = self._seq
+        return (f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{seq:06d}"
+                f"__{remote_ip.replace(':', '_')}__{raw_name}")
+
+    def add_evict_listener(self, fn: Callable[[list[str]], None]) -> None:
+        """Call fn(keys) after each purge that evicted something (on the purging thread)."""
+        self._listeners.append(fn)
+
+    def _add(self, key: str, size: int) -> None:
+        with self._lock:
+            self._index.append((time.time(), key, size)); self._bytes += size; self.stats["indexed"] += 1
+
+    def disk_usage(self) -> tuple[int, int]:
+        """(files, bytes) currently indexed."""
+        with self._lock: return len(self._index), self._bytes
+
+    # ---------- Purge ----------
+
     def purge_older_than(self, seconds: float) -> int:
-        cutoff = time.time() - seconds; n=0
-        for p in EV_DIR.glob("*.jpg"):
-            try:
-                if p.stat().st_mtime < cutoff: p.unlink(missing_ok=True); n+=1
-            except: pass
-        return n
+        cutoff = time.time() - seconds
+        return self._purge(lambda t, total: t < cutoff)
+
+    def purge_over(self, max_bytes: int) -> int:
+        """Drop the oldest images until the indexed total fits in `max_bytes`."""
+        return self._purge(lambda t, total: total > max_bytes)
+
+    def _purge(self, expired: Callable[[float, int], bool]) -> int:
+        victims = []
+        with self._lock:
+            while self._index and expired(self._index[0][0], self._bytes):
+                t, key, size = self._index.popleft(); self._bytes -= size; victims.append((key, size))
+        for key, _ in victims: self._evict(key)
+        self.stats["purged"] += len(victims); self.stats["purged_bytes"] += sum(s for _, s in victims)
+        if victims:
+            for fn in self._listeners: fn([k for k, _ in victims])
+        return len(victims)
+
+    def start_purger(self, max_age_s: float, max_bytes: int = 0, interval_s: float = 20.0,
+                     on_purged: Callable[[int], None] | None = None) -> None:
+        """Scan once, then purge by age (and size when max_bytes > 0) every `interval_s`."""
+        if self._thread: return
+        def run():
+            self.scan()
+            while True:
+                n = self.purge_older_than(max_age_s)
+                if max_bytes > 0: n += self.purge_over(max_bytes)
+                if n and on_purged: on_purged(n)
+                if self._stop.wait(interval_s): return
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name="image-purger", daemon=True); self._thread.start()
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread: self._thread.join(2.0); self._thread = None
+
+
+class LocalImageStore(_ExpiringStore):
+    """Event photos as files in EV_DIR.
+
+    `store` streams straight into a hidden `.part` file next to the final
+    stamped name and renames it into place (same directory, so the rename
+    is atomic and nothing is copied). Files left over from a previous run
+    are picked up once by `scan`.
+    """
+
+    def __init__(self, root: Path = EV_DIR):
+        super().__init__()
+        self.root = Path(root)
+
+    def store(self, chunks: Iterable[bytes], remote_ip: str, raw_name: str) -> str:
+        dest = self.root / self._stamped(remote_ip, raw_name); part = dest.with_name(f".{dest.name}.part"); size = 0
+        try:
+            with open(part, "wb") as f:
+                for b in chunks:
+                    if b: f.write(b); size += len(b)
+            os.replace(part, dest)
+        except BaseException:
+            try: os.unlink(part)
+            except OSError: pass
+            raise
+        self._add(str(dest), size)
+        return str(dest)
+
+    def move_and_stamp(self, tmp_path: str, remote_ip: str, raw_name: str) -> str:
+        dest = self.root / self._stamped(remote_ip, raw_name)
+        shutil.move(tmp_path, dest)
+        try: size = dest.stat().st_size
+        except OSError: size = 0
+        self._add(str(dest), size)
+        return str(dest)
+
+    def read(self, path: str) -> bytes | None:
+        try: return Path(path).read_bytes()
+        except OSError: return None
+
+    def _evict(self, key: str) -> None:
+        try: os.unlink(key)
+        except OSError: pass
+
+    def scan(self) -> int:
+        """Merge the *.jpg already on disk into the index (one pass, at startup)."""
+        found = []
+        try:
+            with os.scandir(self.root) as it:
+                for e in it:
+                    if not e.name.endswith(".jpg"): continue
+                    try: st = e.stat(); found.append((st.st_mtime, e.path, st.st_size))
+                    except OSError: pass
+        except OSError: return 0
+        with self._lock:
+            known = {p for _, p, _ in self._index}
+            new = [f for f in found if f[1] not in known]
+            if new:
+                self._index = deque(sorted([*self._index, *new]))
+                self._bytes += sum(s for _, _, s in new); self.stats["indexed"] += len(new)
+        return len(new)
+
+
+class MemoryImageStore(_ExpiringStore):
+    """Event photos kept only in RAM, as a ring of JPEG bytes.
+
+    Paths are "mem:<stamp>__<ip>__<name>" keys; `read` returns the bytes until the
+    image is purged by age, or evicted right away once `max_bytes` is
+    exceeded (0 = no cap, for tests only). Nothing touches the disk.
+    """
+
+    def __init__(self, max_bytes: int = MEMORY_MAX_MB << 20):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self._data: dict[str, bytes] = {}
+
+    def store(self, chunks: Iterable[bytes], remote_ip: str, raw_name: str) -> str:
+        data = b"".join(chunks); key = MEM_PREFIX + self._stamped(remote_ip, raw_name)
+        self._data[key] = data; self._add(key, len(data))
+        if self.max_bytes > 0: self.purge_over(self.max_bytes)
+        return key
+
+    def move_and_stamp(self, tmp_path: str, remote_ip: str, raw_name: str) -> str:
+        with open(tmp_path, "rb") as f: key = self.store([f.read()], remote_ip, raw_name)
+        os.unlink(tmp_path)
+        return key
+
+    def read(self, path: str) -> bytes | None:
+        return self._data.get(path)
+
+    def _evict(self, key: str) -> None:
+        self._data.pop(key, None)
@@ -1,49 +1,49 @@
-import re
 import time
-import tempfile
 import threading
+from pathlib import Path
 from typing import Callable, List
 
 import requests
-from requests.auth import HTTPDigestAuth
-from PySide6 import QtCore
 
 from domain.models import FileEvent, CameraConf
+from shared.metrics import ALERTS, PARSE_SECONDS, RECONNECTS
 from application.ports import EventSource, ImageStore
+from .alert_stream_parser import AlertEvent, AlertStreamParser, classify
+from .alert_dedup import AlertDedup, merge_stats
+from .snapshot_pipeline import SnapshotPool
+from .camera_http import CameraHttp, iter_arrived, summarize
+from .reconnect import DOWN, STALL_S, CameraLink
+from .stream_capture import CaptureWriter, capture_path
+
+HANDOVER_S = 2.0        # reconcile: wait this long for a restarted worker's old thread before reusing its state
 # (JsonlCameraRepo is not used here; keep imports minimal)
 
 
-def _token_from_event_type(et: bytes | str) -> str:
-    """Map many vendor event names down to a few canonical tokens."""
-    if isinstance(et, bytes):
-        e = et.decode(errors="ignore").lower()
-    else:
-        e = str(et).lower()
-    if "line" in e and ("cross" in e or "detect" in e):
-        return "LINE_CROSSING_DETECTION"
-    if "regionentrance" in e or ("region" in e and "entrance" in e):
-        return "REGION_ENTRANCE"
-    if "intrusion" in e:
-        return "INTRUSION"
-    if "motion" in e or "vmd" in e:
-        return "MOTION"
-    return e.upper()
-
-
-class _CamWorker(QtCore.QThread):
+class _CamWorker(threading.Thread):
     def __init__(
         self,
         cam: CameraConf,
         image_store: ImageStore,
         on_file: Callable[[FileEvent], None],
         on_log: Callable[[str], None],
+        snapshots: SnapshotPool,
+        on_image: Callable[[FileEvent], None] | None = None,
+        capture_dir: Path | None = None,
     ):
-        super().__init__()
+        super().__init__(name=f"isapi:{cam.ip}", daemon=True)
         self.cam = cam
         self.image_store = image_store
         self.on_file = on_file
         self.on_log = on_log
-        self._stop = threading.Event()
+        self.on_image = on_image
+        self.snapshots = snapshots
+        self.http = CameraHttp(cam)
+        self._halt = threading.Event()
+        self.link = CameraLink(cam.ip)
+        self.dedup = AlertDedup()    # kept across reconnects: retransmits after a reconnect are duplicates too
+        self._alerts = {k: ALERTS.labels(cam.ip, k) for k in ("counted", "filtered", "duplicate")}
+        self._reconnects = RECONNECTS.labels(cam.ip)
+        self._capture = CaptureWriter(capture_path(capture_dir, cam.ip), cam.ip) if capture_dir else None
 
     # ---------- Helpers ----------
 
@@ -51,154 +51,168 @@ class _CamWorker(QtCore.QThread):
         """Always HTTP (port 80)."""
         return f"http://{self.cam.ip}".rstrip("/")
 
-    def _auth(self):
-        return HTTPDigestAuth(self.cam.login, self.cam.password)
-
-    def _snapshot(self, ch: int | None = None) -> str | None:
-        """Fetch a JPEG snapshot for the given channel (default 101)."""
+    def _snapshot(self, ch: int | None = None, raw_name: str = "snapshot.jpg") -> str | None:
+        """Fetch a JPEG snapshot for the given channel (default 101) straight into the image store."""
         chan = int(ch or getattr(self.cam, "snap_channel", 101))
         url = f"{self._base()}/ISAPI/Streaming/channels/{chan}/picture?snapShotImageType=JPEG"
         try:
-            with requests.get(url, auth=self._auth(), timeout=(5, 10), stream=True) as r:
+            with self.http.get(self.http.snapshots, url, timeout=(5, 10), stream=True) as r:
                 r.raise_for_status()
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp:
-                    for b in r.iter_content(8192):
-                        if not b:
-                            break
-                        tmp.write(b)
-                    return tmp.name
+                return self.image_store.store(r.iter_content(8192), self.cam.ip, raw_name)
         except Exception as e:
             self.on_log(f"Snapshot error {self.cam.ip}: {e}")
             return None
 
     # ---------- Main loop ----------
 
+    def _handle_alert(self, a: AlertEvent) -> None:
+        ch = a.channel if a.channel is not None else getattr(self.cam, "snap_channel", 101)
+
+        # Always log the raw event
+        self.on_log(f"Event {self.cam.ip}: eventType={a.event_type}, state={a.state}")
+
+        # Skip noisy types, 'inactive' (stop) events and retransmits of the same alert
+        now = time.time()
+        token = classify(a, self.dedup, now, self._alerts)
+        if token is None:
+            return
+
+        # Count now; the snapshot is fetched off the stream thread and attached later
+        self.on_file(FileEvent(path="", camera_ip=self.cam.ip, raw_name=token, when=now))
+        if self.on_image:
+            self.snapshots.submit(self.cam.ip, lambda: self._attach_snapshot(ch, token, now))
+
+    def _attach_snapshot(self, ch: int, token: str, when: float) -> bool:
+        """Runs on a SnapshotPool thread."""
+        dest = self._snapshot(ch, f"{token}.jpg")
+        if not dest:
+            return False
+        if self.on_image:
+            self.on_image(FileEvent(path=dest, camera_ip=self.cam.ip, raw_name=f"{token}.jpg", when=when))
+        return True
+
     def run(self):
-        # Ignore noisy/periodic event types and only act on 'active' (start) events
-        NOISY = {
-            "VIDEOLOSS", "MOTION", "VMD", "SCENECHANGEDETECTION",
-            "DEFOCUSDETECTION", "AUDIOEXCEPTION", "SHELTERALARM",
-            "ALARMINPUT", "HOSTALARM", "VIDEOMISMATCH",
-        }
-
-        EVENT_BLOCK = re.compile(
-            br"<EventNotificationAlert.*?</EventNotificationAlert>",
-            re.IGNORECASE | re.DOTALL,
-        )
-
-        def GET(tag: str, blob: bytes):
-            return re.search(fr"<{tag}>([^<]+)</{tag}>".encode(), blob, re.IGNORECASE | re.DOTALL)
-
-        while not self._stop.is_set():
+        alert_url = f"{self._base()}/ISAPI/Event/notification/alertStream"
+        while not self._halt.is_set():
             try:
-                alert_url = f"{self._base()}/ISAPI/Event/notification/alertStream"
-                with requests.get(alert_url, auth=self._auth(), stream=True, timeout=(5, 60)) as r:
+                # the read timeout doubles as stall detection: cameras send heartbeats well within STALL_S
+                with self.http.get(self.http.stream, alert_url, stream=True, timeout=(5, STALL_S)) as r:
                     r.raise_for_status()
+                    self.link.connected()
                     self.on_log(f"ISAPI connected: {self.cam.ip} (HTTP)")
 
-                    buf = b""
-                    last = 0.0  # debounce per camera
-                    for chunk in r.iter_content(chunk_size=4096):
-                        if self._stop.is_set():
+                    parser = AlertStreamParser(r.headers.get("Content-Type"))
+                    if self._capture:
+                        self._capture.connect(r.headers.get("Content-Type"))
+                    for chunk in iter_arrived(r):
+                        if self._halt.is_set():
                             break
                         if not chunk:
                             continue
-
-                        buf += chunk
-                        keep_from = 0
-
-                        for m in EVENT_BLOCK.finditer(buf):
-                            part = m.group(0)
-
-                            m_type = GET("eventType", part)
-                            m_state = GET("eventState", part)
-                            m_ch = GET("channelID", part)
-
-                            if not m_type:
-                                continue
-
-                            et = m_type.group(1).strip().decode(errors="ignore").lower()
-                            state = (m_state.group(1).strip().decode(errors="ignore").lower()
-                                     if m_state else "active")
-                            ch = int(m_ch.group(1)) if m_ch else getattr(self.cam, "snap_channel", 101)
-
-                            # Always log the raw event
-                            self.on_log(f"Event {self.cam.ip}: eventType={et}, state={state}")
-
-                            token = _token_from_event_type(et)
-
-                            # Skip noisy types and 'inactive' (stop) events
-                            if token in NOISY or state != "active":
-                                keep_from = m.end()
-                                continue
-
-                            # Small debounce (avoid bursts when camera sends multiple records)
-                            now = time.time()
-                            if now - last < 0.5:
-                                keep_from = m.end()
-                                continue
-                            last = now
-
-                            # Try snapshot; still count even if snapshot fails
-                            tmp = self._snapshot(ch)
-                            if not tmp:
-                                self.on_file(
-                                    FileEvent(path="", camera_ip=self.cam.ip, raw_name=token, when=now)
-                                )
-                            else:
-                                dest = self.image_store.move_and_stamp(tmp, self.cam.ip, f"{token}.jpg")
-                                self.on_file(
-                                    FileEvent(path=dest, camera_ip=self.cam.ip, raw_name=f"{token}.jpg", when=now)
-                                )
-
-                            keep_from = m.end()
-
-                        if keep_from:
-                            buf = buf[keep_from:]
-
+                        self.link.data()
+                        if self._capture:
+                            self._capture.data(chunk)
+                        t = time.perf_counter()
+                        alerts = parser.feed(chunk)
+                        PARSE_SECONDS.observe(time.perf_counter() - t)
+                        for a in alerts:
+                            self._handle_alert(a)
+                error = "stream closed"
             except requests.RequestException as e:
-                self.on_log(f"ISAPI stream error {self.cam.ip}: {e}; retrying in 3s")
-                time.sleep(3)
+                error = str(e)
             except Exception as e:
-                self.on_log(f"ISAPI worker error {self.cam.ip}: {e}; retrying in 3s")
-                time.sleep(3)
+                error = f"worker error: {e}"
+            if self._halt.is_set():
+                break
+            delay = self.link.failed(error)
+            self._reconnects.inc()
+            down = " (camera down)" if self.link.state == DOWN else ""
+            self.on_log(f"ISAPI stream error {self.cam.ip}: {error}; retrying in {delay:.0f}s{down}")
+            self._halt.wait(delay)
+        self.http.close()
+        if self._capture:
+            self._capture.close()
 
     def stop(self):
-        self._stop.set()
+        """Returns at once: also aborts a pending connect, header wait or stream read, so join() is quick."""
+        self._halt.set()
+        self.http.abort_stream()
 
 
 class IsapiEventSource(EventSource):
     """Starts one worker per enabled camera (pulled from the injected repo)."""
 
-    def __init__(self, image_store: ImageStore, cam_repo):
+    def __init__(self, image_store: ImageStore, cam_repo, capture_dir: Path | None = None):
         self._image_store = image_store
         self._repo = cam_repo
+        self._capture_dir = capture_dir     # record raw alertStream bytes here (see stream_capture)
         self._workers: List[_CamWorker] = []
+        self._snapshots: SnapshotPool | None = None
+        self._callbacks: tuple | None = None    # (on_file, on_log, on_image) while started
 
-    def start(self, on_file: Callable[[FileEvent], None], on_log: Callable[[str], None]) -> None:
-        if any(w.isRunning() for w in self._workers):
+    def start(self, on_file: Callable[[FileEvent], None], on_log: Callable[[str], None],
+              on_image: Callable[[FileEvent], None] | None = None) -> None:
+        if self.is_running():
             on_log("ISAPI already running")
             return
 
         self._workers = []
-        cams = getattr(self._repo, "load_all")() if hasattr(self._repo, "load_all") else []
-        for cam in cams:
-            if not getattr(cam, "enabled", True):
-                continue
-            w = _CamWorker(cam, self._image_store, on_file, on_log)
+        self._snapshots = SnapshotPool()
+        self._callbacks = (on_file, on_log, on_image)
+        for cam in self._enabled().values():
+            w = self._worker(cam)
             self._workers.append(w)
             w.start()
 
         on_log(f"ISAPI started for {len(self._workers)} cameras")
 
     def stop(self) -> None:
+        self._callbacks = None
         for w in self._workers:
-            try:
-                w.stop()
-                w.wait(1500)
-            except Exception:
-                pass
+            w.stop()
+        for w in self._workers:
+            w.join(1.5)
         self._workers = []
+        if self._snapshots:
+            self._snapshots.stop()
+
+    def stats(self) -> dict:
+        return {"snapshots": self._snapshots.stats.snapshot() if self._snapshots else {},
+                "http": summarize([w.http.stats() for w in self._workers]),
+                "dedup": merge_stats(w.dedup for w in self._workers),
+                "links": {w.cam.ip: w.link.snapshot() for w in self._workers}}
 
     def is_running(self) -> bool:
-        return any(w.isRunning() for w in self._workers)
+        return any(w.is_alive() for w in self._workers)
+
+    def reconcile(self) -> None:
+        """Diff the repo against the running workers: new cameras start, removed or disabled ones stop,
+        ones with changed connection settings restart (keeping their dedup and link state); the rest keep
+        their streams and just see the edited config."""
+        if self._callbacks is None: return
+        want = self._enabled(); have = {w.cam.ip: w for w in self._workers}
+        workers = [w for ip, w in have.items() if ip in want and want[ip].connection() == w.cam.connection()]
+        kept = {w.cam.ip for w in workers}
+        for w in workers: w.cam = want[w.cam.ip]
+        for ip, w in have.items():
+            if ip not in kept: w.stop()
+        for ip, cam in want.items():
+            if ip in kept: continue
+            w = self._worker(cam); old = have.get(ip)
+            if old is not None:     # AlertDedup / CameraLink are single-threaded: hand over once the old thread is gone
+                old.join(HANDOVER_S)
+                if not old.is_alive(): w.dedup = old.dedup; w.link = old.link
+            workers.append(w); w.start()
+        self._workers = workers
+        added = len(want.keys() - have.keys()); removed = len(have.keys() - want.keys())
+        changed = len(want) - len(kept) - added
+        if added or removed or changed:
+            self._callbacks[1](f"ISAPI reconciled: {added} started, {changed} restarted, {removed} stopped, {len(kept)} untouched")
+
+    def _enabled(self) -> dict[str, CameraConf]:
+        cams = self._repo.load_all() if hasattr(self._repo, "load_all") else []
+        return {c.ip: c for c in cams if getattr(c, "enabled", True)}
+
+    def _worker(self, cam: CameraConf) -> _CamWorker:
+        on_file, on_log, on_image = self._callbacks
+        return _CamWorker(cam, self._image_store, on_file, on_log, self._snapshots, on_image, self._capture_dir)
@@ -1,10 +1,40 @@
-import json
-from typing import List
+import json, threading, time
+from dataclasses import replace
+from typing import Callable, List
 from domain.models import CameraConf
 from shared.paths import CONF_FILE
 
 class JsonlCameraRepo:
-    def load_all(self) -> List[CameraConf]:
+    """cameras.jsonl with an in-memory index keyed by IP.
+
+    The file is re-parsed only when its (mtime, size) signature changes, and the
+    signature itself is checked at most once per `check_interval` seconds, so
+    `find_by_ip` on the event hot path is a plain dict lookup.
+    """
+    def __init__(self, check_interval: float = 1.0):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._items: List[CameraConf] = []
+        self._by_ip: dict[str, CameraConf] = {}
+        self._sig: tuple[int, int] | None = None
+        self._checked_at = float("-inf")
+        self.stats = {"lookups": 0, "stat_checks": 0, "reloads": 0}
+        self._listeners: List[Callable[[], None]] = []
+
+    # ---------- Index ----------
+
+    def _signature(self) -> tuple[int, int] | None:
+        try: st = CONF_FILE.stat()
+        except OSError: return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _set_index(self, items: List[CameraConf], sig: tuple[int, int] | None) -> None:
+        self._items = items
+        self._by_ip = {}
+        for c in items: self._by_ip.setdefault(c.ip, c)   # first entry wins, as the old linear scan did
+        self._sig = sig; self._checked_at = time.monotonic()
+
+    def _read_file(self) -> List[CameraConf]:
         out: List[CameraConf] = []
         with CONF_FILE.open("r", encoding="utf-8") as f:
             for line in f:
@@ -12,13 +42,37 @@ class JsonlCameraRepo:
                 if not line: continue
                 try: out.append(CameraConf.from_dict(json.loads(line)))
                 except: pass
+        self.stats["reloads"] += 1
         return out
+
+    def _ensure_fresh(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval: return
+        self.stats["stat_checks"] += 1
+        sig = self._signature()
+        if sig is not None and sig == self._sig: self._checked_at = now; return
+        self._set_index(self._read_file() if sig is not None else [], sig)
+
+    def add_listener(self, fn: Callable[[], None]) -> None:
+        """Call fn() after every save_all (e.g. EventSource.reconcile)."""
+        self._listeners.append(fn)
+
+    # ---------- CameraRepo ----------
+
+    def load_all(self) -> List[CameraConf]:
+        with self._lock:
+            self._ensure_fresh(force=True)
+            return [replace(c) for c in self._items]
     def save_all(self, items: List[CameraConf]) -> None:
         tmp = CONF_FILE.with_suffix(".new")
         with tmp.open("w", encoding="utf-8") as f:
             for c in items: f.write(json.dumps(c.to_dict())+"\n")
-        tmp.replace(CONF_FILE)
+        with self._lock:
+            tmp.replace(CONF_FILE)
+            self._set_index([replace(c) for c in items], self._signature())
+        for fn in list(self._listeners): fn()
     def find_by_ip(self, ip: str) -> CameraConf | None:
-        for c in self.load_all():
-            if c.ip==ip: return c
-        return None
+        with self._lock:
+            self.stats["lookups"] += 1
+            self._ensure_fresh()
+            return self._by_ip.get(ip)
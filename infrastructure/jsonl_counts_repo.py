@@ -1,15 +1,191 @@
-import json
-from typing import Iterable
-from shared.paths import COUNTS_LOG
+import bisect, json, os, shutil, threading, time
+from pathlib import Path
+from typing import Iterable, Iterator
+from shared.paths import COUNTS_DIR, COUNTS_LOG
+from .buffered_appender import BufferedAppender, FsyncPolicy
+
+INDEX_EVERY = 128       # rows between sparse index entries
+MAX_OPEN    = 2         # open segments (today + a straggler from yesterday)
+MIGRATE_DIR = ".migrating"  # work dir of migrate_legacy, inside root
+
+def _day(ts: float) -> str:
+    return time.strftime("%Y-%m-%d", time.localtime(ts))
+
+def _day_or(ts: float, default: str) -> str:
+    try: return _day(ts)
+    except (OverflowError, OSError, ValueError): return default   # open-ended ranges (+-inf)
+
+def _read_index(idx: Path) -> list[tuple[float, int]]:
+    """Index entries (max ts of all rows before offset, offset), in file order."""
+    out: list[tuple[float, int]] = []
+    try:
+        with idx.open("r", encoding="utf-8") as f:
+            for line in f:
+                try: m, off = line.split(); out.append((float(m), int(off)))
+                except ValueError: continue
+    except OSError: pass
+    return out
+
+
+class _Segment:
+    """An open day file plus its sparse index sidecar."""
+    def __init__(self, data: Path, opts: dict):
+        self.data = data; self.idx = data.with_suffix(".idx")
+        size = data.stat().st_size if data.exists() else 0
+        entries = _read_index(self.idx)
+        valid = [e for e in entries if e[1] <= size]
+        if len(valid) != len(entries):      # crash left entries past the data we actually have
+            self.idx.write_text("".join(f"{m!r} {off}\n" for m, off in valid), encoding="utf-8")
+        self.max_ts = valid[-1][0] if valid else float("-inf")
+        self.since_index = 0; self.offset = size
+        tail_from = valid[-1][1] if valid else 0
+        tail = b""
+        if size > tail_from:
+            with data.open("rb") as f:
+                f.seek(tail_from); tail = f.read()
+            for line in tail.splitlines():
+                try: self.max_ts = max(self.max_ts, float(json.loads(line).get("ts", 0)))
+                except Exception: pass
+                self.since_index += 1
+        self.rows = BufferedAppender(data, **opts)
+        self.index = BufferedAppender(self.idx, **{**opts, "fsync": "none"})
+        if tail and not tail.endswith(b"\n"):  # torn last line: don't glue the next row onto it
+            self.rows.write("\n"); self.offset += 1
+
+    def append(self, ts: float, line: str) -> None:
+        if self.since_index >= INDEX_EVERY:
+            self.index.write(f"{self.max_ts!r} {self.offset}\n"); self.since_index = 0
+        self.rows.write(line)
+        self.offset += len(line.encode("utf-8")); self.since_index += 1
+        if ts > self.max_ts: self.max_ts = ts
+
+    def flush(self, sync: bool = False) -> None:
+        self.rows.flush(sync); self.index.flush()
+
+    def close(self) -> None:
+        self.rows.close(); self.index.close()
+
 
 class JsonlCountsRepo:
+    """Counts log split into one JSONL segment per local day.
+
+    Each segment has a `.idx` sidecar holding a sparse (max_ts_before, offset)
+    index, so `read_range` opens only the overlapping days and seeks straight
+    past rows that are all older than `t0`.
+    """
+    def __init__(self, root: Path = COUNTS_DIR, batch_rows: int = 256, flush_interval: float = 0.5,
+                 fsync: FsyncPolicy = "interval", fsync_interval: float = 1.0, legacy: Path | None = COUNTS_LOG):
+        self.root = Path(root); self.root.mkdir(parents=True, exist_ok=True)
+        self._opts = dict(batch_rows=batch_rows, flush_interval=flush_interval, fsync=fsync, fsync_interval=fsync_interval)
+        self._lock = threading.Lock()
+        self._open: dict[str, _Segment] = {}
+        if legacy is not None and Path(legacy).exists(): self.migrate_legacy(Path(legacy))
+        else: shutil.rmtree(self.root / MIGRATE_DIR, ignore_errors=True)    # left by a crash after the last step
+
+    # ---------- Segments ----------
+
+    def _segment(self, day: str) -> _Segment:
+        seg = self._open.pop(day, None)
+        if seg is None:
+            seg = _Segment(self.root / f"{day}.jsonl", self._opts)
+            while len(self._open) >= MAX_OPEN:
+                self._open.pop(next(iter(self._open))).close()
+        self._open[day] = seg           # re-insert: dict order doubles as LRU order
+        return seg
+
+    def _seek_offset(self, idx: Path, t0: float) -> int:
+        entries = _read_index(idx)
+        i = bisect.bisect_left([m for m, _ in entries], t0)
+        return entries[i-1][1] if i else 0
+
+    # ---------- CountsRepo ----------
+
     def append(self, row: dict) -> None:
-        with COUNTS_LOG.open("a", encoding="utf-8") as f:
-            f.write(json.dumps(row)+"\n")
+        ts = float(row.get("ts", 0))
+        with self._lock:
+            self._segment(_day(ts)).append(ts, json.dumps(row)+"\n")
     def read_range(self, t0: float, t1: float) -> Iterable[dict]:
-        with COUNTS_LOG.open("r", encoding="utf-8") as f:
-            for line in f:
-                try: ev=json.loads(line)
-                except: continue
-                ts=float(ev.get("ts",0))
-                if t0<=ts<=t1: yield ev
+        with self._lock:
+            for seg in self._open.values(): seg.flush()
+        d0, d1 = _day_or(t0, ""), _day_or(t1, "9999")
+        for data in sorted(self.root.glob("*.jsonl")):
+            if not (d0 <= data.stem <= d1): continue
+            with data.open("rb") as f:
+                off = self._seek_offset(data.with_suffix(".idx"), t0)
+                if off:
+                    f.seek(off-1)
+                    if f.read(1) != b"\n": f.readline()
+                for line in f:
+                    try: ev=json.loads(line)
+                    except: continue
+                    ts=float(ev.get("ts",0))
+                    if t0<=ts<=t1: yield ev
+    def position(self) -> dict:
+        """End of the log: newest segment and its size (buffered rows are written first)."""
+        with self._lock:
+            for seg in self._open.values(): seg.flush()
+        segs = sorted(self.root.glob("*.jsonl"))
+        return {"segment": segs[-1].stem, "offset": segs[-1].stat().st_size} if segs else {"segment": "", "offset": 0}
+    def read_since(self, pos: dict) -> Iterator[dict]:
+        """Rows appended after `pos` (from `position`): the rest of that segment plus all newer ones.
+
+        Rows written into an older day's segment after `pos` was taken (only
+        replays of old captures do that) are not seen. ValueError when `pos`
+        no longer fits the log (segment shrunk or deleted).
+        """
+        with self._lock:
+            for seg in self._open.values(): seg.flush()
+        if "segment" not in pos: raise ValueError(f"not a JSONL log position: {pos}")
+        name, off = pos["segment"], int(pos.get("offset", 0))
+        first = self.root / f"{name}.jsonl"
+        if name and (not first.exists() or first.stat().st_size < off): raise ValueError(f"stale log position {pos}")
+        for data in sorted(self.root.glob("*.jsonl")):
+            if data.stem < name: continue
+            with data.open("rb") as f:
+                if data.stem == name: f.seek(off)
+                for line in f:
+                    try: yield json.loads(line)
+                    except ValueError: continue
+    def flush(self) -> None:
+        with self._lock:
+            for seg in self._open.values(): seg.flush(sync=True)
+    def close(self) -> None:
+        with self._lock:
+            while self._open: self._open.popitem()[1].close()
+
+    # ---------- Migration ----------
+
+    def migrate_legacy(self, path: Path) -> int:
+        """Split an old single-file counts.jsonl into day segments; crash-safe and resumable.
+
+        The segments are built in MIGRATE_DIR (merged with any day file already
+        in root) and marked done; only then are they renamed into place one by
+        one. A crash while building leaves root untouched and the next start
+        rebuilds; a crash while renaming resumes the renames. The legacy file
+        is renamed away before the work dir is removed, so rows never replay.
+        """
+        work = self.root / MIGRATE_DIR; done = work / "DONE"; n = 0
+        if not done.exists():
+            shutil.rmtree(work, ignore_errors=True)
+            tmp = JsonlCountsRepo(work, **{**self._opts, "fsync": "batch"}, legacy=None)
+            with path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    try: row=json.loads(line)
+                    except: continue
+                    tmp.append(row); n += 1
+            tmp.flush()
+            for seg in sorted(work.glob("*.jsonl")):     # fold in rows already logged for those days
+                if not (self.root / seg.name).exists(): continue
+                with (self.root / seg.name).open("r", encoding="utf-8") as f:
+                    for line in f:
+                        try: tmp.append(json.loads(line))
+                        except ValueError: continue
+            tmp.close()
+            done.write_text(str(n), encoding="utf-8")
+        else:
+            n = int(done.read_text(encoding="utf-8") or 0)
+        for f in sorted(work.glob("*.idx")) + sorted(work.glob("*.jsonl")):     # each rename is atomic
+            os.replace(f, self.root / f.name)
+        path.replace(path.with_name(path.name + ".migrated"))
+        shutil.rmtree(work, ignore_errors=True)
+        return n
@@ -0,0 +1,32 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from shared.metrics import REGISTRY, Registry
+
+
+class MetricsServer:
+    """GET /metrics in Prometheus text format, served from a daemon thread."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 9108, registry: Registry = REGISTRY):
+        reg = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *a): pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404); return
+                body = reg.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body))); self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer((host, port), Handler); self._server.daemon_threads = True
+        self.address = self._server.server_address
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True)
+
+    def start(self) -> "MetricsServer":
+        self._thread.start(); return self
+
+    def stop(self) -> None:
+        self._server.shutdown(); self._server.server_close()
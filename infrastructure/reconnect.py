@@ -0,0 +1,59 @@
+import random, time
+
+from shared.metrics import CAMERA_UP, STALLS
+
+BACKOFF_BASE_S = 1.0        # first retry after 0.5-1 s ...
+BACKOFF_CAP_S = 60.0        # ... doubling up to 30-60 s
+OPEN_AFTER = 6              # consecutive failures that open the circuit (camera "down")
+COOLDOWN_S = 300.0          # while down, one probe every 150-300 s
+STABLE_S = 30.0             # a connection up this long clears the failure streak
+STALL_S = 30.0              # no bytes (alerts or heartbeats) for this long = stalled stream
+
+# link states, as shown in the UI
+CONNECTING, UP, RETRYING, DOWN = "connecting", "up", "retrying", "down"
+
+
+class CameraLink:
+    """Connection health of one camera stream: jittered backoff, stall bookkeeping, circuit breaker.
+
+    The stream loop reports `connected()`, `data()` per chunk and `failed()`
+    per error; `failed` returns how long to wait before the next attempt.
+    Delays grow exponentially with "equal jitter" (uniform in [d/2, d]) so
+    cameras behind a rebooted switch do not reconnect in lockstep. After
+    OPEN_AFTER consecutive failures the circuit opens: the camera is DOWN
+    and only probed every COOLDOWN_S; a probe that connects closes it.
+    """
+
+    def __init__(self, camera_ip: str, rnd: random.Random | None = None):
+        self._up = CAMERA_UP.labels(camera_ip); self._stalls = STALLS.labels(camera_ip); self._up.set(0)
+        self.state = CONNECTING; self.since = time.time()
+        self.failures = 0; self.reconnects = 0; self.stalls = 0; self.last_error = ""
+        self._rnd = rnd or random.Random()
+        self._up_at = 0.0; self.last_data = 0.0
+
+    def _set(self, state: str) -> None:
+        if state != self.state: self.state = state; self.since = time.time(); self._up.set(int(state == UP))
+
+    def connected(self) -> None:
+        self._up_at = self.last_data = time.monotonic(); self._set(UP)
+
+    def data(self) -> None:
+        self.last_data = time.monotonic()
+
+    def failed(self, error: str) -> float:
+        """Record a failed attempt or a dropped / stalled stream; returns the delay before retrying."""
+        now = time.monotonic()
+        if self.state == UP:
+            self.reconnects += 1
+            if now - self._up_at >= STABLE_S: self.failures = 0
+            if now - self.last_data >= STALL_S * 0.9: self.stalls += 1; self._stalls.inc(); error = f"stalled ({error})"
+        self.failures += 1; self.last_error = error
+        if self.failures >= OPEN_AFTER:
+            self._set(DOWN); d = COOLDOWN_S
+        else:
+            self._set(RETRYING); d = min(BACKOFF_CAP_S, BACKOFF_BASE_S * 2 ** (self.failures - 1))
+        return self._rnd.uniform(d / 2, d)
+
+    def snapshot(self) -> dict:
+        return {"state": self.state, "since": self.since, "failures": self.failures, "reconnects": self.reconnects,
+                "stalls": self.stalls, "last_error": self.last_error}
@@ -0,0 +1,159 @@
+import json, threading, time
+from pathlib import Path
+from typing import Callable, Iterable
+from domain.models import Direction
+from domain.rollups import Granularity, GRANULARITIES, bucket_start, bucket_range, ceil_bucket, cover
+from shared.paths import ROLLUP_DIR
+
+MINUTE_KEEP_DAYS = 31   # minute partitions older than this are deleted; hours and days are kept
+BACKFILL_MARK = "backfill.pending"      # present while a rebuild from the counts log is unfinished
+
+Series = dict[int, int]                         # bucket start -> count
+Partition = dict[tuple[str, str], Series]       # (camera_ip, direction) -> series
+
+
+def _part_name(g: Granularity, bucket: int) -> str:
+    if g == "minute": return time.strftime("%Y-%m-%d", time.localtime(bucket))
+    if g == "hour": return time.strftime("%Y-%m", time.localtime(bucket))
+    return "all"
+
+
+class JsonRollupStore:
+    """Incremental IN/OUT counters per camera at minute, hour and day granularity.
+
+    Counters live in partitions (minute: one file per day, hour: per month,
+    day: a single file) under ROLLUP_DIR/<granularity>/. Each series is stored
+    as a flat, delta-encoded [bucket, count, dbucket, count, ...] list. Dirty
+    partitions are rewritten atomically every `flush_interval` seconds.
+    """
+
+    def __init__(self, root: Path = ROLLUP_DIR, flush_interval: float = 10.0):
+        self.root = Path(root)
+        for g in GRANULARITIES: (self.root / g).mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._parts: dict[tuple[Granularity, str], Partition] = {}
+        self._dirty: set[tuple[Granularity, str]] = set()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(flush_interval,), name="rollups", daemon=True)
+        self._thread.start()
+
+    # ---------- Partitions ----------
+
+    def _path(self, key: tuple[Granularity, str]) -> Path:
+        return self.root / key[0] / f"{key[1]}.json"
+
+    def _part(self, g: Granularity, bucket: int) -> Partition:
+        key = (g, _part_name(g, bucket))
+        part = self._parts.get(key)
+        if part is None:
+            part = {}
+            try: raw = json.loads(self._path(key).read_text(encoding="utf-8"))
+            except (OSError, ValueError): raw = {}
+            for name, flat in raw.items():
+                ip, _, direction = name.rpartition("|"); series: Series = {}; b = 0
+                for i in range(0, len(flat) - 1, 2):
+                    b += flat[i]; series[b] = flat[i+1]
+                part[(ip, direction)] = series
+            self._parts[key] = part
+        return part
+
+    def _write(self, key: tuple[Granularity, str]) -> None:
+        out = {}
+        for (ip, direction), series in self._parts[key].items():
+            flat = []; prev = 0
+            for b in sorted(series): flat += [b - prev, series[b]]; prev = b
+            out[f"{ip}|{direction}"] = flat
+        path = self._path(key); tmp = path.with_suffix(".new")
+        tmp.write_text(json.dumps(out, separators=(",", ":")), encoding="utf-8")
+        tmp.replace(path)
+
+    # ---------- Writes ----------
+
+    def add(self, camera_ip: str, direction: Direction, ts: float, n: int = 1) -> None:
+        with self._lock:
+            for g in GRANULARITIES:
+                b = bucket_start(ts, g)
+                series = self._part(g, b).setdefault((camera_ip, direction), {})
+                series[b] = series.get(b, 0) + n
+                self._dirty.add((g, _part_name(g, b)))
+
+    def backfill(self, rows: Iterable[dict]) -> int:
+        """Feed historic raw rows (e.g. from CountsRepo.read_range) into the rollups."""
+        n = 0
+        for r in rows:
+            self.add(r.get("camera_ip", ""), r.get("direction", "?"), float(r.get("ts", 0))); n += 1
+        self.flush()
+        return n
+
+    def is_empty(self) -> bool:
+        return not self._dirty and not any(self.root.glob("*/*.json"))
+
+    def needs_backfill(self) -> bool:
+        """Nothing rolled up yet (first start, or after an upgrade), or an earlier rebuild was cut short."""
+        return (self.root / BACKFILL_MARK).exists() or self.is_empty()
+
+    def start_backfill(self, read_range: Callable[[float, float], Iterable[dict]],
+                       on_done: Callable[[int], None] | None = None) -> threading.Thread:
+        """Rebuild from the counts log up to now on a worker thread; events added meanwhile are kept.
+
+        Call before events flow in. Leftovers of an unfinished rebuild are
+        dropped first; if this one is cut short too, the next start redoes it.
+        """
+        mark = self.root / BACKFILL_MARK; until = time.time()
+        if mark.exists():
+            with self._lock:
+                self._parts = {}; self._dirty.clear()
+                for p in self.root.glob("*/*.json"): p.unlink(missing_ok=True)
+        mark.touch()
+        def run() -> None:
+            n = self.backfill(read_range(0, until)); mark.unlink(missing_ok=True)
+            if on_done: on_done(n)
+        t = threading.Thread(target=run, name="rollups-backfill", daemon=True); t.start()
+        return t
+
+    def flush(self) -> None:
+        with self._lock:
+            for key in self._dirty: self._write(key)
+            # keep only what was just written; everything else reloads lazily
+            self._parts = {k: v for k, v in self._parts.items() if k in self._dirty}
+            self._dirty.clear()
+        cutoff = time.strftime("%Y-%m-%d", time.localtime(time.time() - MINUTE_KEEP_DAYS * 86400))
+        for p in (self.root / "minute").glob("*.json"):
+            if p.stem < cutoff: p.unlink(missing_ok=True)
+
+    def close(self) -> None:
+        self._stop.set(); self._thread.join(2)
+        self.flush()
+
+    def _run(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try: self.flush()
+            except OSError: pass
+
+    # ---------- Queries ----------
+
+    def query(self, t0: float, t1: float, granularity: Granularity = "hour",
+              camera_ip: str | None = None) -> list[tuple[int, str, str, int]]:
+        """(bucket_start, camera_ip, direction, count) for buckets starting in [t0, t1)."""
+        out = []
+        with self._lock:
+            for b in bucket_range(t0, t1, granularity):
+                for (ip, direction), series in self._part(granularity, b).items():
+                    if camera_ip is not None and ip != camera_ip: continue
+                    c = series.get(b)
+                    if c: out.append((b, ip, direction, c))
+        return out
+
+    def totals(self, t0: float, t1: float, camera_ip: str | None = None) -> dict[tuple[str, str], int]:
+        """(camera_ip, direction) -> count over [t0, t1), using the coarsest buckets that fit.
+
+        Past MINUTE_KEEP_DAYS the minute buckets are gone, so an edge there
+        is widened to the whole hour around it: old totals are to the hour.
+        """
+        out: dict[tuple[str, str], int] = {}
+        kept = bucket_start(time.time() - MINUTE_KEEP_DAYS * 86400, "day")     # flush() deletes minutes before this
+        for g, a, b in cover(t0, t1):
+            if g == "minute" and a < kept: g, a, b = "hour", bucket_start(a, "hour"), ceil_bucket(b, "hour")
+            for _, ip, direction, c in self.query(a, b, g, camera_ip):
+                out[(ip, direction)] = out.get((ip, direction), 0) + c
+        return out
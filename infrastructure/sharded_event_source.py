@@ -0,0 +1,250 @@
+import multiprocessing as mp, signal, threading, time
+from multiprocessing.connection import Connection, wait
+from pathlib import Path
+from typing import Callable, Iterable
+
+from domain.models import CameraConf, FileEvent
+from application.ports import EventSource, ImageStore
+from shared.metrics import REGISTRY
+
+FLUSH_S = 0.01          # shard -> parent batching interval
+STATS_S = 1.0           # how often a shard reports its source stats and metrics
+RESCAN_S = 2.0          # how often the parent re-reads the camera repo for added / removed cameras
+RESTART_S = (1, 2, 4, 8, 15, 30)    # backoff before restarting a crashed shard
+STABLE_S = 60.0         # a shard up this long has its backoff reset
+
+
+# ---------- Shard process ----------
+
+class _StaticRepo:
+    def __init__(self, cams: list[CameraConf]): self.cams = cams
+    def load_all(self) -> list[CameraConf]: return list(self.cams)
+
+
+class _RelayImageStore:
+    """Holds fetched snapshot bytes until the shard ships them to the parent's real ImageStore."""
+
+    def __init__(self): self._lock = threading.Lock(); self._data: dict[str, bytes] = {}; self._n = 0
+
+    def store(self, chunks: Iterable[bytes], remote_ip: str, raw_name: str) -> str:
+        data = b"".join(chunks)
+        with self._lock: self._n += 1; key = f"relay:{self._n}"; self._data[key] = data
+        return key
+
+    def take(self, key: str) -> bytes:
+        with self._lock: return self._data.pop(key, b"")
+
+
+def _inner_source(kind: str, store, repo, capture_dir: Path | None) -> EventSource:
+    if kind == "asyncio":
+        from .async_isapi_event_source import AsyncIsapiEventSource
+        return AsyncIsapiEventSource(store, repo, capture_dir)
+    from .isapi_event_source import IsapiEventSource
+    return IsapiEventSource(store, repo, capture_dir)
+
+
+def _shard_main(conn: Connection, cams: list[dict], kind: str, capture_dir: Path | None, images: bool) -> None:
+    """Entry point of a shard process: runs an in-process source for its cameras, batches records to `conn`.
+
+    Records: ("f", ip, raw_name, when) counted event, ("i", ip, raw_name, when, jpeg) snapshot,
+    ("l", msg) log line, ("s", stats, metrics) source stats and the REGISTRY series changed since the
+    last "s". Commands from the parent: ("cams", [dict]), ("stop", None).
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)     # the parent decides when shards stop
+    lock = threading.Lock(); out: list[tuple] = []
+    def post(rec: tuple) -> None:
+        with lock: out.append(rec)
+    store = _RelayImageStore(); repo = _StaticRepo([CameraConf.from_dict(d) for d in cams])
+    src = _inner_source(kind, store, repo, capture_dir)
+    callbacks = (lambda ev: post(("f", ev.camera_ip, ev.raw_name, ev.when)), lambda msg: post(("l", msg)),
+                 (lambda ev: post(("i", ev.camera_ip, ev.raw_name, ev.when, store.take(ev.path)))) if images else None)
+    src.start(*callbacks); next_stats = 0.0; sent: dict = {}
+    def stats() -> tuple:
+        changed = {k: v for k, v in REGISTRY.values().items() if sent.get(k) != v}; sent.update(changed)
+        return ("s", src.stats(), changed)
+    try:
+        while True:
+            if conn.poll(FLUSH_S):
+                cmd, arg = conn.recv()
+                if cmd == "stop": break
+                if cmd == "cams":
+                    repo.cams = [CameraConf.from_dict(d) for d in arg]; src.reconcile()
+            with lock: batch = out[:]; out.clear()
+            if time.monotonic() >= next_stats: batch.append(stats()); next_stats = time.monotonic() + STATS_S
+            if batch: conn.send(batch)
+    except (EOFError, OSError):
+        return                                          # parent went away
+    finally:
+        src.stop()
+    with lock: batch = out[:]
+    try: conn.send(batch + [stats()])
+    except OSError: pass
+    conn.close()
+
+
+# ---------- Parent ----------
+
+class _Shard:
+    def __init__(self, index: int):
+        self.index = index; self.cams: dict[str, dict] = {}
+        self.proc: mp.process.BaseProcess | None = None; self.conn: Connection | None = None
+        self.restarts = 0; self.failures = 0; self.started_at = 0.0; self.restart_at = 0.0
+        self.stats: dict = {}
+        self.metrics: dict = {}      # REGISTRY series last merged from this shard's process
+
+
+def _fold(dicts: list[dict]) -> dict:
+    """Merge per-shard stats: nested dicts recursively, counts summed, *_ms maxed, ratios at their worst."""
+    out: dict = {}
+    for d in dicts:
+        for k, v in d.items():
+            if isinstance(v, dict): out[k] = _fold([out.get(k, {}), v])
+            elif isinstance(v, bool) or not isinstance(v, (int, float)): out[k] = v
+            elif k not in out: out[k] = v
+            elif k.endswith("_ms"): out[k] = max(out[k], v)
+            elif k == "connection_reuse": out[k] = min(out[k], v)
+            else: out[k] += v
+    return out
+
+
+class ShardedEventSource(EventSource):
+    """Partitions the enabled cameras over `shards` worker processes.
+
+    Each shard runs a full in-process source ("threads" or "asyncio") for its
+    cameras, including snapshot fetching, and sends compact record batches
+    back over a pipe; one parent thread multiplexes the pipes and calls the
+    usual callbacks. Snapshot bytes are stored in the parent's ImageStore.
+    Crashed shards are restarted with backoff. Cameras stay on their shard;
+    added ones go to the least loaded shard, and only shards whose camera
+    list changed are told and reconcile in place (the repo is re-read every
+    RESCAN_S, or at once on reconcile()).
+    Each shard's metrics (pc_alerts_total, pc_camera_up, ...) are merged
+    into this process's REGISTRY with its stats, so /metrics covers them.
+    """
+
+    def __init__(self, image_store: ImageStore, cam_repo, shards: int, kind: str = "threads",
+                 capture_dir: Path | None = None):
+        self._image_store = image_store; self._repo = cam_repo; self._kind = kind; self._capture_dir = capture_dir
+        self._shards = [_Shard(i) for i in range(max(1, shards))]
+        self._ctx = mp.get_context("spawn")
+        self._thread: threading.Thread | None = None; self._halt = threading.Event()
+        self._rescan = threading.Event()
+
+    # ---------- EventSource ----------
+
+    def start(self, on_file: Callable[[FileEvent], None], on_log: Callable[[str], None],
+              on_image: Callable[[FileEvent], None] | None = None) -> None:
+        if self.is_running():
+            on_log("ISAPI already running")
+            return
+        self._on_file, self._on_log, self._on_image = on_file, on_log, on_image
+        self._halt.clear()
+        for sh in self._shards: sh.cams = {}; sh.restarts = sh.failures = 0; sh.stats = {}
+        self._assign(self._enabled())
+        for sh in self._shards: self._spawn(sh)
+        self._thread = threading.Thread(target=self._run, name="isapi-shards", daemon=True); self._thread.start()
+        on_log(f"ISAPI started for {sum(len(s.cams) for s in self._shards)} cameras on {len(self._shards)} processes")
+
+    def stop(self) -> None:
+        self._halt.set()
+        if self._thread: self._thread.join(5); self._thread = None
+        for sh in self._shards: self._kill(sh)
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def stats(self) -> dict:
+        out = _fold([sh.stats for sh in self._shards])
+        out["shards"] = [{"cameras": len(sh.cams), "pid": sh.proc.pid if sh.proc else None,
+                          "alive": bool(sh.proc and sh.proc.is_alive()), "restarts": sh.restarts} for sh in self._shards]
+        return out
+
+    def reconcile(self) -> None:
+        """Re-read the camera repo now instead of at the next RESCAN_S tick; changed shards reconcile in place."""
+        self._rescan.set()
+
+    # ---------- Placement ----------
+
+    def _enabled(self) -> dict[str, dict]:
+        return {c.ip: c.to_dict() for c in self._repo.load_all() if getattr(c, "enabled", True)}
+
+    def _assign(self, cams: dict[str, dict]) -> set[int]:
+        """Sticky placement; new cameras go to the least loaded shard. Returns the shards that changed."""
+        changed = set()
+        for sh in self._shards:
+            for ip in list(sh.cams):
+                if cams.get(ip) != sh.cams[ip]:
+                    changed.add(sh.index)
+                    if ip in cams: sh.cams[ip] = cams[ip]
+                    else: del sh.cams[ip]
+        placed = {ip for sh in self._shards for ip in sh.cams}
+        for ip in sorted(set(cams) - placed):
+            sh = min(self._shards, key=lambda s: (len(s.cams), s.index)); sh.cams[ip] = cams[ip]; changed.add(sh.index)
+        return changed
+
+    # ---------- Processes ----------
+
+    def _spawn(self, sh: _Shard) -> None:
+        parent, child = self._ctx.Pipe()
+        sh.proc = self._ctx.Process(target=_shard_main, name=f"isapi-shard-{sh.index}", daemon=True,
+                                    args=(child, list(sh.cams.values()), self._kind, self._capture_dir,
+                                          self._on_image is not None))
+        sh.proc.start(); child.close(); sh.conn = parent; sh.started_at = time.monotonic()
+
+    def _kill(self, sh: _Shard) -> None:
+        if sh.proc is None: return
+        try: sh.conn.send(("stop", None))
+        except OSError: pass
+        deadline = time.monotonic() + 5
+        while sh.proc.is_alive() and time.monotonic() < deadline:      # drain the final batch
+            if sh.conn.poll(0.05) and not self._recv(sh): break
+        while sh.conn.poll() and self._recv(sh): pass
+        if sh.proc.is_alive(): sh.proc.kill(); sh.proc.join(1)
+        sh.conn.close(); sh.proc = sh.conn = None; self._gone(sh)
+
+    def _gone(self, sh: _Shard) -> None:
+        """The shard process ended: its gauges (pc_camera_up) drop to 0, and a new process counts from zero."""
+        REGISTRY.merge({k: 0 for k, v in sh.metrics.items() if not isinstance(v, tuple)}, sh.metrics); sh.metrics = {}
+
+    def _recv(self, sh: _Shard) -> bool:
+        try: batch = sh.conn.recv()
+        except (EOFError, OSError): return False
+        for rec in batch:
+            kind = rec[0]
+            if kind == "f": self._on_file(FileEvent(path="", camera_ip=rec[1], raw_name=rec[2], when=rec[3]))
+            elif kind == "l": self._on_log(rec[1])
+            elif kind == "s": sh.stats = rec[1]; REGISTRY.merge(rec[2], sh.metrics)
+            elif kind == "i" and self._on_image and rec[4]:
+                path = self._image_store.store([rec[4]], rec[1], rec[2])
+                self._on_image(FileEvent(path=path, camera_ip=rec[1], raw_name=rec[2], when=rec[3]))
+        return True
+
+    def _run(self) -> None:
+        next_scan = time.monotonic() + RESCAN_S
+        while not self._halt.is_set():
+            live = [sh for sh in self._shards if sh.proc is not None]
+            ready = wait([sh.conn for sh in live] + [sh.proc.sentinel for sh in live], timeout=0.2)
+            for sh in live:
+                if sh.conn in ready: self._recv(sh)
+            for sh in live:
+                if sh.proc.sentinel in ready:
+                    while sh.conn.poll() and self._recv(sh): pass
+                    sh.proc.join(); code = sh.proc.exitcode; sh.conn.close(); sh.proc = sh.conn = None; self._gone(sh)
+                    if time.monotonic() - sh.started_at > STABLE_S: sh.failures = 0
+                    delay = RESTART_S[min(sh.failures, len(RESTART_S) - 1)]; sh.failures += 1
+                    sh.restart_at = time.monotonic() + delay
+                    self._on_log(f"ISAPI shard {sh.index} exited (code {code}); restarting in {delay}s")
+            now = time.monotonic()
+            for sh in self._shards:
+                if sh.proc is None and now >= sh.restart_at and not self._halt.is_set():
+                    sh.restarts += 1; self._spawn(sh)
+            if self._rescan.is_set() or now >= next_scan:
+                self._rescan.clear(); next_scan = now + RESCAN_S
+                try: cams = self._enabled()
+                except Exception as e: self._on_log(f"ISAPI shards: camera list not reloaded: {e}"); continue
+                for i in self._assign(cams):
+                    sh = self._shards[i]
+                    if sh.conn is not None:
+                        try: sh.conn.send(("cams", list(sh.cams.values())))
+                        except OSError: pass
+                    self._on_log(f"ISAPI shard {i}: now {len(sh.cams)} cameras")
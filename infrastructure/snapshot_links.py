@@ -0,0 +1,102 @@
+import json, os, threading, time
+from pathlib import Path
+from typing import Callable, Iterable, TextIO
+from shared.paths import LINKS_DIR
+from .image_store import MEM_PREFIX
+
+GONE_KEEP = 1024        # evicted paths remembered in case their link arrives after the eviction
+
+
+def _day_or(ts: float, default: str) -> str:
+    try: return time.strftime("%Y-%m-%d", time.localtime(ts))
+    except (OverflowError, OSError, ValueError): return default   # open-ended ranges (+-inf)
+
+
+def _read(p: Path) -> list[dict]:
+    out = []
+    try:
+        with p.open("r", encoding="utf-8") as f:
+            for line in f:
+                try: out.append(json.loads(line))
+                except ValueError: continue         # torn last line after a crash
+    except OSError: pass
+    return out
+
+
+class JsonlSnapshotLinks:
+    """Which snapshot belongs to which count: (camera_ip, ts) -> image path, one YYYY-MM-DD.jsonl per day.
+
+    A count is logged as soon as its alert arrives and the snapshot follows
+    later through on_image, carrying the count's camera_ip and when. The
+    count log is append-only, so the path is kept here and exports join it
+    back onto the rows with `reader`. Files are named by the day of the count.
+
+    Only images that outlive the process are linked (not "mem:" keys), and
+    a link goes when its image does: wire `forget` to the image store's
+    evictions. So the files never hold more links than the store has images.
+    """
+
+    def __init__(self, root: Path = LINKS_DIR):
+        self.root = Path(root); self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock(); self._open: dict[str, TextIO] = {}
+        self._where: dict[str, str] = {}            # image path -> day file holding its link
+        self._gone: dict[str, None] = {}
+        for p in sorted(self.root.glob("*.jsonl")):    # drop links to images deleted while we were not running
+            rows = _read(p); live = [r for r in rows if os.path.isfile(r["file"])]
+            if len(live) != len(rows): self._rewrite(p.stem, live)
+            for r in live: self._where[r["file"]] = p.stem
+
+    def add(self, camera_ip: str, ts: float, path: str) -> None:
+        if path.startswith(MEM_PREFIX): return
+        line = json.dumps({"ip": camera_ip, "ts": ts, "file": path}, separators=(",", ":")) + "\n"
+        day = _day_or(ts, "0000")
+        with self._lock:
+            if path in self._gone: del self._gone[path]; return     # evicted before its count was linked
+            f = self._open.get(day)
+            if f is None:
+                self._close_files()          # counts are near-monotonic: one day open at a time
+                f = self._open[day] = (self.root / f"{day}.jsonl").open("a", encoding="utf-8", buffering=1)
+            f.write(line); self._where[path] = day
+
+    def forget(self, paths: Iterable[str]) -> None:
+        """The image store evicted these images: drop their links (each touched day file is rewritten once)."""
+        with self._lock:
+            days: dict[str, set[str]] = {}
+            for p in paths:
+                day = self._where.pop(p, None)
+                if day is not None: days.setdefault(day, set()).add(p)
+                elif not p.startswith(MEM_PREFIX):
+                    self._gone[p] = None
+                    if len(self._gone) > GONE_KEEP: del self._gone[next(iter(self._gone))]
+            for day, dead in days.items():
+                f = self._open.pop(day, None)
+                if f is not None: f.close()
+                self._rewrite(day, [r for r in _read(self.root / f"{day}.jsonl") if r["file"] not in dead])
+
+    def _rewrite(self, day: str, rows: list[dict]) -> None:
+        path = self.root / f"{day}.jsonl"
+        if not rows: path.unlink(missing_ok=True); return
+        tmp = path.with_suffix(".new")
+        tmp.write_text("".join(json.dumps(r, separators=(",", ":")) + "\n" for r in rows), encoding="utf-8")
+        tmp.replace(path)
+
+    def reader(self) -> Callable[[str, float], str]:
+        """lookup(camera_ip, ts) -> linked path or "", holding one day's links at a time.
+
+        Meant for rows streamed in ts order (CountsRepo.read_range): memory
+        stays at one day of links however long the exported range is.
+        """
+        day, links = None, {}
+        def lookup(camera_ip: str, ts: float) -> str:
+            nonlocal day, links
+            d = _day_or(ts, "0000")
+            if d != day: day = d; links = {(r["ip"], r["ts"]): r["file"] for r in _read(self.root / f"{d}.jsonl")}
+            return links.get((camera_ip, ts), "")
+        return lookup
+
+    def _close_files(self) -> None:
+        for f in self._open.values(): f.close()
+        self._open = {}
+
+    def close(self) -> None:
+        with self._lock: self._close_files()
@@ -0,0 +1,84 @@
+import threading, time
+from collections import deque
+from typing import Callable, Hashable
+from shared.metrics import SNAPSHOT_SECONDS
+
+
+class SnapshotStats:
+    """Queue depth / drops / fetch latency, shared by both event sources."""
+
+    def __init__(self, window: int = 256):
+        self._lock = threading.Lock()
+        self._lat: deque[float] = deque(maxlen=window)
+        self.queued = 0; self.dropped = 0; self.fetched = 0; self.failed = 0
+
+    def fetch_done(self, seconds: float, ok: bool) -> None:
+        SNAPSHOT_SECONDS.labels("ok" if ok else "failed").observe(seconds)
+        with self._lock:
+            self._lat.append(seconds)
+            if ok: self.fetched += 1
+            else: self.failed += 1
+
+    def snapshot(self) -> dict:
+        with self._lock: lat = sorted(self._lat)
+        pct = lambda q: round(lat[min(len(lat) - 1, int(q * len(lat)))] * 1000, 1) if lat else 0.0
+        return {"queued": self.queued, "dropped": self.dropped, "fetched": self.fetched, "failed": self.failed,
+                "latency_p50_ms": pct(0.5), "latency_p95_ms": pct(0.95), "latency_max_ms": pct(1.0)}
+
+
+class SnapshotPool:
+    """Shared snapshot fetchers fed from bounded per-camera queues.
+
+    Jobs are callables that fetch and store one snapshot. Each camera (key)
+    gets a FIFO of at most `per_camera` jobs; when it is full the oldest job
+    is dropped (the count was already emitted, only its image is lost).
+    Workers take cameras round-robin and never run two fetches for the same
+    camera at once, so one slow camera cannot starve the others.
+    """
+
+    def __init__(self, workers: int = 4, per_camera: int = 4):
+        self.per_camera = per_camera
+        self.stats = SnapshotStats()
+        self._cv = threading.Condition()
+        self._queues: dict[Hashable, deque] = {}
+        self._ready: deque[Hashable] = deque()     # keys with work and no fetch in flight
+        self._busy: set[Hashable] = set()
+        self._stopped = False
+        self._threads = [threading.Thread(target=self._run, name=f"snapshot-{i}", daemon=True) for i in range(workers)]
+        for t in self._threads: t.start()
+
+    def submit(self, key: Hashable, job: Callable[[], bool]) -> None:
+        """Queue `job` (returns True when an image was stored) for camera `key`."""
+        with self._cv:
+            if self._stopped: return
+            q = self._queues.setdefault(key, deque(maxlen=self.per_camera))
+            if len(q) == q.maxlen: self.stats.dropped += 1; self.stats.queued -= 1
+            was_idle = not q
+            q.append(job); self.stats.queued += 1
+            if was_idle and key not in self._busy: self._ready.append(key); self._cv.notify()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        with self._cv:
+            self._stopped = True
+            for q in self._queues.values(): q.clear()
+            self._ready.clear(); self.stats.queued = 0
+            self._cv.notify_all()
+        deadline = time.monotonic() + timeout
+        for t in self._threads: t.join(max(0.0, deadline - time.monotonic()))
+
+    def _run(self) -> None:
+        while True:
+            with self._cv:
+                while not self._ready and not self._stopped: self._cv.wait()
+                if self._stopped: return
+                key = self._ready.popleft()
+                job = self._queues[key].popleft(); self.stats.queued -= 1
+                self._busy.add(key)
+            t = time.monotonic(); ok = False
+            try: ok = bool(job())
+            except Exception: pass
+            finally:
+                self.stats.fetch_done(time.monotonic() - t, ok)
+                with self._cv:
+                    self._busy.discard(key)
+                    if self._queues.get(key) and not self._stopped: self._ready.append(key); self._cv.notify()
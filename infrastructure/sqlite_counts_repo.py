@@ -0,0 +1,182 @@
+import json, sqlite3, sys, threading, time
+from pathlib import Path
+from typing import Iterable, Iterator
+from shared.paths import COUNTS_DB
+from .buffered_appender import FsyncPolicy
+
+COLUMNS = ("ts", "camera_ip", "camera_name", "direction", "file", "raw")
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS counts (
+    id          INTEGER PRIMARY KEY,
+    ts          REAL NOT NULL,
+    camera_ip   TEXT NOT NULL,
+    camera_name TEXT,
+    direction   TEXT NOT NULL,
+    file        TEXT,
+    raw         TEXT
+);
+CREATE INDEX IF NOT EXISTS counts_ts     ON counts(ts);
+CREATE INDEX IF NOT EXISTS counts_cam_ts ON counts(camera_ip, ts);
+"""
+INSERT = f"INSERT INTO counts ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+
+class SqliteCountsRepo:
+    """CountsRepo on SQLite in WAL mode, with rows inserted in batched transactions.
+
+    Rows are buffered like BufferedAppender does for the JSONL log and written
+    in one transaction per batch. The fsync policy maps onto `synchronous`:
+    "batch" -> FULL (every commit is durable), otherwise NORMAL (WAL is synced
+    at checkpoints), with an explicit checkpoint every `fsync_interval` for
+    "interval".
+    """
+
+    def __init__(self, path: Path = COUNTS_DB, batch_rows: int = 256, flush_interval: float = 0.5,
+                 fsync: FsyncPolicy = "interval", fsync_interval: float = 1.0):
+        self.path = Path(path)
+        self.batch_rows = max(1, int(batch_rows))
+        self.flush_interval = flush_interval
+        self.fsync = fsync; self.fsync_interval = fsync_interval
+        self._db = self._connect()
+        self._db.execute("PRAGMA synchronous=" + ("FULL" if fsync == "batch" else "NORMAL"))
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._pending: list[tuple] = []
+        self._first_pending_at = 0.0
+        self._synced_at = time.monotonic()
+        self._closed = False
+        self._stop = threading.Event()
+        self.stats = {"rows": 0, "batches": 0, "checkpoints": 0}
+        self._thread = threading.Thread(target=self._run, name="counts-sqlite", daemon=True)
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    # ---------- Writes ----------
+
+    def append(self, row: dict) -> None:
+        with self._lock:
+            if self._closed: raise ValueError("repo is closed")
+            if not self._pending: self._first_pending_at = time.monotonic()
+            self._pending.append(tuple(row.get(c) for c in COLUMNS))
+            self.stats["rows"] += 1
+            if len(self._pending) >= self.batch_rows: self._flush_locked()
+
+    def append_many(self, rows: Iterable[dict], chunk: int = 50_000) -> int:
+        """Bulk insert (converter path): large transactions, no per-row buffering."""
+        n = 0; batch: list[tuple] = []
+        with self._lock:
+            self._flush_locked()
+            for row in rows:
+                batch.append(tuple(row.get(c) for c in COLUMNS))
+                if len(batch) >= chunk: self._insert_locked(batch); n += len(batch); batch = []
+            if batch: self._insert_locked(batch); n += len(batch)
+        return n
+
+    def _insert_locked(self, rows: list[tuple]) -> None:
+        self._db.execute("BEGIN")
+        try: self._db.executemany(INSERT, rows)
+        except BaseException: self._db.execute("ROLLBACK"); raise
+        self._db.execute("COMMIT")
+        self.stats["batches"] += 1
+
+    def _flush_locked(self) -> None:
+        if not self._pending: return
+        rows, self._pending = self._pending, []
+        self._insert_locked(rows)
+        if self.fsync == "interval" and time.monotonic() - self._synced_at >= self.fsync_interval:
+            self._checkpoint_locked()
+
+    def _checkpoint_locked(self) -> None:
+        self._db.execute("PRAGMA wal_checkpoint(PASSIVE)")
+        self._synced_at = time.monotonic(); self.stats["checkpoints"] += 1
+
+    def _run(self) -> None:
+        tick = max(0.01, self.flush_interval / 2)
+        while not self._stop.wait(tick):
+            with self._lock:
+                if self._closed: return
+                if self._pending and time.monotonic() - self._first_pending_at >= self.flush_interval:
+                    self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+            if not self._closed and self.fsync != "none": self._checkpoint_locked()
+
+    def close(self) -> None:
+        self._stop.set(); self._thread.join(2)
+        with self._lock:
+            if self._closed: return
+            self._flush_locked(); self._closed = True
+            self._db.close()
+
+    # ---------- Reads ----------
+
+    def read_range(self, t0: float, t1: float) -> Iterator[dict]:
+        """Indexed range scan streamed from a cursor on its own (WAL reader) connection."""
+        with self._lock: self._flush_locked()
+        db = self._connect()
+        try:
+            cur = db.execute(f"SELECT {', '.join(COLUMNS)} FROM counts WHERE ts BETWEEN ? AND ? ORDER BY ts", (t0, t1))
+            for r in cur: yield dict(zip(COLUMNS, r))
+        finally: db.close()
+
+    def position(self) -> dict:
+        """End of the log as the highest rowid (buffered rows are inserted first)."""
+        with self._lock:
+            self._flush_locked()
+            return {"rowid": self._db.execute("SELECT COALESCE(MAX(rowid), 0) FROM counts").fetchone()[0]}
+
+    def read_since(self, pos: dict) -> Iterator[dict]:
+        """Rows inserted after `pos` (from `position`)."""
+        if "rowid" not in pos: raise ValueError(f"not a SQLite log position: {pos}")
+        with self._lock: self._flush_locked()
+        db = self._connect()
+        try:
+            cur = db.execute(f"SELECT {', '.join(COLUMNS)} FROM counts WHERE rowid > ? ORDER BY rowid", (int(pos["rowid"]),))
+            for r in cur: yield dict(zip(COLUMNS, r))
+        finally: db.close()
+
+    def aggregate(self, t0: float, t1: float, bucket_s: int = 3600,
+                  camera_ip: str | None = None) -> list[tuple[int, str, str, int]]:
+        """(bucket_start, camera_ip, direction, count), buckets aligned to multiples of bucket_s (UTC)."""
+        with self._lock: self._flush_locked()
+        sql = ("SELECT CAST(ts / ? AS INTEGER) * ? AS b, camera_ip, direction, COUNT(*) FROM counts "
+               "WHERE ts BETWEEN ? AND ?" + (" AND camera_ip = ?" if camera_ip is not None else "") +
+               " GROUP BY b, camera_ip, direction ORDER BY b, camera_ip, direction")
+        args = [bucket_s, bucket_s, t0, t1] + ([camera_ip] if camera_ip is not None else [])
+        db = self._connect()
+        try: return [tuple(r) for r in db.execute(sql, args)]
+        finally: db.close()
+
+
+# ---------- Converter ----------
+
+def _jsonl_rows(src: Path) -> Iterator[dict]:
+    if src.is_dir():        # day-segment directory written by JsonlCountsRepo
+        from .jsonl_counts_repo import JsonlCountsRepo
+        repo = JsonlCountsRepo(src, legacy=None)
+        try: yield from repo.read_range(float("-inf"), float("inf"))
+        finally: repo.close()
+        return
+    with src.open("r", encoding="utf-8") as f:
+        for line in f:
+            try: yield json.loads(line)
+            except ValueError: continue
+
+
+def import_jsonl(src: Path, dest: Path = COUNTS_DB) -> int:
+    """Copy a counts.jsonl file (or a day-segment directory) into a SQLite counts DB."""
+    repo = SqliteCountsRepo(dest)
+    try: return repo.append_many(_jsonl_rows(Path(src)))
+    finally: repo.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2: sys.exit("usage: python -m infrastructure.sqlite_counts_repo <counts.jsonl | counts dir> [dest.sqlite3]")
+    n = import_jsonl(Path(sys.argv[1]), Path(sys.argv[2]) if len(sys.argv) > 2 else COUNTS_DB)
+    print(f"imported {n} rows")
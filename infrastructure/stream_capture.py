@@ -0,0 +1,60 @@
+import json, struct, time
+from pathlib import Path
+from typing import Iterator, NamedTuple
+
+MAGIC = b"PCCAP1\n"
+_REC = struct.Struct("<cdI")      # kind, arrival time (unix s), payload length
+
+# record kinds
+INFO = b"I"       # JSON {"camera_ip": ...}; first record of a file
+CONNECT = b"C"    # a new alertStream response; payload = its Content-Type
+DATA = b"D"       # body bytes as they arrived (after de-chunking), before parsing
+
+
+class Record(NamedTuple):
+    kind: bytes
+    ts: float
+    payload: bytes
+
+
+class CaptureWriter:
+    """Raw alertStream bytes of one camera, with arrival timestamps.
+
+    File layout: MAGIC, then records of 13-byte header (kind, float64 time,
+    uint32 length) + payload. One file can hold several connections; each
+    starts with a CONNECT record so replay can reset the parser.
+    """
+
+    def __init__(self, path: Path, camera_ip: str):
+        self.path = Path(path); self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = self.path.open("ab")
+        if self._f.tell() == 0: self._f.write(MAGIC)
+        self._write(INFO, json.dumps({"camera_ip": camera_ip}).encode())
+
+    def _write(self, kind: bytes, payload: bytes) -> None:
+        self._f.write(_REC.pack(kind, time.time(), len(payload))); self._f.write(payload)
+
+    def connect(self, content_type: str | None) -> None:
+        self._write(CONNECT, (content_type or "").encode("latin-1")); self._f.flush()
+
+    def data(self, chunk: bytes) -> None:
+        self._write(DATA, chunk)
+
+    def close(self) -> None:
+        self._f.close()
+
+
+def capture_path(root: Path, camera_ip: str) -> Path:
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+    return Path(root) / f"{camera_ip.replace(':', '_')}__{stamp}.pccap"
+
+
+def read_capture(path: Path) -> Iterator[Record]:
+    """Records of a capture file; a torn last record (crash while writing) is ignored."""
+    with Path(path).open("rb") as f:
+        if f.read(len(MAGIC)) != MAGIC: raise ValueError(f"{path}: not a stream capture")
+        while len(head := f.read(_REC.size)) == _REC.size:
+            kind, ts, n = _REC.unpack(head)
+            payload = f.read(n)
+            if len(payload) < n: return
+            yield Record(kind, ts, payload)
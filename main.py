@@ -1,29 +1,49 @@
 #!/usr/bin/env python3
-import sys, os, csv
+import sys, os, time, multiprocessing
 from PySide6 import QtCore, QtWidgets, QtGui
-from shared.paths import ensure_dirs, KEEP_MIN, fmt_ts
+from shared.paths import ensure_dirs
+from shared.settings import load_settings
 from domain.models import CameraConf, FileEvent
 from application.event_processor import EventProcessor
+from application.event_bus import EventBus
+from application.live_counters import LiveCounters
 from infrastructure.jsonl_camera_repo import JsonlCameraRepo
-from infrastructure.jsonl_counts_repo import JsonlCountsRepo
-from infrastructure.image_store import LocalImageStore
-from infrastructure.isapi_event_source import IsapiEventSource
+from infrastructure.factory import make_counts_repo, make_event_source, make_image_store, make_metrics_server
+from infrastructure.rollup_store import JsonRollupStore
+from infrastructure.snapshot_links import JsonlSnapshotLinks
+from infrastructure.checkpoint_store import JsonCheckpointStore
+from infrastructure.exporters import HOURLY_COLUMNS, ROW_COLUMNS, count_rows, hourly_rows
 from ui.qss import LIGHT_QSS
 from ui.dialogs import CameraDialog, CsvDialog
+from ui.camera_table_model import CameraTableModel
+from ui.export_job import ExportJob
+from ui.self_test import SelfTestDialog
+from ui.thumbnails import ThumbnailService
+from ui.metrics_view import MetricsView
 
 class MainWin(QtWidgets.QMainWindow):
     def __init__(self):
         super().__init__(); self.setWindowTitle("People Counter (ISAPI)"); self.resize(1200, 750)
-        ensure_dirs()
-        self.camera_repo=JsonlCameraRepo(); self.counts_repo=JsonlCountsRepo()
-        self.processor=EventProcessor(self.camera_repo, self.counts_repo)
-        self.image_store=LocalImageStore(); self.event_source=IsapiEventSource(self.image_store, self.camera_repo)
+        ensure_dirs(); self.settings=load_settings(); st=self.settings
+        self.camera_repo=JsonlCameraRepo()
+        self.counts_repo=make_counts_repo(st)
+        self.rollups=JsonRollupStore()
+        self.links=JsonlSnapshotLinks()
+        self.processor=EventProcessor(self.camera_repo, self.counts_repo, self.rollups, self.links)
+        self.live=LiveCounters(self.counts_repo, JsonCheckpointStore(), st.counters_reset); restored=self.live.restore()
+        self.bus=EventBus()
+        if self.rollups.needs_backfill():      # off the GUI thread: an upgraded install may have years of log
+            self.rollups.start_backfill(self.counts_repo.read_range, on_done=lambda n: self.bus.post_log(f"Rollups rebuilt from {n} log rows"))
+        self.image_store=make_image_store(st); self.image_store.add_evict_listener(self.links.forget); self.event_source=make_event_source(st, self.image_store, self.camera_repo)
 
         from collections import defaultdict, deque
         self.cameras: list[CameraConf] = self.camera_repo.load_all()
-        self._counts = defaultdict(lambda: dict(IN=0, OUT=0, TOTAL=0))
         self._recent_by_camip = defaultdict(lambda: deque(maxlen=20))
         self._patterns_seen = set()
+        self.export_job=None; self.self_test=None
+        self.thumbs=ThumbnailService(loader=self.image_store.read, parent=self); self.thumbs.ready.connect(self._on_thumb); self.thumbs.failed.connect(self._on_thumb_failed)
+        self._thumb_waiting: dict[str, list[QtWidgets.QListWidgetItem]] = {}
+        self._preview_path=None; self._preview_size=None
 
         tabs = QtWidgets.QTabWidget(); self.setCentralWidget(tabs)
 
@@ -39,7 +59,8 @@ class MainWin(QtWidgets.QMainWindow):
         self.preview_label.setAlignment(QtCore.Qt.AlignCenter); self.preview_label.setStyleSheet("border:1px solid #e2e6ef; border-radius:10px;")
         box_prev=QtWidgets.QGroupBox("Most recent image"); v=QtWidgets.QVBoxLayout(box_prev); v.addWidget(self.preview_label)
 
-        self.table=QtWidgets.QTableWidget(0,8); self.table.setHorizontalHeaderLabels(["Name","IP","Hint","HTTPS","Snap","A→B","A←B","Total"])
+        self.table_model=CameraTableModel(self); self.table_model.totals_changed.connect(self._show_totals)
+        self.table=QtWidgets.QTableView(); self.table.setModel(self.table_model); self.table.verticalHeader().setVisible(False)
         self.table.horizontalHeader().setStretchLastSection(True); self.table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
         box_tbl=QtWidgets.QGroupBox("Cameras"); tv=QtWidgets.QVBoxLayout(box_tbl); tv.addWidget(self.table)
 
@@ -50,7 +71,7 @@ class MainWin(QtWidgets.QMainWindow):
         btn_row=QtWidgets.QHBoxLayout(); b_add=QtWidgets.QPushButton("＋ Add"); b_edit=QtWidgets.QPushButton("✎ Edit"); b_del=QtWidgets.QPushButton("🗑 Remove")
         btn_row.addWidget(b_add); btn_row.addWidget(b_edit); btn_row.addWidget(b_del); btn_row.addStretch(1)
         ctl=QtWidgets.QHBoxLayout(); self.b_start=QtWidgets.QPushButton("Start monitoring (ISAPI)"); self.b_stop=QtWidgets.QPushButton("Stop")
-        self.b_test=QtWidgets.QPushButton("Test cameras"); self.b_export=QtWidgets.QPushButton("Export CSV")
+        self.b_test=QtWidgets.QPushButton("Test cameras"); self.b_export=QtWidgets.QPushButton("Export…")
         ctl.addWidget(self.b_start); ctl.addWidget(self.b_stop); ctl.addWidget(self.b_test); ctl.addStretch(1); ctl.addWidget(self.b_export)
         self.gallery=QtWidgets.QListWidget(); self.gallery.setViewMode(QtWidgets.QListView.IconMode)
         self.gallery.setIconSize(QtCore.QSize(160,90)); self.gallery.setResizeMode(QtWidgets.QListWidget.Adjust)
@@ -66,7 +87,13 @@ class MainWin(QtWidgets.QMainWindow):
         self.log_view=QtWidgets.QPlainTextEdit(); self.log_view.setReadOnly(True); self.log_view.setMaximumBlockCount(3000)
         ll.addWidget(self.log_view)
 
+        self.metrics_server=None; metrics_err=""
+        try: self.metrics_server=make_metrics_server(st)
+        except OSError as e: metrics_err=f"Metrics endpoint not started: {e}"
+        self.metrics_view=MetricsView(endpoint=f"http://{st.metrics_host}:{st.metrics_port}/metrics" if self.metrics_server else "")
+
         tabs.addTab(dash,"Dashboard"); tabs.addTab(cams,"Cameras & Settings"); tabs.addTab(tests,"Detections Info"); tabs.addTab(logs,"Logs")
+        tabs.addTab(self.metrics_view,"Metrics")
         mb=self.menuBar(); filem=mb.addMenu("&File"); a_save=filem.addAction("Save Config"); a_save.triggered.connect(self.save_config)
         a_load=filem.addAction("Load Config"); a_load.triggered.connect(self.load_config); filem.addSeparator()
         a_quit=filem.addAction("Quit"); a_quit.triggered.connect(self.close)
@@ -74,32 +101,62 @@ class MainWin(QtWidgets.QMainWindow):
         self.b_start.clicked.connect(self.on_start); self.b_stop.clicked.connect(self.on_stop)
         self.b_test.clicked.connect(self.on_self_test); self.b_export.clicked.connect(self.on_export)
         self.ui_timer=QtCore.QTimer(self); self.ui_timer.timeout.connect(self.refresh_counts); self.ui_timer.start(1500)
-        self.gc_timer=QtCore.QTimer(self); self.gc_timer.timeout.connect(self.purge_old_images); self.gc_timer.start(20000)
+        self.image_store.start_purger(st.images_keep_min*60, st.images_max_mb*1024*1024, st.images_purge_s,
+                                      on_purged=lambda n: self.bus.post_log(f"{n} old images purged"))
+        self.bus_timer=QtCore.QTimer(self); self.bus_timer.timeout.connect(self._drain_events); self.bus_timer.start(st.ui_drain_ms)
+        self.snap_stats=QtWidgets.QLabel(""); self.statusBar().addPermanentWidget(self.snap_stats)
+        self.bus_stats=QtWidgets.QLabel(""); self.statusBar().addPermanentWidget(self.bus_stats)
         from ui.qss import LIGHT_QSS as _Q; self.setStyleSheet(_Q)
-        self.refresh_cam_list(); self.refresh_table()
+        self.refresh_cam_list(); self.refresh_table(); self.table_model.reset_counts(self.live.snapshot())
+        self._on_log(f"Counters restored ({restored['mode']}, {restored['rows']} log rows replayed in {restored['seconds']} s)")
+        self.ckpt_timer=QtCore.QTimer(self); self.ckpt_timer.timeout.connect(self.checkpoint_counters); self.ckpt_timer.start(st.checkpoint_s*1000)
+        if metrics_err: self._on_log(metrics_err)
 
     def _on_log(self, msg:str): self.log_view.appendPlainText(msg)
 
+    def _drain_events(self):
+        b=self.bus.drain()
+        if not len(b): return
+        t=time.perf_counter()
+        if b.files:
+            for ev in b.files: self._on_file(ev)
+            self.table_model.flush()
+        if b.images:
+            self.gallery.setUpdatesEnabled(False)
+            for ev in b.images: self._on_image(ev)
+            self.gallery.setUpdatesEnabled(True); self.show_latest_preview()
+        if b.logs: self.log_view.appendPlainText("\n".join(b.logs))
+        self.bus.record_drain(len(b), time.perf_counter()-t)
+
     def _on_file(self, ev: FileEvent):
         import re
         toks=[t for t in re.split(r"[^A-Za-z0-9]+", ev.raw_name) if t]; up=set([t.upper() for t in toks])
         newly=sorted(list(up - self._patterns_seen))
         if newly: self._patterns_seen |= up; self.patterns_edit.appendPlainText(", ".join(newly))
         out=self.processor.handle(ev); direction=out.direction
-        rec=self._counts[ev.camera_ip]
-        if direction=="IN": rec["IN"]=rec.get("IN",0)+1
-        elif direction=="OUT": rec["OUT"]=rec.get("OUT",0)+1
-        rec["TOTAL"]=rec.get("IN",0)+rec.get("OUT",0)
+        if self.live.add(ev.camera_ip, direction, ev.when or time.time()):     # first event of a new period
+            self.table_model.reset_counts(self.live.snapshot()); self._on_log("Counters reset for the new period")
+        else: self.table_model.add(ev.camera_ip, direction)
+
+    def _on_image(self, ev: FileEvent):
+        self.processor.attach_image(ev)
         self._recent_by_camip[ev.camera_ip].append((ev.path, ev.when))
-        self.show_latest_preview(); self.refresh_table()
         item=QtWidgets.QListWidgetItem(); base=os.path.basename(ev.path) if ev.path else ev.raw_name
         short=base[:28]+("…" if len(base)>28 else ""); item.setText(short)
-        if ev.path and os.path.exists(ev.path):
-            pm=QtGui.QPixmap(ev.path)
-            if not pm.isNull():
-                item.setIcon(QtGui.QIcon(pm.scaled(160,90, QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation)))
+        if ev.path:
+            pm=self.thumbs.request(ev.path,160,90)
+            if pm is not None: item.setIcon(QtGui.QIcon(pm))
+            else: self._thumb_waiting.setdefault(ev.path, []).append(item)
         self.gallery.insertItem(0, item)
 
+    def _on_thumb(self, path:str, w:int, h:int, pm:QtGui.QPixmap):
+        if (w,h)==(160,90):
+            for item in self._thumb_waiting.pop(path, []): item.setIcon(QtGui.QIcon(pm))
+        if path==self._preview_path and (w,h)==self._preview_size: self.preview_label.setPixmap(pm)
+
+    def _on_thumb_failed(self, path:str, w:int, h:int):
+        if (w,h)==(160,90): self._thumb_waiting.pop(path, None)
+
     def on_add(self):
         d=CameraDialog(self)
         if d.exec()==QtWidgets.QDialog.Accepted:
@@ -120,58 +177,58 @@ class MainWin(QtWidgets.QMainWindow):
             self.cameras.pop(row); self.save_config(); self.refresh_cam_list(); self.refresh_table()
 
     def on_start(self):
-        self.event_source.start(self._on_file, self._on_log); self.statusBar().showMessage("Monitoring (ISAPI) started", 3000)
+        self.event_source.start(self.bus.post_file, self.bus.post_log, self.bus.post_image); self.statusBar().showMessage("Monitoring (ISAPI) started", 3000)
 
     def on_stop(self):
         self.event_source.stop(); self.statusBar().showMessage("Stopped", 3000)
 
     def on_self_test(self):
-        import requests
-        from requests.auth import HTTPDigestAuth
-        ok,bad=[],[]
-        for cam in self.cameras:
-            if not cam.enabled: continue
-            scheme="https" if cam.use_https else "http"; url=f"{scheme}://{cam.ip}/ISAPI/Event/notification/alertStream"
-            try:
-                r=requests.get(url, auth=HTTPDigestAuth(cam.login, cam.password), stream=True, timeout=3, verify=False)
-                if r.status_code in (200,401,403): ok.append(cam.ip if r.ok else f"{cam.ip} (auth?)")
-                else: bad.append(f"{cam.ip} (HTTP {r.status_code})")
-            except Exception as e:
-                bad.append(f"{cam.ip} ({e})")
-        QtWidgets.QMessageBox.information(self,"Test", f"Reachable: {', '.join(ok) or '—'}\nIssues: {', '.join(bad) or '—'}")
+        cams=[c for c in self.cameras if c.enabled]
+        if not cams: QtWidgets.QMessageBox.information(self,"Test","No enabled cameras."); return
+        if self.self_test is None:
+            self.self_test=SelfTestDialog(self)
+            self.self_test.b_again.clicked.connect(lambda: self.self_test.start([c for c in self.cameras if c.enabled]))
+        self.self_test.show(); self.self_test.raise_()
+        self.self_test.start(cams)
 
     def on_export(self):
+        if self.export_job is not None:
+            QtWidgets.QMessageBox.information(self,"Export","An export is already running."); return
         dlg=CsvDialog(self)
         if dlg.exec()!=QtWidgets.QDialog.Accepted: return
         t0=dlg.dt_from.dateTime().toSecsSinceEpoch(); t1=dlg.dt_to.dateTime().toSecsSinceEpoch()
-        rows=[]
-        for ev in self.counts_repo.read_range(t0,t1):
-            rows.append([fmt_ts(float(ev.get('ts',0))), ev.get('camera_name') or ev.get('camera_ip',''),
-                         ev.get('camera_ip',''), ev.get('direction',''),
-                         os.path.basename(ev.get('file','')) if ev.get('file') else '', ev.get('raw','')])
-        if not rows: QtWidgets.QMessageBox.information(self,"Export","No rows in that time range."); return
-        path,_=QtWidgets.QFileDialog.getSaveFileName(self,"Save CSV","export.csv","CSV (*.csv)")
+        kind=dlg.kind.currentData(); fmt=dlg.fmt.currentData(); ext={"csv":".csv","columnar":".pccol","parquet":".parquet"}[fmt]
+        path,_=QtWidgets.QFileDialog.getSaveFileName(self,"Export",f"export{'_hourly' if kind=='hourly' else ''}{ext}",dlg.fmt.currentText())
         if not path: return
-        with open(path,"w",newline="",encoding="utf-8") as f:
-            w=csv.writer(f); w.writerow(["DateTime","Camera Name","Camera IP","Direction","Saved File","Original Name"]); w.writerows(rows)
-        QtWidgets.QMessageBox.information(self,"Export", f"Saved: {path}")
+        names={c.ip: c.name for c in self.cameras if c.name}
+        if kind=="hourly": cols,rows=HOURLY_COLUMNS,lambda: hourly_rows(self.rollups,t0,t1,names)
+        else: cols,rows=ROW_COLUMNS,lambda: count_rows(self.counts_repo.read_range(t0,t1),names,self.links.reader())
+        job=self.export_job=ExportJob(path,fmt,cols,rows,t0,t1,self)
+        prog=QtWidgets.QProgressDialog("Exporting…","Cancel",0,1000,self); prog.setWindowTitle("Export")
+        prog.setWindowModality(QtCore.Qt.WindowModal); prog.setMinimumDuration(300)
+        job.progress.connect(lambda p,n: (prog.setValue(p), prog.setLabelText(f"Exporting… {n:,} rows")))
+        prog.canceled.connect(job.cancel)
+        def finish(msg:str):
+            prog.reset(); self.export_job=None; job.deleteLater()
+            if msg: QtWidgets.QMessageBox.information(self,"Export",msg)
+        def done(p:str, n:int):
+            if not n: os.remove(p); finish("No rows in that time range."); return
+            finish(f"Saved {n:,} rows: {p}")
+        job.done.connect(done); job.failed.connect(lambda err: finish(f"Export failed: {err}" if err else "Export cancelled."))
+        job.start()
 
     def save_config(self):
         self.camera_repo.save_all(self.cameras); self.statusBar().showMessage("Config saved", 2500)
     def load_config(self):
-        self.cameras = self.camera_repo.load_all()
+        self.cameras = self.camera_repo.load_all(); self.event_source.reconcile()
     def refresh_cam_list(self):
         self.cam_list.clear()
         for c in self.cameras:
-            t=c.name or c.ip; sub=f"{c.brand}  •  {c.ip}  •  {'HTTPS' if c.use_https else 'HTTP'}  •  ch={c.snap_channel}  •  {c.direction}"
+            t=c.name or c.ip; sub=f"{c.brand}  •  {c.ip}  •  {c.scheme.upper()}  •  ch={getattr(c, 'snap_channel', 101)}  •  {c.direction}"
             self.cam_list.addItem(QtWidgets.QListWidgetItem(f"{t}\n{sub}"))
     def refresh_table(self):
-        self.table.setRowCount(len(self.cameras)); tin=tout=tall=0
-        for r,c in enumerate(self.cameras):
-            rec=self._counts.get(c.ip,{"IN":0,"OUT":0,"TOTAL":0}); tin+=rec["IN"]; tout+=rec["OUT"]; tall+=rec["TOTAL"]
-            vals=[c.name or c.ip, c.ip, c.pattern_hint, "✓" if c.use_https else "", str(c.snap_channel),
-                  str(rec["IN"]), str(rec["OUT"]), str(rec["TOTAL"])]
-            for col,v in enumerate(vals): self.table.setItem(r,col,QtWidgets.QTableWidgetItem(v))
+        self.table_model.set_cameras(self.cameras)
+    def _show_totals(self, tin:int, tout:int, tall:int):
         self.total_in.setText(str(tin)); self.total_out.setText(str(tout)); self.total_all.setText(str(tall))
     def show_latest_preview(self):
         latest_path=None; latest_ts=-1
@@ -179,21 +236,41 @@ class MainWin(QtWidgets.QMainWindow):
             if q and len(q):
                 p,t=q[-1]
                 if t>latest_ts: latest_ts=t; latest_path=p
-        if latest_path and os.path.exists(latest_path):
-            pm=QtGui.QPixmap(latest_path).scaled(self.preview_label.width(), self.preview_label.height(),
-                                                 QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation)
-            self.preview_label.setPixmap(pm)
+        size=(self.preview_label.width(), self.preview_label.height())
+        if (latest_path, size)==(self._preview_path, self._preview_size): return
+        self._preview_path, self._preview_size = latest_path, size
+        if latest_path:
+            pm=self.thumbs.request(latest_path, *size)
+            if pm is not None: self.preview_label.setPixmap(pm)
         else: self.preview_label.setText("Recent photo will appear here")
-    def purge_old_images(self):
-        n=self.image_store.purge_older_than(KEEP_MIN*60)
-        if n: self._on_log(f"{n} old images purged")
+    def checkpoint_counters(self):
+        if self.live.roll(): self.table_model.reset_counts(self.live.snapshot()); self._on_log("Counters reset for the new period")
+        self.live.checkpoint()
     def refresh_counts(self):
-        self.refresh_table(); self.show_latest_preview()
+        self.table_model.flush(); self.show_latest_preview(); self.metrics_view.refresh()
+        st=self.event_source.stats(); sn=st.get("snapshots") or {}; hs=st.get("http") or {}
+        self.table_model.set_links(st.get("links") or {})
+        if sn: self.snap_stats.setText(f"snapshots: queued {sn['queued']}  dropped {sn['dropped']}  "
+                                       f"fetch p50 {sn['latency_p50_ms']} ms  p95 {sn['latency_p95_ms']} ms"
+                                       + (f"  •  conn reuse {hs['connection_reuse']:.0%}  saved {hs['snapshot_saved_s']} s" if hs else ""))
+        bs=self.bus.stats(); dd=st.get("dedup")
+        self.bus_stats.setText(f"events/batch {bs['events_per_batch']}  drain {bs['drain_ms_avg']} ms (max {bs['drain_ms_max']})"
+                               + (f"  •  duplicates {dd['duplicate'] + dd['burst']} of {dd['accepted'] + dd['duplicate'] + dd['burst']}" if dd else ""))
     def closeEvent(self, e: QtGui.QCloseEvent) -> None:
-        try: self.on_stop()
-        finally: return super().closeEvent(e)
+        try:
+            self.on_stop()
+            if self.export_job is not None: self.export_job.cancel(); self.export_job.wait(5000)
+            if self.self_test is not None and self.self_test.job is not None: self.self_test.job.cancel(); self.self_test.job.wait(10000)
+            while len(self.bus): self._drain_events()
+            self.live.checkpoint()
+        finally:
+            try:
+                if self.metrics_server: self.metrics_server.stop()
+                self.thumbs.shutdown(); self.image_store.close(); self.counts_repo.close(); self.rollups.close(); self.links.close()
+            finally: return super().closeEvent(e)
 
 def main():
+    multiprocessing.freeze_support()   # event_shards: spawned shard processes in a frozen build
     ensure_dirs(); app=QtWidgets.QApplication(sys.argv)
     QtWidgets.QApplication.setAttribute(QtCore.Qt.AA_EnableHighDpiScaling, True)
     QtWidgets.QApplication.setAttribute(QtCore.Qt.AA_UseHighDpiPixmaps, True)
@@ -0,0 +1,231 @@
+"""Process-wide counters and latency histograms, rendered as Prometheus text.
+
+Hot paths keep the child returned by `labels(...)` and call `inc` / `observe`
+on it, so an update is one short critical section (a bisect and a few adds),
+cheap enough to leave on in production.
+"""
+import threading, time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# seconds; covers a 50 µs chunk parse up to a 10 s snapshot timeout
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _esc(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_esc(v)}"' for n, v in zip(names, values)]
+    if extra: parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _CounterChild:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self): self._lock = threading.Lock(); self.value = 0
+
+    def inc(self, n: float = 1) -> None:
+        with self._lock: self.value += n
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def set(self, v: float) -> None:
+        with self._lock: self.value = v
+
+
+class _HistogramChild:
+    __slots__ = ("_lock", "_bounds", "buckets", "sum", "count")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self._lock = threading.Lock(); self._bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1); self.sum = 0.0; self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        i = bisect_left(self._bounds, seconds)
+        with self._lock: self.buckets[i] += 1; self.sum += seconds; self.count += 1
+
+    @contextmanager
+    def time(self):
+        t = time.perf_counter()
+        try: yield
+        finally: self.observe(time.perf_counter() - t)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (0 when empty)."""
+        with self._lock: counts = list(self.buckets); n = self.count
+        if not n: return 0.0
+        rank = q * n; acc = 0
+        for i, c in enumerate(counts):
+            acc += c
+            if acc >= rank: return self._bounds[i] if i < len(self._bounds) else float("inf")
+        return float("inf")
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name; self.help = help; self.label_names = tuple(labels)
+        self._children: dict[tuple[str, ...], object] = {}; self._lock = threading.Lock()
+        if not labels: self._default = self.labels()
+
+    @abstractmethod
+    def _new_child(self):
+        """A fresh child (one label combination) holding the values."""
+
+    @abstractmethod
+    def render(self) -> list[str]:
+        """Prometheus sample lines of every child."""
+
+    def labels(self, *values: str):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.label_names): raise ValueError(f"{self.name}: expected labels {self.label_names}")
+            with self._lock: child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def children(self) -> list[tuple[tuple[str, ...], object]]:
+        with self._lock: return list(self._children.items())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self): return _CounterChild()
+    def inc(self, n: float = 1) -> None: self._default.inc(n)
+
+    def render(self) -> list[str]:
+        return [f"{self.name}{_fmt_labels(self.label_names, k)} {c.value}" for k, c in self.children()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def _new_child(self): return _GaugeChild()
+    def set(self, v: float) -> None: self._default.set(v)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, help, labels)
+
+    def _new_child(self): return _HistogramChild(self.bounds)
+    def observe(self, seconds: float) -> None: self._default.observe(seconds)
+    def time(self): return self._default.time()
+
+    def render(self) -> list[str]:
+        out = []
+        for k, h in self.children():
+            with h._lock: counts = list(h.buckets); total = h.sum; n = h.count
+            acc = 0
+            for b, c in zip((*self.bounds, float("inf")), counts):
+                acc += c; le = 'le="+Inf"' if b == float("inf") else f'le="{b!r}"'
+                out.append(f"{self.name}_bucket{_fmt_labels(self.label_names, k, le)} {acc}")
+            out.append(f"{self.name}_sum{_fmt_labels(self.label_names, k)} {total}")
+            out.append(f"{self.name}_count{_fmt_labels(self.label_names, k)} {n}")
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}; self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help: str, labels: tuple[str, ...], **kw):
+        with self._lock:
+            m = self._metrics.get(name)
+            if m is None: m = self._metrics[name] = cls(name, help, tuple(labels), **kw)
+            elif not isinstance(m, cls) or m.label_names != tuple(labels):
+                raise ValueError(f"metric {name} already registered differently")
+            return m
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Gauge:
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def metrics(self) -> list[_Metric]:
+        with self._lock: return list(self._metrics.values())
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        out = []
+        for m in self.metrics():
+            out.append(f"# HELP {m.name} {m.help}"); out.append(f"# TYPE {m.name} {m.kind}")
+            out.extend(m.render())
+        return "\n".join(out) + "\n"
+
+    def values(self) -> dict[tuple[str, tuple[str, ...]], object]:
+        """Every series' current value by (name, labels); histograms as (buckets, sum, count). Picklable."""
+        out: dict = {}
+        for m in self.metrics():
+            for k, c in m.children():
+                if isinstance(c, _HistogramChild):
+                    with c._lock: out[(m.name, k)] = (tuple(c.buckets), c.sum, c.count)
+                else: out[(m.name, k)] = c.value
+        return out
+
+    def merge(self, cur: dict, prev: dict) -> None:
+        """Fold another process's `values` into this registry: add what each series gained since `prev`.
+
+        `prev` (what was merged last time, updated in place) starts empty per
+        process. Gauges take the new value. A counter or histogram below its
+        `prev` belongs to a restarted process and counts from zero, so merged
+        series stay monotonic. Series of unknown metrics are skipped.
+        """
+        metrics = {m.name: m for m in self.metrics()}
+        for key, v in cur.items():
+            old = prev.get(key); prev[key] = v
+            m = metrics.get(key[0])
+            if v == old or m is None: continue
+            c = m.labels(*key[1])
+            if isinstance(m, Gauge): c.set(v)
+            elif isinstance(m, Counter): c.inc(v - old if old is not None and v >= old else v)
+            else:
+                buckets, total, n = v
+                if old is not None and n >= old[2]:
+                    buckets = [a - b for a, b in zip(buckets, old[0])]; total -= old[1]; n -= old[2]
+                with c._lock:
+                    for i, b in enumerate(buckets): c.buckets[i] += b
+                    c.sum += total; c.count += n
+
+    def rows(self) -> list[tuple[str, str, float, float, float, float]]:
+        """(name, labels, count or value, sum s, p50 s, p95 s) per series, for the UI."""
+        out = []
+        for m in self.metrics():
+            for k, c in m.children():
+                lbl = ", ".join(f"{n}={v}" for n, v in zip(m.label_names, k))
+                if isinstance(c, _HistogramChild): out.append((m.name, lbl, c.count, c.sum, c.quantile(.5), c.quantile(.95)))
+                else: out.append((m.name, lbl, c.value, 0.0, 0.0, 0.0))
+        return out
+
+
+REGISTRY = Registry()
+
+# ---------- Pipeline metrics ----------
+
+ALERTS = REGISTRY.counter("pc_alerts_total", "alertStream alerts by camera and outcome (counted, filtered, duplicate)",
+                          ("camera", "outcome"))
+PARSE_SECONDS = REGISTRY.histogram("pc_parse_chunk_seconds", "AlertStreamParser.feed time per chunk")
+RECONNECTS = REGISTRY.counter("pc_stream_reconnects_total", "alertStream reconnects after an error or close", ("camera",))
+STALLS = REGISTRY.counter("pc_stream_stalls_total", "alertStreams dropped after going silent (no alerts or heartbeats)", ("camera",))
+CAMERA_UP = REGISTRY.gauge("pc_camera_up", "1 while the camera's alertStream is connected, else 0", ("camera",))
+SNAPSHOT_SECONDS = REGISTRY.histogram("pc_snapshot_seconds", "snapshot fetch + store time", ("result",))
+HANDLE_SECONDS = REGISTRY.histogram("pc_handle_seconds", "EventProcessor.handle time")
+APPEND_SECONDS = REGISTRY.histogram("pc_counts_append_seconds", "CountsRepo.append time")
+DRAIN_SECONDS = REGISTRY.histogram("pc_drain_seconds", "EventBus batch apply time (GUI or daemon)")
+DRAIN_EVENTS = REGISTRY.counter("pc_drain_events_total", "events applied from the EventBus")
@@ -6,17 +6,22 @@ APP_DIR    = Path.home() / "people_counter"
 DATA_DIR   = APP_DIR / "data"
 EV_DIR     = APP_DIR / "events"
 CONF_FILE  = APP_DIR / "cameras.jsonl"
-COUNTS_LOG = APP_DIR / "counts.jsonl"
+COUNTS_LOG = APP_DIR / "counts.jsonl"   # legacy single-file log, migrated into COUNTS_DIR
+COUNTS_DIR = APP_DIR / "counts"         # one YYYY-MM-DD.jsonl segment (+ .idx) per day
+COUNTS_DB  = APP_DIR / "counts.sqlite3"  # used when settings.counts_backend == "sqlite"
+ROLLUP_DIR = APP_DIR / "rollups"        # per-minute/hour/day counters, see infrastructure/rollup_store.py
+CHECKPOINT_FILE = APP_DIR / "counters.checkpoint.json"   # live counters + log position, see application/live_counters.py
+LINKS_DIR  = APP_DIR / "snapshot_links"   # count -> snapshot path, see infrastructure/snapshot_links.py
+CAPTURE_DIR = APP_DIR / "captures"     # raw alertStream recordings (settings.capture_streams)
+SETTINGS_FILE = APP_DIR / "settings.json"
 
 KEEP_MIN   = 2  # minutes to keep raw photos
 
 def ensure_dirs():
-    for p in [APP_DIR, DATA_DIR, EV_DIR]:
+    for p in [APP_DIR, DATA_DIR, EV_DIR, COUNTS_DIR, ROLLUP_DIR]:
         p.mkdir(parents=True, exist_ok=True)
     if not CONF_FILE.exists():
         CONF_FILE.write_text("", encoding="utf-8")
-    if not COUNTS_LOG.exists():
-        COUNTS_LOG.write_text("", encoding="utf-8")
 
 def fmt_ts(ts: float) -> str:
     return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
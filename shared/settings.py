@@ -0,0 +1,54 @@
+# shared/settings.py
+import json
+from dataclasses import dataclass, asdict, fields
+from shared.paths import KEEP_MIN, SETTINGS_FILE
+
+
+@dataclass
+class Settings:
+    # counts log
+    counts_backend: str = "jsonl"        # "jsonl" (day segments) or "sqlite"
+    counts_flush_rows: int = 256         # flush when this many rows are buffered
+    counts_flush_ms: int = 500           # ... or when the oldest buffered row is this old
+    counts_fsync: str = "interval"       # "none", "interval" or "batch"
+    counts_fsync_ms: int = 1000          # used by the "interval" policy
+
+    # live counters (dashboard)
+    counters_reset: str = "day"          # "day": counters start at local midnight; "never": all-time
+    checkpoint_s: int = 60               # how often the counters + log position are checkpointed
+
+    # camera ingestion
+    event_source: str = "threads"        # "threads" (one per camera), "asyncio" (one loop for all) or "replay"
+    event_shards: int = 0                # > 0: spread cameras over this many processes ("threads" / "asyncio")
+    capture_streams: bool = False        # record raw alertStream bytes to CAPTURE_DIR
+    replay_speed: float = 1.0            # "replay" source: pace vs. the recording; 0 = as fast as possible
+
+    # event photos
+    images_store: str = "memory"         # "memory" (RAM ring, no disk I/O) or "disk" (files in EV_DIR)
+    images_keep_min: float = KEEP_MIN    # delete photos older than this many minutes
+    images_max_mb: int = 0               # ... and the oldest ones beyond this total size; 0 = no cap on disk,
+                                         # MEMORY_MAX_MB (256) for the memory store
+    images_purge_s: int = 20             # how often the purger runs
+
+    # metrics
+    metrics_port: int = 9108             # Prometheus text at http://metrics_host:port/metrics; 0 = off
+    metrics_host: str = "127.0.0.1"
+
+    # GUI
+    ui_drain_ms: int = 100               # how often the GUI applies queued events
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @staticmethod
+    def from_dict(d: dict) -> "Settings":
+        known = {f.name for f in fields(Settings)}
+        return Settings(**{k: v for k, v in d.items() if k in known})
+
+
+def load_settings() -> Settings:
+    """Read settings.json; a missing or broken file means defaults."""
+    try:
+        return Settings.from_dict(json.loads(SETTINGS_FILE.read_text(encoding="utf-8")))
+    except (OSError, ValueError, TypeError):
+        return Settings()
@@ -0,0 +1,58 @@
+"""Run simulated ISAPI cameras on localhost.
+
+    python -m sim [-n 10] [--port 18000] [--rate 1] [--noise 0.5] [--heartbeat 1] [--post-count part|alarm]
+                  [--duration S] [--sent-log FILE] [--cameras-jsonl FILE]
+
+Prints "ready" once every port listens, runs until --duration elapses or
+SIGTERM/SIGINT, then writes the send times of the counted alerts to
+--sent-log (JSON: {"127.0.0.1:port": [unix_ts, ...]}).
+"""
+import argparse, json, signal, sys, threading
+from domain.models import CameraConf
+from .camera import SimConfig, SimFleet
+
+
+def main(argv: list[str] | None = None) -> int:
+    d = SimConfig()
+    ap = argparse.ArgumentParser(prog="python -m sim", description="Simulated Hikvision ISAPI cameras.")
+    ap.add_argument("-n", "--cameras", type=int, default=10)
+    ap.add_argument("--port", type=int, default=18000, help="first port; cameras use port .. port+n-1")
+    ap.add_argument("--rate", type=float, default=d.rate, help="counted alerts per second per camera")
+    ap.add_argument("--noise", type=float, default=d.noise, help="share of non-heartbeat parts that are noise (0..1)")
+    ap.add_argument("--heartbeat", type=float, default=d.heartbeat, help="seconds between heartbeats (0 = none)")
+    ap.add_argument("--min-gap", type=float, default=d.min_gap, help="minimum seconds between counted alerts")
+    ap.add_argument("--channels", type=int, default=d.channels, help="spread counted alerts over this many channels")
+    ap.add_argument("--dup", type=float, default=d.dup, help="share of counted alerts retransmitted 0.2-2 s later")
+    ap.add_argument("--post-count", choices=("part", "alarm"), default=d.post_count,
+                    help='activePostCount: a counter over all parts, or per alarm (always 1, as on line-detection firmware)')
+    ap.add_argument("--jpeg-kb", type=int, default=d.jpeg_bytes // 1000)
+    ap.add_argument("--user", default=d.user); ap.add_argument("--password", default=d.password)
+    ap.add_argument("--seed", type=int, default=d.seed)
+    ap.add_argument("--duration", type=float, default=0, help="stop after S seconds (0 = until signalled)")
+    ap.add_argument("--sent-log", help="write counted-alert send times here on exit")
+    ap.add_argument("--cameras-jsonl", help="write a cameras.jsonl pointing at the simulated cameras and exit")
+    a = ap.parse_args(argv)
+    cfg = SimConfig(rate=a.rate, noise=a.noise, heartbeat=a.heartbeat, min_gap=a.min_gap, channels=a.channels,
+                    dup=a.dup, post_count=a.post_count, jpeg_bytes=a.jpeg_kb * 1000,
+                    user=a.user, password=a.password, seed=a.seed)
+
+    if a.cameras_jsonl:
+        with open(a.cameras_jsonl, "w", encoding="utf-8") as f:
+            for i in range(a.cameras):
+                c = CameraConf(name=f"sim-{i}", ip=f"127.0.0.1:{a.port + i}", login=cfg.user, password=cfg.password)
+                f.write(json.dumps(c.to_dict()) + "\n")
+        return 0
+
+    fleet = SimFleet(a.cameras, a.port, cfg); fleet.start()
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set()); signal.signal(signal.SIGINT, lambda *_: stop.set())
+    print("ready", flush=True)
+    stop.wait(a.duration or None)
+    fleet.stop()
+    if a.sent_log:
+        with open(a.sent_log, "w", encoding="utf-8") as f: json.dump(fleet.sent(), f)
+    print(json.dumps(fleet.stats()), flush=True)
+    return 0
+
+
+if __name__ == "__main__": sys.exit(main())
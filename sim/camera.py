@@ -0,0 +1,172 @@
+import asyncio, heapq, random, re, secrets, threading, time
+from dataclasses import dataclass
+from datetime import datetime
+
+from infrastructure.digest import parse_challenge, digest_response
+
+ALERT = ('<EventNotificationAlert version="2.0" xmlns="http://www.hikvision.com/ver20/XMLSchema">\r\n'
+         "<ipAddress>127.0.0.1</ipAddress>\r\n<portNo>{port}</portNo>\r\n<protocol>HTTP</protocol>\r\n"
+         "<channelID>{ch}</channelID>\r\n<dateTime>{dt}</dateTime>\r\n<activePostCount>{n}</activePostCount>\r\n"
+         "<eventType>{et}</eventType>\r\n<eventState>{state}</eventState>\r\n"
+         "<eventDescription>{et} alarm</eventDescription>\r\n</EventNotificationAlert>\r\n")
+NOISE = [("VMD", "active"), ("linedetection", "inactive"), ("scenechangedetection", "active")]
+PICTURE = re.compile(r"^/ISAPI/Streaming/channels/(\d+)/picture")
+
+
+@dataclass
+class SimConfig:
+    rate: float = 1.0            # counted (line-crossing, active) alerts per second, Poisson
+    noise: float = 0.5           # share of non-heartbeat parts that are noise (motion, inactive, ...)
+    heartbeat: float = 1.0       # seconds between videoloss/inactive heartbeats; 0 = none
+    min_gap: float = 0.0         # minimum spacing of counted alerts
+    channels: int = 1            # counted alerts are spread over channels 1..channels (NVR)
+    dup: float = 0.0             # share of counted alerts retransmitted verbatim 0.2-2 s later
+    post_count: str = "part"     # activePostCount: "part" numbers every part sent, "alarm" is per alarm (always 1)
+    jpeg_bytes: int = 50_000     # size of the (JPEG-shaped, not decodable) snapshot body
+    user: str = "admin"
+    password: str = "sim"
+    realm: str = "sim"
+    seed: int = 1
+
+
+class SimCamera:
+    """One emulated Hikvision ISAPI camera on a localhost port.
+
+    Serves /ISAPI/Event/notification/alertStream (multipart XML, kept open)
+    and /ISAPI/Streaming/channels/N/picture (keep-alive), both behind digest
+    auth (qop=auth, one nonce per camera). The send time of every counted
+    alert is appended to `sent`, so a harness can measure end-to-end latency.
+    """
+
+    def __init__(self, port: int, cfg: SimConfig):
+        self.port = port; self.cfg = cfg
+        self.nonce = secrets.token_hex(16)
+        self.sent: list[float] = []
+        self.stats = {"streams": 0, "pictures": 0, "challenges": 0, "parts": 0}
+        self._rnd = random.Random(cfg.seed * 100_003 + port)
+        self._jpeg = b"\xff\xd8" + b"\0" * max(0, cfg.jpeg_bytes - 4) + b"\xff\xd9"
+        self._server: asyncio.AbstractServer | None = None
+
+    async def start(self, host: str = "127.0.0.1") -> None:
+        self._server = await asyncio.start_server(self._conn, host, self.port)
+
+    # ---------- HTTP ----------
+
+    def _authorized(self, method: str, header: str | None) -> bool:
+        p = parse_challenge(header or "")
+        if not p or p.get("nonce") != self.nonce or p.get("username") != self.cfg.user: return False
+        ch = {"realm": self.cfg.realm, "nonce": self.nonce, "qop": "auth"}
+        return p.get("response") == digest_response(ch, self.cfg.user, self.cfg.password, method, p.get("uri", ""),
+                                                    p.get("nc", ""), p.get("cnonce", ""))
+
+    async def _conn(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line: return
+                method, target, _ = line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while (h := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    k, _, v = h.decode("latin-1").partition(":"); headers[k.strip().lower()] = v.strip()
+                if not self._authorized(method, headers.get("authorization")):
+                    self.stats["challenges"] += 1
+                    writer.write(b"HTTP/1.1 401 Unauthorized\r\nContent-Length: 0\r\n"
+                                 b'WWW-Authenticate: Digest realm="%s", nonce="%s", qop="auth"\r\n\r\n'
+                                 % (self.cfg.realm.encode(), self.nonce.encode()))
+                elif target.startswith("/ISAPI/Event/notification/alertStream"):
+                    self.stats["streams"] += 1
+                    await self._stream(writer); return
+                elif PICTURE.match(target):
+                    self.stats["pictures"] += 1
+                    writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n" % len(self._jpeg))
+                    writer.write(self._jpeg)
+                else:
+                    writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+                await writer.drain()
+        except (ConnectionError, ValueError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    # ---------- alertStream ----------
+
+    def _part(self, et: str, state: str, ch: int = 1) -> bytes:
+        self.stats["parts"] += 1
+        body = ALERT.format(port=self.port, ch=ch, dt=datetime.now().astimezone().isoformat(timespec="seconds"),
+                            n=self.stats["parts"] if self.cfg.post_count == "part" else 1, et=et, state=state).encode()
+        return (b'--boundary\r\nContent-Type: application/xml; charset="UTF-8"\r\nContent-Length: %d\r\n\r\n%s\r\n'
+                % (len(body), body))
+
+    async def _stream(self, writer: asyncio.StreamWriter) -> None:
+        cfg = self.cfg; rnd = self._rnd; now = time.monotonic(); inf = float("inf")
+        noise_rate = cfg.rate * cfg.noise / (1 - cfg.noise) if 0 < cfg.noise < 1 else 0.0
+        nxt = lambda rate: now + rnd.expovariate(rate) if rate > 0 else inf
+        t_alert, t_noise = max(nxt(cfg.rate), now), nxt(noise_rate)
+        t_beat = now + cfg.heartbeat if cfg.heartbeat > 0 else inf
+        resend: list[tuple[float, bytes]] = []     # (due, part) retransmits
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: multipart/mixed; boundary=boundary\r\nConnection: close\r\n\r\n")
+        await writer.drain()
+        while True:
+            t = min(t_alert, t_noise, t_beat, resend[0][0] if resend else inf)
+            if t == inf: await asyncio.sleep(3600); continue
+            await asyncio.sleep(max(0.0, t - time.monotonic())); now = time.monotonic()
+            if resend and t == resend[0][0]:
+                writer.write(heapq.heappop(resend)[1]); self.stats["dups"] = self.stats.get("dups", 0) + 1
+            elif t == t_alert:
+                part = self._part("linedetection", "active", rnd.randint(1, max(1, cfg.channels)))
+                writer.write(part); self.sent.append(time.time())
+                if cfg.dup > 0 and rnd.random() < cfg.dup: heapq.heappush(resend, (now + rnd.uniform(0.2, 2.0), part))
+                t_alert = max(nxt(cfg.rate), now + cfg.min_gap)
+            elif t == t_noise:
+                writer.write(self._part(*rnd.choice(NOISE))); t_noise = nxt(noise_rate)
+            else:
+                writer.write(self._part("videoloss", "inactive")); t_beat = now + cfg.heartbeat
+            await writer.drain()
+
+
+class SimFleet:
+    """`n` SimCameras on consecutive ports, served by one asyncio loop in a background thread."""
+
+    def __init__(self, n: int, base_port: int = 18000, cfg: SimConfig | None = None):
+        self.cameras = [SimCamera(base_port + i, cfg or SimConfig()) for i in range(n)]
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        loop = self._loop = asyncio.new_event_loop(); started = threading.Event(); err: list[BaseException] = []
+        async def boot():
+            try:
+                for c in self.cameras: await c.start()
+            except BaseException as e: err.append(e)
+            finally: started.set()
+        def run():
+            asyncio.set_event_loop(loop)
+            loop.create_task(boot())
+            try: loop.run_forever()
+            finally: loop.close()
+        self._thread = threading.Thread(target=run, name="sim-fleet", daemon=True); self._thread.start()
+        started.wait()
+        if err: self.stop(); raise err[0]
+
+    def stop(self) -> None:
+        loop, th = self._loop, self._thread
+        if loop is None: return
+        async def shutdown():
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for c in self.cameras:
+                if c._server: c._server.close()
+            for t in tasks: t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            loop.stop()
+        asyncio.run_coroutine_threadsafe(shutdown(), loop); th.join(5)
+        self._loop = self._thread = None
+
+    def sent(self) -> dict[str, list[float]]:
+        """Send times of the counted alerts, keyed by camera address ("127.0.0.1:port")."""
+        return {f"127.0.0.1:{c.port}": list(c.sent) for c in self.cameras}
+
+    def stats(self) -> dict:
+        tot: dict = {}
+        for c in self.cameras:
+            for k, v in c.stats.items(): tot[k] = tot.get(k, 0) + v
+        return tot
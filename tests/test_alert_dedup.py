@@ -0,0 +1,48 @@
+from infrastructure.alert_dedup import AlertDedup, merge_stats
+from infrastructure.alert_stream_parser import parse_alert
+
+BODY = ("<EventNotificationAlert><channelID>{ch}</channelID><dateTime>{dt}</dateTime>"
+        "<activePostCount>{n}</activePostCount><eventType>linedetection</eventType>"
+        "<eventState>active</eventState><regionID>{rule}</regionID></EventNotificationAlert>")
+DT = "2026-10-18T12:00:00+02:00"
+
+
+def alert(ch=1, dt=DT, n=1, rule=1):
+    return parse_alert(BODY.format(ch=ch, dt=dt, n=n, rule=rule).encode())
+
+
+def accept(d, a, now):
+    return d.accept(a.channel, "LINE_CROSSING_DETECTION", a.rule, a.date_time, a.payload, now)
+
+
+def test_verbatim_retransmit_is_dropped_for_the_whole_window():
+    d = AlertDedup(window_s=60)
+    assert accept(d, alert(), 0.0)
+    assert not accept(d, alert(), 1.5) and not accept(d, alert(), 59.0)
+    assert accept(d, alert(), 61.0)
+    assert d.stats == {"accepted": 2, "duplicate": 2, "burst": 0, "evicted": 0}
+
+
+def test_same_second_events_with_any_differing_field_both_count():
+    d = AlertDedup()
+    assert accept(d, alert(n=7), 0.0) and accept(d, alert(n=8), 0.1)       # global activePostCount
+    assert accept(d, alert(ch=2), 0.2) and accept(d, alert(rule=2), 0.3)   # other channel / rule
+    assert accept(d, alert(dt="2026-10-18T12:00:01+02:00"), 0.4)            # per-alarm counter, next second
+
+
+def test_whitespace_around_the_body_does_not_change_the_key():
+    a, b = alert(), parse_alert(b"\r\n" + BODY.format(ch=1, dt=DT, n=1, rule=1).encode() + b"\r\n")
+    assert a.payload == b.payload
+
+
+def test_without_datetime_only_bursts_are_merged():
+    d = AlertDedup(burst_s=0.5); a = alert(dt="")
+    assert accept(d, a, 0.0) and not accept(d, a, 0.3) and accept(d, a, 0.9)
+    assert d.stats["burst"] == 1 and d.stats["duplicate"] == 0
+
+
+def test_keys_are_bounded():
+    d = AlertDedup(max_keys=10)
+    for i in range(25): accept(d, alert(n=i), float(i) / 100)
+    assert len(d) == 10 and d.stats["evicted"] == 15
+    assert merge_stats([d, AlertDedup()])["keys"] == 10
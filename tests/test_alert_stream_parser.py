@@ -0,0 +1,54 @@
+import random
+
+from infrastructure.alert_stream_parser import AlertStreamParser
+
+BODY = ("<EventNotificationAlert><channelID>{ch}</channelID><dateTime>2026-10-18T12:00:0{ch}+02:00</dateTime>"
+        "<eventType>linedetection</eventType><eventState>active</eventState></EventNotificationAlert>")
+
+
+def _part(ch: int, length: bool) -> bytes:
+    body = BODY.format(ch=ch).encode()
+    head = b"--boundary\r\nContent-Type: application/xml; charset=UTF-8\r\n"
+    if length: head += b"Content-Length: %d\r\n" % len(body)
+    return head + b"\r\n" + body + b"\r\n"
+
+
+JPEG = b"--boundary\r\nContent-Type: image/jpeg\r\nContent-Length: 8\r\n\r\n\xff\xd8--boundary\r\n"
+STREAM = _part(1, True) + _part(2, False) + JPEG + _part(3, True) + _part(4, False) + b"--boundary--\r\n"
+XML = b"".join(BODY.format(ch=ch).encode() + b"\r\n" for ch in (1, 2, 3, 4))
+
+
+def _channels(stream: bytes, cuts: list[int], content_type: str | None) -> list[int]:
+    p = AlertStreamParser(content_type); out = []
+    for a, b in zip([0] + cuts, cuts + [len(stream)]): out += p.feed(stream[a:b])
+    return [e.channel for e in out]
+
+
+def test_every_single_split_point_yields_the_same_events():
+    for ct in ('multipart/mixed; boundary="boundary"', None):      # declared, or sniffed from the first line
+        for i in range(len(STREAM) + 1):
+            assert _channels(STREAM, [i], ct) == [1, 2, 3, 4], (ct, i)
+    for i in range(len(XML) + 1):
+        assert _channels(XML, [i], None) == [1, 2, 3, 4], i
+
+
+def test_random_chunkings_down_to_single_bytes():
+    rnd = random.Random(7)
+    for _ in range(200):
+        for stream in (STREAM, XML):
+            cuts = sorted(rnd.sample(range(1, len(stream)), rnd.randint(1, 40)))
+            assert _channels(stream, cuts, None) == [1, 2, 3, 4]
+    assert _channels(STREAM, list(range(1, len(STREAM))), None) == [1, 2, 3, 4]
+
+
+def test_image_parts_are_skipped_but_counted_as_parts():
+    p = AlertStreamParser("multipart/mixed; boundary=boundary")
+    assert [e.channel for e in p.feed(STREAM)] == [1, 2, 3, 4]
+    assert p.stats == {"bytes": len(STREAM), "parts": 5, "events": 4}
+
+
+def test_long_stream_keeps_the_buffer_small():
+    p = AlertStreamParser("multipart/mixed; boundary=boundary"); n = 0
+    for _ in range(2000): n += len(p.feed(_part(1, False)))
+    assert n == 1999                          # the last part ends only when the next boundary arrives
+    assert len(p._buf) < 1024
@@ -0,0 +1,53 @@
+import csv
+
+import pytest
+
+from infrastructure.exporters import (CSV_HEADERS, HOURLY_COLUMNS, ROW_COLUMNS, Cancelled, count_rows,
+                                      export, parquet_available, read_columnar)
+from shared.paths import fmt_ts
+
+ROWS = [{"ts": 1_790_000_000.25 + i, "camera_ip": f"10.0.0.{i % 3}", "direction": "IN" if i % 2 else "OUT",
+         "file": f"/ev/{i}.jpg" if i % 4 else "", "raw": f"r{i}"} for i in range(10)]
+
+
+def _rows():
+    return list(count_rows(ROWS, {"10.0.0.1": "Gate"}, files=lambda ip, ts: f"/ev/linked_{ts}.jpg"))
+
+
+def test_count_rows_fills_names_and_linked_files():
+    r = _rows()
+    assert [x[1] for x in r[:3]] == ["10.0.0.0", "Gate", "10.0.0.2"]
+    assert r[0][4] == f"linked_{ROWS[0]['ts']}.jpg" and r[1][4] == "1.jpg"
+    assert list(count_rows(ROWS[:1]))[0][4] == ""
+
+
+def test_csv_round_trip(tmp_path):
+    rows = _rows(); p = tmp_path / "out.csv"
+    assert export(p, "csv", ROW_COLUMNS, rows) == len(rows)
+    with p.open(newline="", encoding="utf-8") as f: got = list(csv.reader(f))
+    assert got[0] == [CSV_HEADERS[n] for n, _ in ROW_COLUMNS]
+    assert got[1:] == [[fmt_ts(r[0]), *r[1:]] for r in rows]
+
+
+def test_columnar_round_trip_across_groups(tmp_path, monkeypatch):
+    monkeypatch.setattr("infrastructure.exporters.GROUP_ROWS", 4)
+    rows = _rows(); hourly = [(1_790_000_000 + h * 3600, "Gate", "10.0.0.1", h, 2 * h, 3 * h) for h in range(5)]
+    export(tmp_path / "r.col", "columnar", ROW_COLUMNS, rows)
+    export(tmp_path / "h.col", "columnar", HOURLY_COLUMNS, hourly)
+    assert [tuple(d.values()) for d in read_columnar(tmp_path / "r.col")] == rows
+    assert [tuple(d.values()) for d in read_columnar(tmp_path / "h.col")] == hourly
+
+
+@pytest.mark.skipif(not parquet_available(), reason="pyarrow not installed")
+def test_parquet_round_trip(tmp_path):
+    import pyarrow.parquet as pq
+    rows = _rows(); export(tmp_path / "r.parquet", "parquet", ROW_COLUMNS, rows)
+    t = pq.read_table(tmp_path / "r.parquet").to_pylist()
+    assert [tuple(d[n] for n, _ in ROW_COLUMNS) for d in t] == rows
+
+
+def test_cancelled_or_failed_export_leaves_nothing(tmp_path):
+    p = tmp_path / "out.col"
+    with pytest.raises(Cancelled): export(p, "columnar", ROW_COLUMNS, _rows(), cancelled=lambda: True)
+    with pytest.raises(ValueError): export(p, "xlsx", ROW_COLUMNS, _rows())
+    assert list(tmp_path.iterdir()) == []
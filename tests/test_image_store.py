@@ -0,0 +1,37 @@
+import threading
+from datetime import datetime
+
+from infrastructure import image_store
+from infrastructure.image_store import LocalImageStore, MemoryImageStore
+
+
+class _Frozen(datetime):
+    @classmethod
+    def now(cls, tz=None): return datetime(2026, 1, 1, 12, 0, 0)      # every store lands in one clock tick
+
+
+def _store_from_threads(store, n=8):
+    keys = []; lock = threading.Lock()
+    def run(i):
+        k = store.store([b"\xff\xd8%d" % i], f"10.0.0.{i % 2}:80", "LINE_IN.jpg")
+        with lock: keys.append(k)
+    ts = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for t in ts: t.start()
+    for t in ts: t.join()
+    return keys
+
+
+def test_same_tick_snapshots_get_distinct_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_store, "datetime", _Frozen)
+    store = LocalImageStore(tmp_path); keys = _store_from_threads(store)
+    assert len(set(keys)) == 8 and len(list(tmp_path.glob("*.jpg"))) == 8
+    assert sorted(store.read(k) for k in keys) == sorted(b"\xff\xd8%d" % i for i in range(8))
+    assert all("__10.0.0." in k and ":" not in k.rsplit("/", 1)[-1] for k in keys)
+
+
+def test_same_tick_memory_keys_evict_only_their_own_image(monkeypatch):
+    monkeypatch.setattr(image_store, "datetime", _Frozen)
+    store = MemoryImageStore(max_bytes=0); keys = _store_from_threads(store, 4)
+    assert len(set(keys)) == 4 and store.disk_usage() == (4, sum(len(store.read(k)) for k in keys))
+    store.purge_over(store.disk_usage()[1] - 1)          # drop just the oldest
+    assert sum(store.read(k) is not None for k in keys) == 3
@@ -0,0 +1,81 @@
+import json, time
+
+from domain.rollups import bucket_start
+from infrastructure import jsonl_counts_repo
+from infrastructure.jsonl_counts_repo import MIGRATE_DIR, JsonlCountsRepo
+
+DAY = bucket_start(1_790_000_000, "day")
+
+
+def _repo(tmp_path, legacy=None) -> JsonlCountsRepo:
+    return JsonlCountsRepo(tmp_path / "counts", fsync="none", legacy=legacy)
+
+
+def _row(ts: float, ip: str = "cam") -> dict:
+    return {"ts": ts, "camera_ip": ip, "direction": "IN"}
+
+
+def _legacy(tmp_path, rows: list[dict], tail: str = ""):
+    p = tmp_path / "counts.jsonl"
+    p.write_text("".join(json.dumps(r) + "\n" for r in rows) + tail, encoding="utf-8")
+    return p
+
+
+def test_migration_splits_days_and_skips_a_torn_last_line(tmp_path):
+    rows = [_row(DAY + 60), _row(DAY + 86400 + 60), _row(DAY + 86400 + 120)]
+    legacy = _legacy(tmp_path, rows, tail='{"ts": 17900')
+    r = _repo(tmp_path, legacy)
+    assert sorted(p.name for p in r.root.glob("*.jsonl")) == [
+        time.strftime("%Y-%m-%d.jsonl", time.localtime(ts)) for ts in (DAY, DAY + 86400)]
+    assert list(r.read_range(0, float("inf"))) == rows
+    assert not legacy.exists() and legacy.with_name("counts.jsonl.migrated").exists()
+    assert not (r.root / MIGRATE_DIR).exists()
+    r.close()
+
+
+def test_migration_merges_rows_already_logged_and_never_replays(tmp_path):
+    r = _repo(tmp_path); r.append(_row(DAY + 300, "new")); r.close()
+    legacy = _legacy(tmp_path, [_row(DAY + 60, "old")])
+    r = _repo(tmp_path, legacy)
+    assert [x["camera_ip"] for x in r.read_range(0, float("inf"))] == ["old", "new"]
+    r.close()
+    r = _repo(tmp_path, legacy)         # legacy renamed away: a restart changes nothing
+    assert len(list(r.read_range(0, float("inf")))) == 2
+    r.close()
+
+
+def test_migration_resumes_the_renames_after_a_crash(tmp_path):
+    legacy = _legacy(tmp_path, [_row(DAY + 60), _row(DAY + 120)])
+    work = tmp_path / "counts" / MIGRATE_DIR
+    tmp = JsonlCountsRepo(work, fsync="none", legacy=None)
+    for ts in (DAY + 60, DAY + 120): tmp.append(_row(ts))
+    tmp.close(); (work / "DONE").write_text("2", encoding="utf-8")
+    r = _repo(tmp_path, legacy)
+    assert [x["ts"] for x in r.read_range(0, float("inf"))] == [DAY + 60, DAY + 120]
+    assert not work.exists()
+    r.close()
+
+
+def test_torn_segment_tail_does_not_swallow_the_next_row(tmp_path):
+    r = _repo(tmp_path); r.append(_row(DAY + 1)); r.close()
+    seg = next((tmp_path / "counts").glob("*.jsonl"))
+    with seg.open("a", encoding="utf-8") as f: f.write('{"ts": 1790')
+    r = _repo(tmp_path); r.append(_row(DAY + 2))
+    assert [x["ts"] for x in r.read_range(0, float("inf"))] == [DAY + 1, DAY + 2]
+    r.close()
+
+
+def test_sparse_index_seeks_past_older_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(jsonl_counts_repo, "INDEX_EVERY", 10)
+    r = _repo(tmp_path); stamps = [DAY + i + (5 if i == 40 else 0) for i in range(100)]   # one row out of order
+    for ts in stamps: r.append(_row(ts))
+    r.flush()
+    seg = next(r.root.glob("*.jsonl")); idx = seg.with_suffix(".idx")
+    assert len(jsonl_counts_repo._read_index(idx)) == 9
+    off = r._seek_offset(idx, DAY + 70)
+    assert 0 < off < seg.stat().st_size
+    with seg.open("rb") as f: skipped = [json.loads(line)["ts"] for line in f.read(off).splitlines()]
+    assert skipped and max(skipped) < DAY + 70
+    for t0, t1 in ((DAY + 70, DAY + 80), (DAY + 42, DAY + 45), (DAY, DAY + 5), (DAY + 95, DAY + 200)):
+        assert [x["ts"] for x in r.read_range(t0, t1)] == [ts for ts in stamps if t0 <= ts <= t1], (t0, t1)
+    r.close()
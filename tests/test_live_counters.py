@@ -0,0 +1,61 @@
+from application.live_counters import LiveCounters
+from domain.rollups import bucket_start, next_bucket
+
+DAY = bucket_start(1_790_000_000, "day")          # a local midnight
+MIDNIGHT = next_bucket(DAY, "day")
+
+
+class FakeCounts:
+    """CountsRepo over a list; read_since ignores the position and returns nothing new."""
+
+    def __init__(self): self.rows: list[dict] = []
+    def append(self, row: dict) -> None: self.rows.append(row)
+    def read_range(self, t0, t1): return [r for r in self.rows if t0 <= r["ts"] <= t1]
+    def position(self) -> dict: return {"n": len(self.rows)}
+    def read_since(self, pos): return self.rows[pos["n"]:]
+
+
+class FakeStore:
+    def __init__(self): self.doc = None
+    def load(self): return self.doc
+    def save(self, doc): self.doc = doc
+
+
+def _live(repo, now: float) -> LiveCounters:
+    return LiveCounters(repo, FakeStore(), "day", now=now)
+
+
+def _add(live, repo, ip, direction, ts):
+    repo.append({"ts": ts, "camera_ip": ip, "direction": direction})
+    return live.add(ip, direction, ts)
+
+
+def test_event_after_midnight_rolls_before_counting():
+    repo = FakeCounts(); live = _live(repo, MIDNIGHT - 60)
+    assert not _add(live, repo, "cam", "IN", MIDNIGHT - 10)
+    assert _add(live, repo, "cam", "OUT", MIDNIGHT + 30)
+    assert live.snapshot() == {"cam": (0, 1, 1)}
+    assert not live.roll(MIDNIGHT + 60)                 # the checkpoint tick after it changes nothing
+    assert live.snapshot() == {"cam": (0, 1, 1)}
+
+
+def test_live_view_matches_a_rebuild_after_the_boundary():
+    repo = FakeCounts(); live = _live(repo, MIDNIGHT - 60)
+    for ts in (MIDNIGHT - 5, MIDNIGHT + 30, MIDNIGHT + 31):
+        _add(live, repo, "cam", "IN", ts)
+    live.roll(MIDNIGHT + 60)
+    fresh = LiveCounters(repo, FakeStore(), "day", now=MIDNIGHT + 60); fresh.restore()
+    assert live.snapshot() == fresh.snapshot() == {"cam": (2, 0, 2)}
+
+
+def test_late_event_of_the_previous_period_is_dropped():
+    repo = FakeCounts(); live = _live(repo, MIDNIGHT - 60)
+    _add(live, repo, "cam", "IN", MIDNIGHT + 1)
+    assert not _add(live, repo, "cam", "IN", MIDNIGHT - 1)
+    assert live.snapshot() == {"cam": (1, 0, 1)}
+
+
+def test_never_reset_never_rolls():
+    repo = FakeCounts(); live = LiveCounters(repo, FakeStore(), "never")
+    assert not _add(live, repo, "cam", "IN", MIDNIGHT + 86400 * 400)
+    assert live.totals() == (1, 0, 1)
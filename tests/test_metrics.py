@@ -0,0 +1,35 @@
+from shared.metrics import Registry
+
+
+def _shard():
+    r = Registry()
+    return r, r.counter("alerts_total", "", ("ip",)), r.gauge("streams", ""), r.histogram("lat", "", buckets=(0.1, 1.0))
+
+
+def test_merge_adds_deltas_and_sets_gauges():
+    parent, *_ = _shard(); shard, alerts, streams, lat = _shard(); prev: dict = {}
+    alerts.labels("a").inc(3); streams.set(2); lat.observe(0.05)
+    parent.merge(shard.values(), prev)
+    alerts.labels("a").inc(2); alerts.labels("b").inc(); streams.set(1); lat.observe(0.5)
+    parent.merge(shard.values(), prev); parent.merge(shard.values(), prev)     # unchanged: no double count
+    v = parent.values()
+    assert v[("alerts_total", ("a",))] == 5 and v[("alerts_total", ("b",))] == 1
+    assert v[("streams", ())] == 1
+    assert v[("lat", ())] == ((1, 1, 0), 0.55, 2)
+
+
+def test_merge_two_shards_and_a_restart():
+    parent, alerts, *_ = _shard(); alerts.labels("p").inc(10)
+    s1, a1, *_ = _shard(); s2, a2, *_ = _shard(); p1: dict = {}; p2: dict = {}
+    a1.labels("a").inc(4); a2.labels("a").inc(6)
+    parent.merge(s1.values(), p1); parent.merge(s2.values(), p2)
+    s1, a1, *_ = _shard(); a1.labels("a").inc(1)          # shard 1 restarted: its counter began again
+    parent.merge(s1.values(), p1)
+    v = parent.values()
+    assert v[("alerts_total", ("a",))] == 11 and v[("alerts_total", ("p",))] == 10
+
+
+def test_merge_skips_unknown_metrics():
+    parent = Registry(); shard, alerts, *_ = _shard(); alerts.labels("a").inc()
+    parent.merge(shard.values(), {})
+    assert parent.values() == {}
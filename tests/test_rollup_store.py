@@ -0,0 +1,52 @@
+import time
+
+from domain.rollups import bucket_start
+from infrastructure.rollup_store import BACKFILL_MARK, MINUTE_KEEP_DAYS, JsonRollupStore
+
+HOUR = 3600
+
+
+def _store(tmp_path) -> JsonRollupStore:
+    return JsonRollupStore(tmp_path / "rollups", flush_interval=3600)
+
+
+def test_totals_mix_days_hours_and_minutes(tmp_path):
+    s = _store(tmp_path); day = bucket_start(time.time() - 3 * 86400, "day")
+    for ts in (day + 10, day + HOUR + 61, day + 86400 + 5, day + 2 * 86400 + 30 * 60):
+        s.add("cam", "IN", ts)
+    s.add("cam", "OUT", day + HOUR + 62); s.add("other", "IN", day + 70)
+    assert s.totals(day, day + 3 * 86400) == {("cam", "IN"): 4, ("cam", "OUT"): 1, ("other", "IN"): 1}
+    assert s.totals(day + HOUR + 60, day + HOUR + 120) == {("cam", "IN"): 1, ("cam", "OUT"): 1}   # minutes only
+    assert s.totals(day + 60, day + 2 * 86400, camera_ip="cam") == {("cam", "IN"): 2, ("cam", "OUT"): 1}
+    s.close()
+
+
+def test_totals_survive_a_restart(tmp_path):
+    s = _store(tmp_path); day = bucket_start(time.time() - 86400, "day")
+    for i in range(10): s.add("cam", "IN", day + 90 + i)
+    s.close()
+    s = _store(tmp_path)
+    assert s.totals(day + 60, day + 30 * 60) == {("cam", "IN"): 10}
+    s.close()
+
+
+def test_totals_past_minute_retention_widen_to_the_hour(tmp_path):
+    s = _store(tmp_path); hour = bucket_start(time.time() - (MINUTE_KEEP_DAYS + 9) * 86400, "hour")
+    for i in range(60): s.add("cam", "IN", hour + 600 + i)
+    s.close()                                           # the flush deletes the old minute partition
+    assert not any((tmp_path / "rollups" / "minute").glob("*.json"))
+    s = _store(tmp_path)
+    assert s.query(hour, hour + HOUR, "hour") == [(hour, "cam", "IN", 60)]
+    assert s.totals(hour + 300, hour + 1200) == {("cam", "IN"): 60}
+    s.close()
+
+
+def test_interrupted_backfill_is_redone(tmp_path):
+    rows = [{"ts": time.time() - 50 - i, "camera_ip": "cam", "direction": "IN"} for i in range(5)]
+    s = _store(tmp_path)
+    assert s.needs_backfill()
+    (tmp_path / "rollups" / BACKFILL_MARK).touch(); s.add("cam", "IN", rows[0]["ts"]); s.flush()   # half-done rebuild
+    s.start_backfill(lambda t0, t1: [r for r in rows if t0 <= r["ts"] <= t1]).join(5)
+    assert not s.needs_backfill()
+    assert s.totals(0, time.time() + 60) == {("cam", "IN"): 5}
+    s.close()
@@ -0,0 +1,53 @@
+import time
+
+from infrastructure.exporters import count_rows
+from infrastructure.image_store import LocalImageStore, MemoryImageStore
+from infrastructure.snapshot_links import JsonlSnapshotLinks
+
+
+def _disk(tmp_path) -> LocalImageStore:
+    (tmp_path / "ev").mkdir(); return LocalImageStore(tmp_path / "ev")
+
+
+def _rows(ts_list, ip="cam"):
+    return [{"ts": ts, "camera_ip": ip, "camera_name": "C", "direction": "IN", "file": "", "raw": "LINE"} for ts in ts_list]
+
+
+def test_export_joins_links_one_day_at_a_time(tmp_path):
+    store = _disk(tmp_path); links = JsonlSnapshotLinks(tmp_path / "links")
+    store.add_evict_listener(links.forget)
+    t = time.time() - 3 * 86400; stamps = [t, t + 86400, t + 86400 + 1, t + 2 * 86400]
+    paths = [store.store([b"\xff\xd8jpeg"], "cam", f"LINE{i}.jpg") for i in range(len(stamps))]
+    for ts, p in zip(stamps[:3], paths): links.add("cam", ts, p)
+    out = list(count_rows(_rows(stamps), files=links.reader()))
+    assert [r[4] for r in out] == [p.rsplit("/", 1)[-1] for p in paths[:3]] + [""]
+    links.close()
+
+
+def test_links_go_with_their_images(tmp_path):
+    store = _disk(tmp_path); links = JsonlSnapshotLinks(tmp_path / "links")
+    store.add_evict_listener(links.forget)
+    t = time.time()
+    p1 = store.store([b"a"], "cam", "LINE.jpg"); links.add("cam", t, p1)
+    p2 = store.store([b"b"], "cam", "LINE2.jpg"); links.add("cam", t + 1, p2)
+    assert store.purge_over(1) == 1                      # oldest image goes
+    lookup = links.reader()
+    assert (lookup("cam", t), lookup("cam", t + 1)) == ("", p2)
+    store.purge_over(0); links.close()
+    assert not list((tmp_path / "links").glob("*.jsonl"))
+
+
+def test_link_after_eviction_and_memory_keys_are_not_kept(tmp_path):
+    links = JsonlSnapshotLinks(tmp_path / "links"); mem = MemoryImageStore()
+    links.add("cam", time.time(), mem.store([b"x"], "cam", "LINE.jpg"))
+    links.forget([str(tmp_path / "late.jpg")]); links.add("cam", time.time(), str(tmp_path / "late.jpg"))
+    links.close()
+    assert not list((tmp_path / "links").glob("*.jsonl"))
+
+
+def test_restart_drops_links_to_deleted_images(tmp_path):
+    img = tmp_path / "a.jpg"; img.write_bytes(b"x"); t = time.time()
+    links = JsonlSnapshotLinks(tmp_path / "links"); links.add("cam", t, str(img)); links.close()
+    assert JsonlSnapshotLinks(tmp_path / "links").reader()("cam", t) == str(img)
+    img.unlink()
+    assert JsonlSnapshotLinks(tmp_path / "links").reader()("cam", t) == ""
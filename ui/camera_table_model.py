@@ -0,0 +1,128 @@
+from array import array
+from PySide6 import QtCore, QtGui
+from domain.models import CameraConf, Direction
+
+HEADERS = ["Name", "IP", "Hint", "HTTPS", "Snap", "Link", "A→B", "A←B", "Total"]
+COL_LINK, COL_IN, COL_OUT, COL_TOTAL = 5, 6, 7, 8
+LINK_COLORS = {"up": QtGui.QColor("#2e7d32"), "connecting": QtGui.QColor("#ef6c00"),
+               "retrying": QtGui.QColor("#ef6c00"), "down": QtGui.QColor("#c62828")}
+
+
+class CameraTableModel(QtCore.QAbstractTableModel):
+    """Camera rows plus live IN/OUT/TOTAL counters and the stream link state.
+
+    Counters live in one flat array('q') with three slots per distinct IP, and
+    the IN/OUT/ALL totals are kept as running sums. `add` only marks rows
+    dirty; `flush` emits one dataChanged per changed row (count columns only)
+    and `totals_changed` when the sums moved, so nothing is rebuilt per event.
+    """
+
+    totals_changed = QtCore.Signal(int, int, int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._cams: list[CameraConf] = []
+        self._ip_idx: dict[str, int] = {}           # ip -> slot in _counts
+        self._ip_rows: list[list[int]] = []         # slot -> rows showing that ip
+        self._counts = array("q")                   # [in, out, total] per slot
+        self._orphans: dict[str, tuple[int, int, int]] = {}   # counts for IPs not in the table
+        self._totals = [0, 0, 0]
+        self._dirty: set[int] = set()
+        self._totals_dirty = False
+        self._links: dict[str, dict] = {}           # ip -> CameraLink.snapshot()
+
+    # ---------- Qt model ----------
+
+    def rowCount(self, parent=QtCore.QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._cams)
+
+    def columnCount(self, parent=QtCore.QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role == QtCore.Qt.DisplayRole and orientation == QtCore.Qt.Horizontal: return HEADERS[section]
+        return None
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid(): return None
+        c = self._cams[index.row()]; col = index.column()
+        if col == COL_LINK:
+            link = self._links.get(c.ip)
+            if link is None: return None
+            if role == QtCore.Qt.ForegroundRole: return LINK_COLORS.get(link["state"])
+            if role == QtCore.Qt.ToolTipRole: return link["last_error"] or None
+            if role == QtCore.Qt.DisplayRole:
+                return link["state"] + (f" ({link['failures']})" if link["failures"] and link["state"] != "up" else "")
+            return None
+        if role != QtCore.Qt.DisplayRole: return None
+        if col >= COL_IN:
+            return str(self._counts[self._ip_idx[c.ip] * 3 + col - COL_IN])
+        return (c.name or c.ip, c.ip, c.pattern_hint, "✓" if getattr(c, "scheme", "http") == "https" else "",
+                str(getattr(c, "snap_channel", 101)))[col]
+
+    # ---------- Cameras ----------
+
+    def set_cameras(self, cams: list[CameraConf]) -> None:
+        """Replace the rows; counters follow their IP (also across remove/re-add)."""
+        old = {ip: tuple(self._counts[i*3:i*3+3]) for ip, i in self._ip_idx.items()}
+        old.update(self._orphans)
+        self.beginResetModel()
+        self._cams = list(cams); self._ip_idx = {}; self._ip_rows = []; self._counts = array("q")
+        for row, c in enumerate(self._cams):
+            i = self._ip_idx.get(c.ip)
+            if i is None:
+                i = self._ip_idx[c.ip] = len(self._ip_rows); self._ip_rows.append([])
+                self._counts.extend(old.pop(c.ip, (0, 0, 0)))
+            self._ip_rows[i].append(row)
+        self._orphans = old
+        self._totals = [sum(self._counts[k::3]) for k in range(3)]
+        self._dirty.clear()
+        self.endResetModel()
+        self.totals_changed.emit(*self._totals)
+
+    # ---------- Counters ----------
+
+    def add(self, ip: str, direction: Direction) -> None:
+        d = (1, 0) if direction == "IN" else (0, 1) if direction == "OUT" else (0, 0)
+        if d == (0, 0): return
+        i = self._ip_idx.get(ip)
+        if i is None:
+            a, b, _ = self._orphans.get(ip, (0, 0, 0))
+            self._orphans[ip] = (a + d[0], b + d[1], a + b + 1); return
+        base = i * 3
+        self._counts[base] += d[0]; self._counts[base+1] += d[1]; self._counts[base+2] += 1
+        self._totals[0] += d[0]; self._totals[1] += d[1]; self._totals[2] += 1
+        self._dirty.add(i); self._totals_dirty = True
+
+    def counts(self, ip: str) -> tuple[int, int, int]:
+        i = self._ip_idx.get(ip)
+        return tuple(self._counts[i*3:i*3+3]) if i is not None else self._orphans.get(ip, (0, 0, 0))
+
+    def totals(self) -> tuple[int, int, int]:
+        return tuple(self._totals)
+
+    def reset_counts(self, counts: dict[str, tuple[int, int, int]] | None = None) -> None:
+        """Zero every counter, then load `counts` (ip -> in, out, total), e.g. restored from a checkpoint."""
+        self._counts = array("q", bytes(len(self._counts) * 8)); self._orphans = dict(counts or {})
+        self.set_cameras(self._cams)
+
+    # ---------- Links ----------
+
+    def set_links(self, links: dict[str, dict]) -> None:
+        """Update the Link column from the event source's per-camera link snapshots (ip -> dict)."""
+        for ip, i in self._ip_idx.items():
+            new = links.get(ip); old = self._links.get(ip)
+            if new == old or (new and old and all(new[k] == old[k] for k in ("state", "failures", "last_error"))): continue
+            for row in self._ip_rows[i]:
+                self.dataChanged.emit(self.index(row, COL_LINK), self.index(row, COL_LINK))
+        self._links = dict(links)
+
+    def flush(self) -> None:
+        """Emit the changes accumulated since the last flush."""
+        for i in self._dirty:
+            for row in self._ip_rows[i]:
+                self.dataChanged.emit(self.index(row, COL_IN), self.index(row, COL_TOTAL), [QtCore.Qt.DisplayRole])
+        self._dirty.clear()
+        if self._totals_dirty:
+            self._totals_dirty = False
+            self.totals_changed.emit(*self._totals)
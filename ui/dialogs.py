@@ -1,6 +1,7 @@
 from PySide6 import QtWidgets
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QDateTime
 from domain.models import CameraConf
+from infrastructure.exporters import parquet_available
 
 
 class CameraDialog(QtWidgets.QDialog):
@@ -87,16 +88,24 @@ class CameraDialog(QtWidgets.QDialog):
 class CsvDialog(QtWidgets.QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.setWindowTitle("Export CSV")
-        now = QtWidgets.QDateTime.currentDateTime()
+        self.setWindowTitle("Export")
+        now = QDateTime.currentDateTime()
         start = now.addDays(-1)
 
         self.dt_from = QtWidgets.QDateTimeEdit(start); self.dt_from.setCalendarPopup(True)
         self.dt_to   = QtWidgets.QDateTimeEdit(now);   self.dt_to.setCalendarPopup(True)
+        self.kind = QtWidgets.QComboBox()
+        self.kind.addItem("Every event", "rows"); self.kind.addItem("Per hour per camera", "hourly")
+        self.fmt = QtWidgets.QComboBox()
+        self.fmt.addItem("CSV (*.csv)", "csv"); self.fmt.addItem("Columnar binary (*.pccol)", "columnar")
+        self.fmt.addItem("Parquet (*.parquet)", "parquet")
+        if not parquet_available(): self.fmt.model().item(2).setEnabled(False)   # needs pyarrow
 
         form = QtWidgets.QFormLayout()
         form.addRow("From", self.dt_from)
         form.addRow("To",   self.dt_to)
+        form.addRow("Rows", self.kind)
+        form.addRow("Format", self.fmt)
 
         self.ok = QtWidgets.QPushButton("Export")
         self.cancel = QtWidgets.QPushButton("Cancel")
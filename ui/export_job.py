@@ -0,0 +1,44 @@
+import threading
+from pathlib import Path
+from typing import Callable, Iterable, Sequence
+from PySide6 import QtCore
+
+from infrastructure.exporters import Cancelled, Column, export
+
+
+class ExportJob(QtCore.QThread):
+    """Runs `exporters.export` off the GUI thread.
+
+    `rows` is a lazy iterable (a repo range scan), so memory stays flat. Progress
+    is reported in permille of the [t0, t1] time span, using the first column
+    (a timestamp) of each row, and only when it changes.
+    """
+
+    progress = QtCore.Signal(int, int)        # permille, rows so far
+    done = QtCore.Signal(str, int)            # path, rows
+    failed = QtCore.Signal(str)               # message ("" when cancelled)
+
+    def __init__(self, path: str, fmt: str, columns: Sequence[Column], rows: Callable[[], Iterable[tuple]],
+                 t0: float, t1: float, parent=None):
+        super().__init__(parent)
+        self.path = path; self.fmt = fmt; self.columns = columns; self.rows = rows
+        self.t0 = t0; self.span = max(t1 - t0, 1.0)
+        self._cancel = threading.Event(); self._n = 0; self._last = -1
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def _on_row(self, r: tuple) -> None:
+        self._n += 1
+        p = min(999, max(0, int((r[0] - self.t0) * 1000 / self.span)))
+        if p != self._last: self._last = p; self.progress.emit(p, self._n)
+
+    def run(self):
+        try:
+            n = export(Path(self.path), self.fmt, self.columns, self.rows(), self._on_row, self._cancel.is_set)
+        except Cancelled:
+            self.failed.emit("")
+        except Exception as e:
+            self.failed.emit(f"{type(e).__name__}: {e}")
+        else:
+            self.progress.emit(1000, n); self.done.emit(self.path, n)
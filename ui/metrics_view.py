@@ -0,0 +1,34 @@
+from PySide6 import QtCore, QtWidgets
+from shared.metrics import REGISTRY, Registry
+
+HEADERS = ["Metric", "Labels", "Count", "Avg ms", "p50 ms", "p95 ms"]
+
+
+class MetricsView(QtWidgets.QWidget):
+    """Table of the in-process counters and histograms (same data as /metrics)."""
+
+    def __init__(self, registry: Registry = REGISTRY, endpoint: str = "", parent=None):
+        super().__init__(parent)
+        self.registry = registry
+        self.table = QtWidgets.QTableWidget(0, len(HEADERS)); self.table.setHorizontalHeaderLabels(HEADERS)
+        self.table.verticalHeader().setVisible(False); self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(1, QtWidgets.QHeaderView.Stretch)
+        lay = QtWidgets.QVBoxLayout(self)
+        lay.addWidget(QtWidgets.QLabel(f"Prometheus endpoint: {endpoint}" if endpoint else "Prometheus endpoint disabled"))
+        lay.addWidget(self.table)
+
+    def refresh(self) -> None:
+        if not self.isVisible(): return
+        rows = self.registry.rows(); t = self.table
+        t.setRowCount(len(rows))
+        for r, (name, labels, n, total, p50, p95) in enumerate(rows):
+            hist = total or p50 or p95
+            cells = [name, labels, f"{n:,.0f}",
+                     f"{total / n * 1000:.3f}" if hist and n else "",
+                     f"≤ {p50 * 1000:g}" if hist else "", f"≤ {p95 * 1000:g}" if hist else ""]
+            for c, text in enumerate(cells):
+                it = t.item(r, c)
+                if it is None:
+                    it = QtWidgets.QTableWidgetItem(); t.setItem(r, c, it)
+                    if c >= 2: it.setTextAlignment(QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter)
+                if it.text() != text: it.setText(text)
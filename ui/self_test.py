@@ -0,0 +1,88 @@
+import threading, time
+from PySide6 import QtCore, QtGui, QtWidgets
+
+from domain.models import CameraConf
+from infrastructure.camera_probe import FAIL, OK, PROBE_TIMEOUT_S, ProbeResult, probe_all
+
+HEADERS = ["Name", "IP", "Auth", "Stream", "Snapshot", "Latency ms", "Details"]
+CHECKS = ("auth", "stream", "snapshot")
+COLORS = {OK: QtGui.QColor("#2e7d32"), FAIL: QtGui.QColor("#c62828")}
+
+
+class SelfTestJob(QtCore.QThread):
+    """Runs `camera_probe.probe_all` off the GUI thread; one `result` signal per camera as it finishes."""
+
+    result = QtCore.Signal(object)            # ProbeResult
+
+    def __init__(self, cams: list[CameraConf], timeout: float = PROBE_TIMEOUT_S, parent=None):
+        super().__init__(parent)
+        self.cams = cams; self.timeout = timeout; self._cancel = threading.Event()
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def run(self):
+        probe_all(self.cams, self.result.emit, self.timeout, cancelled=self._cancel.is_set)
+
+
+class SelfTestDialog(QtWidgets.QDialog):
+    """Live results of a parallel self-test: rows fill in as cameras answer, then sort slowest first.
+
+    Closing cancels the probes still queued; keep the dialog around (not deleted) while `job` runs.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Camera self-test"); self.resize(820, 420)
+        self.table = QtWidgets.QTableWidget(0, len(HEADERS)); self.table.setHorizontalHeaderLabels(HEADERS)
+        self.table.verticalHeader().setVisible(False); self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(len(HEADERS) - 1, QtWidgets.QHeaderView.Stretch)
+        self.summary = QtWidgets.QLabel()
+        self.b_again = QtWidgets.QPushButton("Run again"); self.b_close = QtWidgets.QPushButton("Close")
+        self.b_close.clicked.connect(self.close)
+        row = QtWidgets.QHBoxLayout(); row.addWidget(self.summary, 1); row.addWidget(self.b_again); row.addWidget(self.b_close)
+        lay = QtWidgets.QVBoxLayout(self); lay.addWidget(self.table); lay.addLayout(row)
+        self.job: SelfTestJob | None = None; self._rows: dict[str, int] = {}; self._done = self._bad = 0; self._t0 = 0.0
+
+    def start(self, cams: list[CameraConf]) -> None:
+        if self.job is not None: return
+        t = self.table; t.setSortingEnabled(False); t.setRowCount(len(cams)); self._rows = {}
+        for r, c in enumerate(cams):
+            self._rows[c.ip] = r
+            for col, text in enumerate([c.name or c.ip, c.ip, "…", "…", "…", "", ""]): self._set(r, col, text)
+        self._done = self._bad = 0; self._t0 = time.monotonic(); self.b_again.setEnabled(False)
+        self.job = SelfTestJob(cams, parent=self)
+        self.job.result.connect(self._on_result); self.job.finished.connect(self._on_finished)
+        self.job.start(); self._show_summary()
+
+    def _set(self, r: int, col: int, text: str, color: QtGui.QColor | None = None, tip: str = "") -> None:
+        it = self.table.item(r, col)
+        if it is None:
+            it = QtWidgets.QTableWidgetItem(); self.table.setItem(r, col, it)
+            if col == 5: it.setTextAlignment(QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter)
+        it.setText(text); it.setForeground(color or QtGui.QBrush()); it.setToolTip(tip)
+
+    def _on_result(self, res: ProbeResult) -> None:
+        r = self._rows.get(res.ip)
+        if r is None: return
+        for col, k in enumerate(CHECKS, start=2):
+            outcome, ms, detail = res.checks.get(k, ("", 0.0, ""))
+            self._set(r, col, f"{outcome} ({ms:.0f} ms)" if outcome == OK else outcome, COLORS.get(outcome), detail)
+        item = QtWidgets.QTableWidgetItem(); item.setData(QtCore.Qt.DisplayRole, round(res.total_ms))
+        item.setTextAlignment(QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter); self.table.setItem(r, 5, item)
+        self._set(r, 6, res.error or "; ".join(d for _, _, d in res.checks.values() if d))
+        self._done += 1; self._bad += not res.ok; self._show_summary()
+
+    def _on_finished(self) -> None:
+        self.job.deleteLater(); self.job = None; self.b_again.setEnabled(True)
+        self.table.setSortingEnabled(True); self.table.sortByColumn(5, QtCore.Qt.DescendingOrder)    # slowest first
+        self._show_summary()
+
+    def _show_summary(self) -> None:
+        n = self.table.rowCount(); state = "running" if self.job is not None else "done"
+        self.summary.setText(f"{state}: {self._done}/{n} cameras  •  ok {self._done - self._bad}  issues {self._bad}  "
+                             f"•  {time.monotonic() - self._t0:.2f} s")
+
+    def closeEvent(self, e: QtGui.QCloseEvent) -> None:
+        if self.job is not None: self.job.cancel()       # probes already running finish within one timeout
+        super().closeEvent(e)
@@ -0,0 +1,69 @@
+from collections import OrderedDict
+from typing import Callable
+from PySide6 import QtCore, QtGui
+
+
+class _Decode(QtCore.QRunnable):
+    def __init__(self, svc: "ThumbnailService", path: str, w: int, h: int):
+        super().__init__(); self.svc = svc; self.path = path; self.w = w; self.h = h
+
+    def run(self):
+        # QImageReader with a scaled size lets the JPEG plugin downscale while
+        # decoding (DCT-domain), instead of decoding the full frame first.
+        data = self.svc.loader(self.path) if self.svc.loader else None
+        if data is not None:
+            buf = QtCore.QBuffer(); buf.setData(QtCore.QByteArray(data)); buf.open(QtCore.QIODevice.ReadOnly)
+            r = QtGui.QImageReader(buf)
+        else:
+            r = QtGui.QImageReader(self.path)
+        r.setAutoTransform(True)
+        full = r.size()
+        if full.isValid(): r.setScaledSize(full.scaled(self.w, self.h, QtCore.Qt.KeepAspectRatio))
+        self.svc._decoded.emit(self.path, self.w, self.h, r.read())
+
+
+class ThumbnailService(QtCore.QObject):
+    """Off-thread thumbnail decoding with a bounded LRU of QPixmaps.
+
+    `request` answers from the cache or schedules a decode on a private
+    QThreadPool; the QImage comes back to the GUI thread, where it becomes a
+    QPixmap, is cached under (path, w, h) and announced through `ready`
+    (or `failed`, e.g. when the image was purged in the meantime).
+    """
+
+    ready = QtCore.Signal(str, int, int, QtGui.QPixmap)
+    failed = QtCore.Signal(str, int, int)
+    _decoded = QtCore.Signal(str, int, int, QtGui.QImage)
+
+    def __init__(self, capacity: int = 256, threads: int = 2,
+                 loader: Callable[[str], bytes | None] | None = None, parent=None):
+        super().__init__(parent)
+        self.loader = loader     # path -> encoded bytes (e.g. ImageStore.read); None means read the file
+        self.capacity = capacity
+        self._cache: OrderedDict[tuple[str, int, int], QtGui.QPixmap] = OrderedDict()
+        self._pending: set[tuple[str, int, int]] = set()
+        self._pool = QtCore.QThreadPool(self); self._pool.setMaxThreadCount(threads)
+        self._decoded.connect(self._on_decoded, QtCore.Qt.QueuedConnection)
+        self.stats = {"hits": 0, "misses": 0, "decoded": 0, "failed": 0}
+
+    def request(self, path: str, w: int, h: int) -> QtGui.QPixmap | None:
+        key = (path, w, h)
+        pm = self._cache.get(key)
+        if pm is not None:
+            self._cache.move_to_end(key); self.stats["hits"] += 1
+            return pm
+        self.stats["misses"] += 1
+        if key not in self._pending:
+            self._pending.add(key); self._pool.start(_Decode(self, path, w, h))
+        return None
+
+    def _on_decoded(self, path: str, w: int, h: int, img: QtGui.QImage) -> None:
+        key = (path, w, h); self._pending.discard(key)
+        if img.isNull(): self.stats["failed"] += 1; self.failed.emit(path, w, h); return
+        pm = QtGui.QPixmap.fromImage(img)
+        self._cache[key] = pm; self.stats["decoded"] += 1
+        while len(self._cache) > self.capacity: self._cache.popitem(last=False)
+        self.ready.emit(path, w, h, pm)
+
+    def shutdown(self, msecs: int = 1500) -> None:
+        self._pool.clear(); self._pool.waitForDone(msecs)